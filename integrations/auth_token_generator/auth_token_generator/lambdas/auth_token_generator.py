@@ -1,14 +1,13 @@
 import os
 import logging
 import json
-import time
-import jwt
 import base64
 import boto3
 from auth_token_generator.utils import Utils
 from botocore.exceptions import ClientError
 from newstore_common.aws import init_root_logger
 from newstore_adapter.connector import NewStoreConnector
+from newstore_adapter.token_broker import get_broker
 
 init_root_logger(__name__)
 LOGGER = logging.getLogger(__name__)
@@ -47,18 +46,16 @@ def get_token(context):
     global TOKEN # pylint: disable=global-statement
     global COUNTER # pylint: disable=global-statement
 
-    force_token_generation = os.environ.get("FORCE", False)
-
-    is_expired = False
-    if TOKEN:
-        expiry_offset = int(os.environ.get("EXPIRY_OFFSET", "0"))
-
-        token_exp = get_token_expiry(TOKEN["access_token"])
-        is_expired = int(time.time()) >= (token_exp - expiry_offset)
+    # Keyed by stage instead of host, the host is only read from the param store when a token is requested
+    cache_key = (TENANT, STAGE, os.environ["SECRET_NAME_NEWSTORE_API_USER"])
+    broker = get_broker()
 
-    if not TOKEN or force_token_generation == "1" or is_expired:
+    force_token_generation = os.environ.get("FORCE", False)
+    if force_token_generation == "1":
+        broker.invalidate(cache_key)
 
-        LOGGER.info(f"requesting new access token (forced? {force_token_generation}, expired? {is_expired})")
+    def request_token():
+        LOGGER.info(f"requesting new access token (forced? {force_token_generation})")
 
         credentials = get_credentials()
 
@@ -71,14 +68,18 @@ def get_token(context):
             password=credentials["password"]
         )
 
-        COUNTER = 0
         auth = ns_handler.newstore_adapter.get_api_auth()
-        result = auth.auth_request()
-        result["expires_at"] = get_token_expiry(result["access_token"])
-        return result
+        return auth.auth_request()
 
-    LOGGER.info(f'Token already exists!')
-    return TOKEN
+    # The token is renewed EXPIRY_OFFSET seconds before its expiry, so it won't expire during long job runs
+    expiry_offset = int(os.environ.get("EXPIRY_OFFSET", "0"))
+    result = broker.get_token(cache_key, request_token, min_ttl=expiry_offset)
+
+    if TOKEN and TOKEN["access_token"] == result["access_token"]:
+        LOGGER.info(f'Token already exists!')
+    else:
+        COUNTER = 0
+    return result
 
 
 def get_credentials():
@@ -109,10 +110,3 @@ def get_credentials():
         raise RuntimeError("get_credentials: Missing environ variable") from error
     except ClientError as error:
         raise RuntimeError("get_credentials: Cannot load values from Secrets") from error
-
-
-def get_token_expiry(token):
-    return jwt.decode(token, options={
-        "verify_signature": False,
-        "verify_exp": False,
-    })["exp"]
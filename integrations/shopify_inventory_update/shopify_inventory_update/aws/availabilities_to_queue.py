@@ -2,23 +2,24 @@
 # Copyright (C) 2020-21 NewStore, Inc. All rights reserved.
 
 import asyncio
-import io
 import json
 import logging
 import os
-import zipfile
+import tempfile
 import aiohttp
 
 from param_store.client import ParamStore
 from newstore_adapter.connector import NewStoreConnector
-from shopify_inventory_update.handlers.sqs_handler import SqsHandler
+from shopify_inventory_update.handlers.sqs_handler import SqsHandler, SqsBatchProducer
 from shopify_inventory_update.handlers.events_handler import EventsHandler
 from shopify_inventory_update.handlers.s3_handler import S3Handler
+from shopify_inventory_update.handlers.export_reader import iter_export_variants
 from shopify_inventory_update.handlers.lambda_handler import stop_before_timeout
+from shopify_inventory_update.handlers.product_mapping_index import get_product_mapping_index
+from shopify_inventory_update.handlers.inventory_snapshot import InventorySnapshot
 from shopify_inventory_update.handlers.dynamodb_handler import (
     update_item,
-    get_item,
-    get_all
+    get_item
 )
 
 LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
@@ -38,8 +39,11 @@ BLOCK_CONCURRENT_EXECUTION = bool(os.environ.get('BLOCK_CONCURRENT_EXECUTION', '
 CONCURRENT_EXECUTION_BLOCKED_KEY = 'push_to_queue_concurrent_execution_blocked'
 
 PARAM_STORE = None
-MAPPING_ENTRIES = None
+MAPPING_INDEX = None
 STOP_BEFORE_TIMEOUT = 60000
+EXPORT_SPOOL_SIZE = int(os.environ.get('EXPORT_SPOOL_SIZE', str(64 * 1024 * 1024)) or str(64 * 1024 * 1024))
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+VARIANTS_PER_MESSAGE = int(os.environ.get('VARIANTS_PER_MESSAGE', '100') or '100')
 
 TENANT = os.environ['TENANT'] or 'frankandoak'
 STAGE = os.environ['STAGE'] or 'x'
@@ -212,8 +216,7 @@ async def wait_job_and_process_variants(context, event):
         return {'result': 'All variants exported to the queue'}
 
     events_handler = EventsHandler()
-    newstore_credentials = json.loads(
-        PARAM_STORE.get_param('newstore'))
+    newstore_credentials = PARAM_STORE.get_json_param('newstore')
     ns_handler = NewStoreConnector(tenant=newstore_credentials['tenant'], context=context,
                                    username=newstore_credentials['username'], password=newstore_credentials['password'],
                                    host=newstore_credentials['host'])
@@ -244,8 +247,12 @@ async def wait_job_and_process_variants(context, event):
         link = str(export_job['link'])
         last_updated_at = str(export_job['last_updated_at'])
         variants = await read_variants_from_export_file(link, last_updated_at)
+        try:
+            all_pushed = await _process_variants_to_queue(variants, context)
+        finally:
+            variants.close()
 
-        if await _process_variants_to_queue(variants, context):
+        if all_pushed:
             await events_handler.update_trigger(
                 os.environ.get('TRIGGER_NAME', WORKER_TRIGGER_DEFAULT_NAME), "rate(1 hour)", True)
             save_last_variant('')
@@ -259,197 +266,244 @@ async def wait_job_and_process_variants(context, event):
 
 ## Location where all the operations happen.
 async def read_variants_from_export_file(file_url, last_updated_at):
-    """Gets a file from a URl, saves it to an S3 and returns the file contents
+    """Downloads the export file from a URL and streams its variants while a copy
+    of the export document is uploaded to S3
 
     Arguments:
         file_url {string} -- The file URL
         last_updated_at {string} -- The last updated value used to save the file in s3
 
     Returns:
-        dic -- Saved file data in dictionary
+        generator -- Variants of the export, one dictionary at a time
     """
     s3_handler = S3Handler(
         bucket_name=os.environ["S3_BUCKET_NAME"],
         key_name='helpers/exports/{last_updated_at}/inventory_levels.json'.
             format(last_updated_at=last_updated_at)
     )
-    variants = None
 
     save_last_updated_to_dynamo_db(last_updated_at)
 
     file = await _get_file(url=file_url)
 
-    LOGGER.info('Uploading file to s3')
-
-    # s3_handler.put_object(data=file)
-
-    variants = json.loads(file)
-
-    s3_handler.put_object(data=json.dumps(variants))
-
-    return variants
+    LOGGER.info('Streaming export file and uploading it to s3')
+    return iter_export_variants(file, is_zip='.zip' in file_url, s3_handler=s3_handler)
 
 
 async def _process_variants_to_queue(variants, context):
     """Puts the variants into a message and drops it to a queue
 
+    The variants are streamed through the generator stages below, so the
+    export is walked exactly once and only the current batch is held.
+
     Arguments:
-        variants {dic} -- Variants list
+        variants {iterable} -- Variants from the export
 
     Returns:
-        object -- Result Drop to queue message object
+        bool -- True if all variants were pushed, False if stopped before timeout
     """
-    LOGGER.info(f'Processing {len(variants)} variants from the currently exported job.')
-
-    global MAPPING_ENTRIES
-    MAPPING_ENTRIES = get_all(table_name=DYNAMODB_MAPPING_TABLE_NAME)
+    global MAPPING_INDEX
+    MAPPING_INDEX = get_product_mapping_index(DYNAMODB_MAPPING_TABLE_NAME)
 
     sqs_handler = SqsHandler(queue_name=os.environ["SQS_NAME"])
-    locations_map = json.loads(PARAM_STORE.get_param('shopify/dc_location_id_map'))
+    locations_map = PARAM_STORE.get_json_param('shopify/dc_location_id_map')
+    snapshot = InventorySnapshot(DYNAMODB_TABLE_NAME)
+    snapshot.load()
+
+    LOGGER.info('Processing variants from the export')
+
+    progress = {'export_count': 0, 'next_product_id': None, 'unchanged_count': 0}
+    records = _counted(variants, progress)
+    records = _resume_from_product(records, get_last_variant())
+    records = _until_timeout(records, context, progress)
+    records = _valid_variants(records)
+    records = _with_cad_inventory_ids(records)
+    records = _unique_per_location(records)
+    records = _with_usd_inventory_ids(records)
+    records = _with_location_ids(records, locations_map)
+    records = _changed_since_last_push(records, snapshot, progress)
 
-    result = True
-    export_count = len(variants)
-    mapped_inventory_ids = []
-    shopify_inventory_item_list = []
     counter = 0
+    pushed_count = 0
+    async with sqs_handler, SqsBatchProducer(sqs_handler) as producer:
+        for batch in _batches(records, VARIANTS_PER_MESSAGE):
+            await _drop_to_queue(producer, batch)
+            counter = counter + 1
+            pushed_count = pushed_count + len(batch)
+            LOGGER.debug(f'Queued message number {counter} for queue {sqs_handler.queue_name}')
 
-    LOGGER.info('Processing variants from the json')
-    if export_count < 1000:
-        LOGGER.debug(variants)
+    if progress['next_product_id'] is not None:
+        save_last_variant(progress['next_product_id'])
 
-    LOGGER.info(f'Export items count to push: {export_count}')
+    LOGGER.info(f'Export items count: {progress["export_count"]}')
+    LOGGER.info(f'Pushed items count: {pushed_count}')
+    LOGGER.info(f'Unchanged items count: {progress["unchanged_count"]}')
+    return progress['next_product_id'] is None
 
-    previous_product_id = None
-    last_product_id = get_last_variant()
 
+def _counted(variants, progress):
     for variant in variants:
-        # Check that all products for all locations have been processed before we stop before the timeout
-        if stop_before_timeout(context, STOP_BEFORE_TIMEOUT, LOGGER) \
-            and previous_product_id is not None \
-            and previous_product_id != variant.get('product_id'):
-            LOGGER.info(
-                f'Previous Product Id: {previous_product_id} - save next product id {variant.get("product_id")}')
-            save_last_variant(variant.get('product_id'))
-            result = False
-            break
+        progress['export_count'] += 1
+        yield variant
 
-        if last_product_id != '':
+
+def _until_timeout(variants, context, progress):
+    """Stops the stream before the lambda timeout, but only on a product boundary so that
+    all locations of a product are processed in the same run. The product to continue
+    with is recorded in `progress`.
+    """
+    previous_product_id = None
+    for variant in variants:
+        product_id = variant.get('product_id')
+        if previous_product_id is not None \
+            and previous_product_id != product_id \
+            and stop_before_timeout(context, STOP_BEFORE_TIMEOUT, LOGGER):
+            LOGGER.info(f'Previous Product Id: {previous_product_id} - save next product id {product_id}')
+            progress['next_product_id'] = product_id
+            return
+        previous_product_id = product_id
+        yield variant
+
+
+def _resume_from_product(variants, last_product_id):
+    """Skips variants up to the product the previous run stopped at."""
+    if last_product_id:
+        for variant in variants:
             if variant.get('product_id') == last_product_id:
                 LOGGER.info(f'Continue with Product Id: {last_product_id}')
-                last_product_id = ''
-            else:
-                continue
+                yield variant
+                break
+    yield from variants
 
-        previous_product_id = variant.get('product_id')
 
-        # Skip products with / to avoid invalid inventory update in Shopify caused by
-        # duplicate products - special issue for F&O
+def _valid_variants(variants):
+    # Skip products with / to avoid invalid inventory update in Shopify caused by
+    # duplicate products - special issue for F&O
+    for variant in variants:
         if '/' in variant.get('product_id'):
             LOGGER.info(f'Invalid product id, skip {variant.get("product_id")}')
             continue
+        yield variant
 
-        atp = int(variant['atp'])
-        shopify_inventory_ids = {}
-        current_location_ids = None
-        fulfillment_node_id = variant.get('fulfillment_node_id', None)
-
-        if 'external_identifiers' in variant:
-            if len(variant['external_identifiers']) > 0:
-                external_identifier = variant['external_identifiers'][0]
-                identifiers = external_identifier['identifiers']
 
-                if 'shopify_inventory_item_id' in identifiers:
-                    shopify_inventory_ids['cad'] = identifiers['shopify_inventory_item_id']
+def _with_cad_inventory_ids(variants):
+    """Yields (variant, shopify_inventory_ids) for variants that carry a CAD inventory item id."""
+    for variant in variants:
+        shopify_inventory_ids = {}
+        external_identifiers = variant.get('external_identifiers')
+        if external_identifiers:
+            identifiers = external_identifiers[0]['identifiers']
+            if 'shopify_inventory_item_id' in identifiers:
+                shopify_inventory_ids['cad'] = identifiers['shopify_inventory_item_id']
 
         if not shopify_inventory_ids.get('cad'):
-            product_id = variant.get('product_id')
-            LOGGER.debug(f'Shopify inventory ID for CAD not present for "{product_id}", skipping variant')
+            LOGGER.debug(f'Shopify inventory ID for CAD not present for "{variant.get("product_id")}", skipping variant')
             continue
-
-        # Due to a data issue inventory records might be exported twice for a location
-        # one for the english and one for the french catalog; and it could also be its only exported
-        # for the english OR the french catalog - so we check here for duplicates
-        if shopify_inventory_ids.get('cad') + '-' + fulfillment_node_id in mapped_inventory_ids:
-            LOGGER.debug(
-                f'Skip inventory record since its already in the list {shopify_inventory_ids.get("cad")}-{fulfillment_node_id}')
+        yield variant, shopify_inventory_ids
+
+
+def _unique_per_location(records):
+    # Due to a data issue inventory records might be exported twice for a location
+    # one for the english and one for the french catalog; and it could also be its only exported
+    # for the english OR the french catalog - so we check here for duplicates over the whole export
+    seen = set()
+    for variant, shopify_inventory_ids in records:
+        key = (shopify_inventory_ids['cad'], variant.get('fulfillment_node_id'))
+        if key in seen:
+            LOGGER.debug(f'Skip inventory record since its already in the list {key[0]}-{key[1]}')
             continue
-        mapped_inventory_ids.append(shopify_inventory_ids.get('cad') + '-' + fulfillment_node_id)
+        seen.add(key)
+        yield variant, shopify_inventory_ids
 
+
+def _with_usd_inventory_ids(records):
+    for variant, shopify_inventory_ids in records:
         shopify_inventory_id_usd = _get_usd_inventory_item_id(variant.get('product_id'))
         if shopify_inventory_id_usd:
             shopify_inventory_ids['usd'] = shopify_inventory_id_usd
+        yield variant, shopify_inventory_ids
 
-        if fulfillment_node_id in locations_map:
-            current_location_ids = locations_map[fulfillment_node_id]
 
+def _with_location_ids(records, locations_map):
+    """Yields the queue entries for the records whose fulfillment node is mapped to Shopify locations."""
+    for variant, shopify_inventory_ids in records:
+        fulfillment_node_id = variant.get('fulfillment_node_id')
+        current_location_ids = locations_map.get(fulfillment_node_id)
         if current_location_ids is None:
-            product_id = variant.get('product_id')
             LOGGER.debug(
-                f'Fulfillment node ID "{fulfillment_node_id}" not mapped to location for "{product_id}", skipping variant')
+                f'Fulfillment node ID "{fulfillment_node_id}" not mapped to location for "{variant.get("product_id")}", skipping variant')
             continue
-
-        if len(shopify_inventory_item_list) == 100:
-            await _drop_to_queue(sqs_handler, shopify_inventory_item_list)
-            counter = counter + 1
-            LOGGER.info(f'Pushed message number {counter} to queue {sqs_handler.queue_name}')
-            mapped_inventory_ids = []
-            shopify_inventory_item_list = []
-
-        shopify_inventory_item_list.append({
-            'atp': atp,
+        yield {
+            'atp': int(variant['atp']),
             'shopify_inventory_ids': shopify_inventory_ids,
             'location_ids': current_location_ids
-        })
+        }
 
-    pushed_count = counter * 100 + len(shopify_inventory_item_list)
 
-    if len(shopify_inventory_item_list) > 0:
-        await _drop_to_queue(sqs_handler, shopify_inventory_item_list)
-        LOGGER.info(f'Pushed last message to queue {sqs_handler.queue_name}')
-        mapped_inventory_ids = []
-        shopify_inventory_item_list = []
+def _changed_since_last_push(records, snapshot, progress):
+    """Drops the shops whose last pushed quantity equals the ATP of the record, and the
+    record itself when no shop is left to update."""
+    for record in records:
+        shopify_inventory_ids = {}
+        location_ids = {}
+        for currency, inventory_item_id in record['shopify_inventory_ids'].items():
+            location_id = record['location_ids'].get(currency)
+            if location_id is None or snapshot.is_unchanged(inventory_item_id, location_id, record['atp']):
+                continue
+            shopify_inventory_ids[currency] = inventory_item_id
+            location_ids[currency] = location_id
+        if not shopify_inventory_ids:
+            progress['unchanged_count'] += 1
+            continue
+        yield {
+            'atp': record['atp'],
+            'shopify_inventory_ids': shopify_inventory_ids,
+            'location_ids': location_ids
+        }
 
-    LOGGER.info(f'Export items count: {export_count}')
-    LOGGER.info(f'Pushed items count: {pushed_count}')
-    return result
 
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-async def _drop_to_queue(sqs_handler, message_availability):
-    await sqs_handler.push_message(message=json.dumps(message_availability))
+
+async def _drop_to_queue(producer, message_availability):
+    await producer.send(json.dumps(message_availability))
 
 
 async def _get_file(url):
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url=url) as response:
-            response.raise_for_status()
-            response_data = await response.read()
-            if '.zip' in url:
-                with io.BytesIO(response_data) as tf:
-                    # rewind the file
-                    tf.seek(0)
-                    # Read the file as a zipfile and process the members
-                    with zipfile.ZipFile(tf, mode='r') as zipf:
-                        for subfile in zipf.namelist():
-                            if subfile.startswith('__MACOSX'):
-                                continue
-                            # Assumes only one.
-                            return zipf.read(subfile)
-
-            LOGGER.info("Responding with data from zip file")
-            return response_data
+    """Downloads the file in chunks into a spooled temporary file, which only
+    moves to disk (/tmp) once it grows past EXPORT_SPOOL_SIZE
+    """
+    file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url=url) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    file.write(chunk)
+    except Exception:
+        file.close()
+        raise
+    LOGGER.info(f'Downloaded {file.tell()} bytes of export file')
+    return file
 
 
 def _get_usd_inventory_item_id(product_sku):
-    global MAPPING_ENTRIES
-
-    mapping_entry = next(filter(lambda item: item['product_sku'] == product_sku, MAPPING_ENTRIES), None)
+    shopify_inventory_item_id = MAPPING_INDEX.get(product_sku)
 
-    if mapping_entry is None:
+    if shopify_inventory_item_id is None:
         LOGGER.debug('No mapping entry found for usd.')
         return None
 
-    LOGGER.debug(f'Mapping entry found for usd: {mapping_entry}')
-    return mapping_entry['shopify_inventory_item_id']
+    LOGGER.debug(f'Mapping entry found for usd: {product_sku} -> {shopify_inventory_item_id}')
+    return shopify_inventory_item_id
 
 
 def _set_blocked_state(blocked):
@@ -7,13 +7,15 @@ import asyncio
 
 from shopify_inventory_update.handlers.shopify_handler import ShopifyConnector
 from shopify_inventory_update.handlers.sqs_handler import SqsHandler
+from shopify_inventory_update.handlers.sqs_consumer import SqsConsumer
 from shopify_inventory_update.handlers.lambda_handler import stop_before_timeout
+from shopify_inventory_update.handlers.inventory_snapshot import InventorySnapshot
 from shopify_inventory_update.handlers.dynamodb_handler import (
     get_item,
     update_item
 )
 
-from pom_common.shopify import ShopManager
+from pom_common.shopify import get_shop_registry
 
 LOGGER = logging.getLogger(__name__)
 LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
@@ -22,10 +24,10 @@ LOGGER.setLevel(LOG_LEVEL)
 BLOCK_CONCURRENT_EXECUTION = bool(os.environ.get('BLOCK_CONCURRENT_EXECUTION', 'False'))
 CONCURRENT_EXECUTION_BLOCKED_KEY = 'concurrent_execution_blocked'
 DYNAMODB_TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME', 'frankandoak-availability-job-save-state')
-SQS_HANDLER = None
 WORKER_TRIGGER_DEFAULT_NAME = 'shopify_availability_export_worker'
 STOP_BEFORE_TIMEOUT = 180000
 NO_OF_SLOTS = 4
+SHOP_CONCURRENCY = int(os.environ.get('SHOP_CONCURRENCY', '4') or '4')
 
 TENANT = os.environ.get('TENANT', 'frankandoak')
 STAGE = os.environ.get('STAGE', 's')
@@ -76,81 +78,111 @@ def handler(event, context):
 async def _sync_inventory(loop, context):
     """Syncs the invetory with shopify by pulling messages from a queue and
         updating the quantity of the variants in shopify.
-        This handler can have more than one variant in each queue message but
-        will always process on-by-one to shopify
+        Messages are received in batches and processed concurrently; the
+        updates of each shop are limited to SHOP_CONCURRENCY at a time so
+        all workers share the Shopify throttle budget of a shop
     Arguments:
         loop {EventLoop} -- Async event loop
     """
-    shop_manager = ShopManager(TENANT, STAGE, REGION)
-    shopify_connectors = {}
+    shopify_connectors = _get_shopify_connectors()
+    try:
+        return await _consume_queue(context, shopify_connectors)
+    finally:
+        for shopify_connector in shopify_connectors.values():
+            await shopify_connector.close()
 
-    for shop_id in shop_manager.get_shop_ids():
-        shopify_config = shop_manager.get_shop_config(shop_id)
 
-        shopify_connectors[shopify_config['currency']] = ShopifyConnector(
-            shopify_config['username'],
-            shopify_config['password'],
-            shopify_config['shop']
-        )
+def _get_shopify_connectors():
+    """Returns the Shopify connectors by currency. The shop registry keeps them for warm
+    invocations of the lambda and only recreates the connector of a shop whose secret changed"""
+    shop_registry = get_shop_registry(TENANT, STAGE, REGION)
+    shopify_connectors = shop_registry.get_connectors(_create_shopify_connector)
+    return {shop_registry.get_shop_config(shop_id)['currency']: shopify_connector
+            for shop_id, shopify_connector in shopify_connectors.items()}
 
-    global sqs_handler
-    sqs_handler = SqsHandler(
-        os.environ.get("SQS_NAME")
+
+def _create_shopify_connector(shopify_config):
+    return ShopifyConnector(
+        shopify_config['username'],
+        shopify_config['password'],
+        shopify_config['shop']
     )
 
-    message_count = await sqs_handler.get_messages_count()
-    if message_count <= 0:
-        LOGGER.info('No more messages to process... exiting->()')
-        return
-    LOGGER.info(f'{str(message_count)} available in the queue...')
-
-    while message_count > 0:
-        if stop_before_timeout(context, STOP_BEFORE_TIMEOUT, LOGGER):
-            return 'Stopping before timeout'
-
-        messages = await sqs_handler.get_message()
-        if messages.get('Messages'):
-
-            for message in messages['Messages']:
-                if stop_before_timeout(context, STOP_BEFORE_TIMEOUT, LOGGER):
-                    return 'Stopping before timeout'
-
-                receipt_handle = message['ReceiptHandle']
-                success = True
-                products = json.loads(message['Body'])
-                LOGGER.debug(f'Raw products from SQS:\n{products}')
-                '''
-                [{
-                    'atp': 19,
-                    'shopify_inventory_id': {
-                        'cad': '42467871719580',
-                        'usd': '42467871719581'
-                    }
-                    'location_ids': {
-                        'cad': '61464969372',
-                        'usd': '62202544304'
-                    }
-                }, ...]
-                '''
-                if len(products) > 0:
-                    products_by_location = defining_product_by_location(products)
-
-                    for location_id, country_products in products_by_location.items():
-                        try:
-                            await _update_variant_at_shopify(country_products, shopify_connectors, location_id)
-                        except:
-                            LOGGER.warning('Exception updating shopify inventory.')
-                            success = False
-
-                if success:
-                    await sqs_handler.delete_message(receipt_handle)
 
+async def _consume_queue(context, shopify_connectors):
+    shop_semaphores = {currency: asyncio.Semaphore(SHOP_CONCURRENCY) for currency in shopify_connectors}
+
+    async with SqsHandler(os.environ.get("SQS_NAME")) as sqs_handler:
         message_count = await sqs_handler.get_messages_count()
+        if message_count <= 0:
+            LOGGER.info('No more messages to process... exiting->()')
+            return
         LOGGER.info(f'{str(message_count)} available in the queue...')
 
+        snapshot = InventorySnapshot(DYNAMODB_TABLE_NAME)
+
+        async def process_message(message):
+            return await _process_message(message, shopify_connectors, shop_semaphores, snapshot)
+
+        consumer = SqsConsumer(sqs_handler, process_message)
+        try:
+            drained = await consumer.run(lambda: stop_before_timeout(context, STOP_BEFORE_TIMEOUT, LOGGER))
+        finally:
+            snapshot.save()
+
+    for currency, shopify_connector in shopify_connectors.items():
+        LOGGER.info(f'Shopify ({currency}) rate limiter metrics: {shopify_connector.limiter.metrics()}')
+
+    if not drained:
+        return 'Stopping before timeout'
     return 'Sync of inventory with shopify complete'
 
 
+async def _process_message(message, shopify_connectors, shop_semaphores, snapshot=None):
+    """Pushes the products of one queue message to Shopify
+
+    Returns:
+        bool -- True if all locations were updated and the message can be deleted
+    """
+    products = json.loads(message['Body'])
+    LOGGER.debug(f'Raw products from SQS:\n{products}')
+    '''
+    [{
+        'atp': 19,
+        'shopify_inventory_id': {
+            'cad': '42467871719580',
+            'usd': '42467871719581'
+        }
+        'location_ids': {
+            'cad': '61464969372',
+            'usd': '62202544304'
+        }
+    }, ...]
+    '''
+    if len(products) == 0:
+        return True
+
+    products_by_location = defining_product_by_location(products)
+    updates = []
+    for currency, shopify_connector in shopify_connectors.items():
+        location_products = {
+            location_id: country_products[currency.lower()]
+            for location_id, country_products in products_by_location.items()
+            if currency.lower() in country_products
+        }
+        if location_products:
+            updates.append(_update_shop_inventory(
+                location_products, shopify_connector, currency.lower(), shop_semaphores.get(currency), snapshot))
+    results = await asyncio.gather(*updates, return_exceptions=True)
+
+    success = True
+    for result in results:
+        if isinstance(result, Exception):
+            LOGGER.warning(f'Exception updating shopify inventory: {result}')
+            success = False
+    return success
+
+
 def defining_product_by_location(products):
     products_by_location = {}
 
@@ -177,48 +209,67 @@ def defining_product_by_location(products):
     return products_by_location
 
 
-async def _update_variant_at_shopify(products, shopify_connectors, location_id):
-    LOGGER.debug(f'Updating products {products} at location {location_id}')
+async def _update_shop_inventory(location_products, shopify_connector, currency, semaphore=None, snapshot=None):
+    """Updates the inventory of one shop at all locations of a message
 
-    for currency, shopify_connector in shopify_connectors.items():
-        currency = currency.lower()
-        if currency in products:
-            try:
-                LOGGER.debug(f'Process products for {currency}')
-                # RICKY: Is there any need to read the current ATP from NOM again?? Because the products array was from export
-                country_products = await _create_deltas_for_inventory(products[currency], shopify_connector, location_id)
+    Arguments:
+        location_products {dict} -- Products by Shopify location id
+        shopify_connector {ShopifyConnector} -- Connector of the shop
+        currency {str} -- Currency of the shop
+        snapshot {InventorySnapshot} -- Records the quantities Shopify holds after the update
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)
+    async with semaphore:
+        try:
+            LOGGER.debug(f'Process products for {currency}')
+            LOGGER.info('Fetching inventory levels from Shopify')
+            inventory_levels = await shopify_connector.get_inventory_levels(
+                {product['inventory_item_id'] for products in location_products.values() for product in products},
+                location_products.keys()
+            )
+            for location_id, products in location_products.items():
+                country_products = _create_deltas_for_inventory(products, inventory_levels.get(str(location_id), {}))
                 if len(country_products) > 0:
                     LOGGER.debug(f'Sending deltas to Shopify ({currency}) location {location_id}: {country_products}')
-                    await shopify_connector.update_inventory_quantity_graphql(country_products, location_id)
+                    inventory_levels_updated = await shopify_connector.update_inventory_quantity_graphql(
+                        country_products, location_id)
                 else:
                     LOGGER.debug(f'No deltas created for Shopify ({currency}) - no update send.')
-            except Exception:
-                LOGGER.exception(f'Failed to process bulk variant update for Shopify ({currency})')
-                raise
+                    inventory_levels_updated = []
+                if snapshot is not None:
+                    _record_snapshot(snapshot, location_id, country_products, inventory_levels_updated)
+        except Exception:
+            LOGGER.exception(f'Failed to process bulk variant update for Shopify ({currency})')
+            raise
+
 
+def _create_deltas_for_inventory(products, inventory_levels):
+    """Sets the delta between the exported ATP and the Shopify level on each product
 
-async def _create_deltas_for_inventory(products, shopify_connector, location_id):
-    LOGGER.info('Fetching inventory levels from Shopify')
-    inventory_shopify = _transform_to_dictionary_inventory_map(await shopify_connector.get_inventory_quantity(products, location_id))
-    LOGGER.debug('Response from transform ')
-    LOGGER.debug(inventory_shopify)
+    Arguments:
+        products {list} -- Products of one location
+        inventory_levels {dict} -- Available quantity by inventory item id at that location
+    """
     for product in products:
-        # RICKY: Can we get a group of products from Shopify GraphQL, instead of one by one??
-        formated_variant = f'gid://shopify/InventoryItem/{product["inventory_item_id"]}'
-        if formated_variant in inventory_shopify:
-            product['delta'] = product['atp'] - inventory_shopify[formated_variant]
+        if product['inventory_item_id'] in inventory_levels:
+            product['delta'] = product['atp'] - inventory_levels[product['inventory_item_id']]
     return products
 
 
-def _transform_to_dictionary_inventory_map(inventory_shopify_response):
-    result = {}
-    LOGGER.debug(f'Inventory Shopify Response: {inventory_shopify_response}')
-    if inventory_shopify_response is not None:
-        for inventory in inventory_shopify_response:
-            id_inventory = inventory.get('item', {}).get('id')
-            if id_inventory:
-                result[id_inventory] = inventory['available']
-    return result
+def _record_snapshot(snapshot, location_id, products, inventory_levels_updated):
+    """Records the quantities Shopify holds for the products after an update
+
+    Arguments:
+        products {list} -- Products of one location, with their deltas
+        inventory_levels_updated {list} -- Inventory levels returned by the bulk adjust mutation
+    """
+    for product in products:
+        if product.get('delta') == 0:
+            snapshot.record(product['inventory_item_id'], location_id, product['atp'])
+    for inventory_level in inventory_levels_updated:
+        inventory_item_id = inventory_level['item']['id'].rsplit('/', 1)[-1]
+        snapshot.record(inventory_item_id, location_id, inventory_level['available'])
 
 
 def _set_blocked_state(blocked):
@@ -74,24 +74,40 @@ def get_item(table_name, item, dynamodb=None, consistent_read=False):
             return None
 
 
-def get_all(table_name, dynamodb=None):
+def get_all(table_name, dynamodb=None, filter_expression=None):
     if not dynamodb:
         dynamodb = get_dynamodb_resource()
     table = dynamodb.Table(table_name)
+    scan_kwargs = {}
+    if filter_expression is not None:
+        scan_kwargs['FilterExpression'] = filter_expression
+    items = []
     try:
-        response = table.scan()
-        items = response.get('Items', [])
+        response = table.scan(**scan_kwargs)
+        items.extend(response.get('Items', []))
         while 'LastEvaluatedKey' in response:
             response = table.scan(
-                ExclusiveStartKey=response['LastEvaluatedKey']
+                ExclusiveStartKey=response['LastEvaluatedKey'],
+                **scan_kwargs
             )
-            items = items + response.get('Items', [])
+            items.extend(response.get('Items', []))
     except ClientError as e:
         logger.exception(str(e.response['Error']['Message']))
 
     return items
 
 
+def put_items(table_name, items, dynamodb=None):
+    if not dynamodb:
+        dynamodb = get_dynamodb_resource()
+    table = dynamodb.Table(table_name)
+    # The batch writer sends BatchWriteItem calls of 25 items and resends unprocessed ones
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+    logger.info("BatchWriteItem succeeded for %s items" % len(items))
+
+
 def update_item(table_name, schema, dynamodb=None):
     if not dynamodb:
         dynamodb = get_dynamodb_resource()
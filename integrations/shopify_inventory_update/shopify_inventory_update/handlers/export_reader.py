@@ -0,0 +1,215 @@
+import codecs
+import json
+import logging
+import os
+import zipfile
+
+LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
+LOG_LEVEL = logging.DEBUG if LOG_LEVEL_SET.lower() in ['debug'] else logging.INFO
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(LOG_LEVEL)
+
+CHUNK_SIZE = 64 * 1024
+# S3 requires every part but the last one to be at least 5 MB
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+class S3MultipartWriter:
+    """
+    File-like writer that uploads whatever is written to it as S3 multipart upload parts.
+    """
+
+    def __init__(self, s3_handler, content_type='application/json', part_size=MULTIPART_PART_SIZE):
+        self.s3_handler = s3_handler
+        self.content_type = content_type
+        self.part_size = part_size
+        self.part_number = 0
+        self.size = 0
+        self._buffer = bytearray()
+        self._started = False
+
+    def write(self, data):
+        self._buffer += data
+        self.size += len(data)
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+
+    def close(self):
+        if not self._started:
+            # Nothing or less than a part was written, a plain put is cheaper
+            self.s3_handler.put_object(data=bytes(self._buffer))
+            self._buffer = bytearray()
+            return
+        if self._buffer:
+            self._upload_part()
+        self.s3_handler.complete_multipart_upload()
+
+    def abort(self):
+        if self._started:
+            self.s3_handler.abort_multipart_upload()
+        self._buffer = bytearray()
+
+    def _upload_part(self):
+        if not self._started:
+            self.s3_handler.start_multipart_upload(metadata={}, content_type=self.content_type)
+            self._started = True
+        self.part_number += 1
+        self.s3_handler.add_multipart_upload(self.part_number, bytes(self._buffer))
+        self._buffer = bytearray()
+
+
+class TeeReader:
+    """
+    Wraps a binary stream and copies every chunk read from it to `sink`.
+    """
+
+    def __init__(self, stream, sink):
+        self.stream = stream
+        self.sink = sink
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        if data:
+            self.sink.write(data)
+        return data
+
+    def drain(self, chunk_size=CHUNK_SIZE):
+        while self.read(chunk_size):
+            pass
+
+
+def open_export_member(fileobj, is_zip):
+    """
+    Opens the export document for streaming reads; for zip archives the first
+    member is decompressed on the fly while it is read.
+
+    Arguments:
+        fileobj {file} -- Seekable binary file holding the downloaded export
+        is_zip {bool} -- Whether the file is a zip archive
+
+    Returns:
+        file -- Binary stream of the export document
+    """
+    fileobj.seek(0)
+    if not is_zip:
+        return fileobj
+    zipf = zipfile.ZipFile(fileobj, mode='r')
+    for subfile in zipf.namelist():
+        if subfile.startswith('__MACOSX'):
+            continue
+        # Assumes only one.
+        return zipf.open(subfile)
+    raise ValueError('Export zip file does not contain any file')
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yields the elements of the top-level JSON array in `stream` one at a time, holding
+    no more than one element plus one chunk in memory.
+
+    Arguments:
+        stream {file} -- Binary stream with UTF-8 encoded JSON
+        chunk_size {int} -- Number of bytes read at a time
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    eof = False
+    expecting = '['
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                raise ValueError('Unexpected end of export file')
+            data = stream.read(chunk_size)
+            eof = not data
+            buffer = buffer[pos:] + text_decoder.decode(data, final=eof)
+            pos = 0
+            continue
+
+        char = buffer[pos]
+        if expecting == '[':
+            if char != '[':
+                raise ValueError('Export file is not a JSON array')
+            pos += 1
+            expecting = 'value'
+            continue
+        if char == ']' and expecting in ('value', 'separator'):
+            return
+        if expecting == 'separator':
+            if char != ',':
+                raise ValueError(f'Expected "," in export file, got "{char}"')
+            pos += 1
+            expecting = 'value'
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            value, end = None, None
+        # A value that ends with the buffer might continue in the next chunk
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError('Invalid JSON in export file')
+            data = stream.read(chunk_size)
+            eof = not data
+            buffer = buffer[pos:] + text_decoder.decode(data, final=eof)
+            pos = 0
+            continue
+
+        pos = end
+        expecting = 'separator'
+        yield value
+
+
+def iter_export_variants(fileobj, is_zip, s3_handler=None):
+    """
+    Streams the variants of an availability export while copying the raw export
+    document to S3. The copy is completed even if the consumer stops early, as long
+    as the generator is closed.
+
+    Arguments:
+        fileobj {file} -- Seekable binary file holding the downloaded export
+        is_zip {bool} -- Whether the file is a zip archive
+        s3_handler {S3Handler} -- Destination of the export copy, skipped if None
+    """
+    stream = open_export_member(fileobj, is_zip)
+    writer = S3MultipartWriter(s3_handler) if s3_handler else None
+    reader = TeeReader(stream, writer) if writer else stream
+    finished = False
+    try:
+        yield from iter_json_array(reader)
+        finished = True
+    except GeneratorExit:
+        finished = True
+        raise
+    except Exception:
+        if writer:
+            _abort(writer)
+        raise
+    finally:
+        try:
+            if writer and finished:
+                try:
+                    reader.drain()
+                    writer.close()
+                except Exception:
+                    # Parts of an upload that is neither completed nor aborted stay billed
+                    _abort(writer)
+                    raise
+                LOGGER.info(f'Uploaded {writer.size} bytes of export file to s3')
+        finally:
+            stream.close()
+            fileobj.close()
+
+
+def _abort(writer):
+    try:
+        writer.abort()
+    except Exception: # pylint: disable=broad-except
+        LOGGER.exception('Aborting the upload of the export file to s3 failed')
@@ -0,0 +1,101 @@
+import logging
+import os
+import time
+
+from boto3.dynamodb.conditions import Attr # pylint: disable=import-error
+
+from shopify_inventory_update.handlers.dynamodb_handler import get_all, put_items
+
+LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
+LOG_LEVEL = logging.DEBUG if LOG_LEVEL_SET.lower() in ['debug'] else logging.INFO
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(LOG_LEVEL)
+
+SNAPSHOT_PREFIX = 'inventory_snapshot#'
+MAX_AGE_SECONDS = int(os.environ.get('INVENTORY_SNAPSHOT_MAX_AGE_SECONDS', '86400') or '86400')
+
+
+class InventorySnapshot:
+    """
+    Last quantities pushed to Shopify, keyed by (inventory_item_id, location_id).
+
+    Every entry is stored as one row of the job state table with the identifier
+    `inventory_snapshot#<location_id>#<inventory_item_id>`. Entries older than
+    `max_age_seconds` are ignored when loading, so quantities changed in Shopify
+    itself (orders, manual adjustments) are reconciled at least once per period.
+    Rows carry an `expires_at` attribute, the TTL attribute of the table, so
+    DynamoDB deletes them once they are expired, e.g. for discontinued items.
+    """
+
+    def __init__(self, table_name, max_age_seconds=MAX_AGE_SECONDS, scan=get_all, put=put_items):
+        self.table_name = table_name
+        self.max_age_seconds = max_age_seconds
+        self._scan = scan
+        self._put = put
+        self._entries = {}
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        """
+        Reads the snapshot rows that are not expired from the table
+
+        Returns:
+            int -- Number of entries loaded
+        """
+        rows = self._scan(
+            table_name=self.table_name,
+            filter_expression=Attr('identifier').begins_with(SNAPSHOT_PREFIX)
+        )
+        oldest = time.time() - self.max_age_seconds
+        self._entries = {}
+        for row in rows:
+            if row.get('pushed_at') is None or row['pushed_at'] < oldest:
+                continue
+            location_id, inventory_item_id = row['identifier'][len(SNAPSHOT_PREFIX):].split('#', 1)
+            self._entries[(inventory_item_id, location_id)] = int(row['available'])
+        LOGGER.info(f'Loaded {len(self._entries)} entries of the inventory snapshot, {len(rows)} rows read')
+        return len(self._entries)
+
+    def get(self, inventory_item_id, location_id):
+        return self._entries.get((str(inventory_item_id), str(location_id)))
+
+    def is_unchanged(self, inventory_item_id, location_id, atp):
+        """
+        Returns True if `atp` is the quantity last pushed for the item at the location
+        """
+        return self.get(inventory_item_id, location_id) == atp
+
+    def record(self, inventory_item_id, location_id, available):
+        """
+        Remembers the quantity Shopify holds for the item at the location; written by save()
+        """
+        key = (str(inventory_item_id), str(location_id))
+        self._entries[key] = available
+        self._pending[key] = available
+
+    def save(self):
+        """
+        Writes the entries recorded since the last save to the table
+
+        Returns:
+            int -- Number of entries written
+        """
+        if not self._pending:
+            return 0
+        pushed_at = int(time.time())
+        items = [
+            {
+                'identifier': f'{SNAPSHOT_PREFIX}{location_id}#{inventory_item_id}',
+                'available': available,
+                'pushed_at': pushed_at,
+                'expires_at': pushed_at + self.max_age_seconds
+            }
+            for (inventory_item_id, location_id), available in self._pending.items()
+        ]
+        self._put(table_name=self.table_name, items=items)
+        self._pending = {}
+        LOGGER.info(f'Saved {len(items)} entries of the inventory snapshot')
+        return len(items)
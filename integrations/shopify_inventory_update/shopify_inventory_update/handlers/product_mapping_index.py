@@ -0,0 +1,82 @@
+import logging
+import os
+import time
+
+from shopify_inventory_update.handlers.dynamodb_handler import get_all
+
+LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
+LOG_LEVEL = logging.DEBUG if LOG_LEVEL_SET.lower() in ['debug'] else logging.INFO
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(LOG_LEVEL)
+
+# Age after which the index is rebuilt from a full scan of the table
+REFRESH_SECONDS = int(os.environ.get('MAPPING_REFRESH_SECONDS', '900') or '0')
+
+# Indexes are kept per table at module level so a warm container reuses them
+_INDEXES = {}
+
+
+class ProductMappingIndex:
+    """
+    In-memory index of the product inventory mapping table, keyed by product SKU.
+
+    The index is built with one full scan and reused by warm invocations for
+    `refresh_seconds`, then rebuilt with another full scan. The mapping rows carry no
+    modification time, so changes to the table are only picked up by that rebuild.
+    """
+
+    def __init__(self, table_name, key_attribute='product_sku', value_attribute='shopify_inventory_item_id',
+                 refresh_seconds=REFRESH_SECONDS, scan=get_all):
+        self.table_name = table_name
+        self.key_attribute = key_attribute
+        self.value_attribute = value_attribute
+        self.refresh_seconds = refresh_seconds
+        self.last_refresh = None
+        self._scan = scan
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        return self._entries.get(key, default)
+
+    def refresh(self, force=False):
+        """
+        Rebuilds the index from a full scan unless it was built within `refresh_seconds`.
+
+        Arguments:
+            force {bool} -- Rebuild the index regardless of its age
+
+        Returns:
+            int -- Number of rows read from the table
+        """
+        if not force and not self._is_expired():
+            return 0
+        LOGGER.info(f'Building product mapping index from a full scan of {self.table_name}')
+        rows = self._scan(table_name=self.table_name)
+        self._entries = {
+            row[self.key_attribute]: row.get(self.value_attribute)
+            for row in rows if row.get(self.key_attribute) is not None
+        }
+        self.last_refresh = time.monotonic()
+        LOGGER.info(f'Product mapping index holds {len(self._entries)} entries')
+        return len(rows)
+
+    def _is_expired(self):
+        return self.last_refresh is None or time.monotonic() - self.last_refresh >= self.refresh_seconds
+
+
+def get_product_mapping_index(table_name, refresh=True):
+    """
+    Returns the module level index for the table, refreshing it first by default.
+    """
+    index = _INDEXES.get(table_name)
+    if index is None:
+        index = _INDEXES[table_name] = ProductMappingIndex(table_name)
+    if refresh:
+        index.refresh()
+    return index
@@ -4,12 +4,21 @@ import json
 import os
 import aiohttp
 import base64
+import time
+
+from shopify_inventory_update.handlers.shopify_rate_limiter import get_limiter
 
 LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
 LOG_LEVEL = logging.DEBUG if LOG_LEVEL_SET.lower() in ['debug'] else logging.INFO
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(LOG_LEVEL)
 MAX_ATTEMPTS = int(os.environ.get('MAX_ATTEMPTS', '5') or '5')
+RETRY_DELAY = 3
+MAX_NODES_PER_QUERY = 250
+MAX_READ_QUERY_COST = 900
+CONNECTIONS_PER_HOST = int(os.environ.get('SHOPIFY_CONNECTIONS_PER_HOST', '8') or '8')
+KEEPALIVE_TIMEOUT = 30
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=60)
 
 SHOPIFY_HOST = 'myshopify.com/admin/'
 
@@ -30,90 +39,99 @@ class ShopifyConnector:
             )
         }
         self.shop = shop
+        self.limiter = get_limiter(shop)
+        self._session = None
+        self._session_loop = None
         if not url:
             self.url = 'https://{shop}.{host}'.format(
                 shop=shop, host=host)
         else:
             self.url = url
 
-    async def update_inventory_quantity_graphql(self, variant_list: list, location_id: int, attempts=0):
-        attempts += 1
-        LOGGER.debug(f'Updating variants:\n{json.dumps(variant_list)}')
-        LOGGER.info(f'Update attempt: {attempts}')
-        url_inventory = '{url}api/graphql.json'.format(
-            url=self.url)
-        if len(variant_list) > 100:
-            LOGGER.warning(
-                'Inventory GraphQL bulk update cannot process more than 100 items at a time')
-            raise Exception(
-                'Too much items to process, limit update to 100 for each call')
+    async def __aenter__(self):
+        return self
 
-        mutation = """
-        mutation inventoryBulkAdjustQuantityAtLocation($inventoryItemAdjustments: [InventoryAdjustItemInput!]!, $locationId: ID!) {
-            inventoryBulkAdjustQuantityAtLocation(inventoryItemAdjustments: $inventoryItemAdjustments, locationId: $locationId) {
-                userErrors {
-                    field
-                    message
-                }
-                inventoryLevels {
-                    available
-                        item {
-                            id
-                        }
-                    }
-                }
-            }
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def get_session(self):
         """
-        query = {
-            "inventoryItemAdjustments": [
-                {
-                    "inventoryItemId": f'gid://shopify/InventoryItem/{variant["inventory_item_id"]}',
-                    "availableDelta": int(variant['delta'])
-                } for variant in variant_list if 'delta' in variant and variant['delta'] != 0
-            ],
-            "locationId": f'gid://shopify/Location/{location_id}'
-        }
-        LOGGER.debug(f'Calling {url_inventory} with payload {query}')
-        if len(query['inventoryItemAdjustments']) > 0:
-            async with aiohttp.ClientSession() as session:
-                async with await session.post(url=url_inventory, headers=self.auth_header, json={'query': mutation, 'variables': query}) as response:
+        Returns the session shared by all requests of this connector. A session is bound to
+        its event loop, so a connector reused by a later lambda invocation opens a new one.
+        Returns:
+            aiohttp.ClientSession -- Session with keep-alive connections to the shop
+        """
+        loop = asyncio.get_event_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=CONNECTIONS_PER_HOST,
+                    keepalive_timeout=KEEPALIVE_TIMEOUT,
+                    ttl_dns_cache=300
+                ),
+                headers=self.auth_header,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=REQUEST_TIMEOUT
+            )
+            self._session_loop = loop
+        return self._session
+
+    async def close(self):
+        """
+        Close the session; call at the end of the lambda invocation before the event loop closes
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def _post_graphql(self, operation, query, variables):
+        """
+        Sends a GraphQL request paced by the cost limiter of the shop and retries it when throttled
+        Arguments:
+            operation {str} -- Name of the operation, used to learn its query cost
+            query {str} -- GraphQL query or mutation
+            variables {dict} -- GraphQL variables
+        Returns:
+            dict -- The response body
+        """
+        url_inventory = '{url}api/graphql.json'.format(
+            url=self.url)
+        # Serialized once, retries send the same body
+        payload = json.dumps({'query': query, 'variables': variables})
+        LOGGER.debug(f'Calling {url_inventory} with payload {variables}')
+        session = self.get_session()
+
+        for attempts in range(1, MAX_ATTEMPTS + 2):
+            reserved_cost = await self.limiter.acquire(operation)
+            started_at = time.monotonic()
+            cost = None
+            try:
+                async with session.post(url=url_inventory, data=payload) as response:
                     if response.status == 429 or response.status >= 502:
-                        LOGGER.warning(f'update_inventory_quantity_graphql - Shopify shop api limit reached - {response.status} - Attempts: {attempts}')
-                        if attempts <= MAX_ATTEMPTS:
-                            asyncio.sleep(3)
-                            return await self.update_inventory_quantity_graphql(variant_list, location_id, attempts)
-                        else:
-                            raise Exception('update_inventory_quantity_graphql - Shopify shop api limit reached')
+                        LOGGER.warning(f'{operation} - Shopify shop api limit reached - {response.status} - Attempts: {attempts}')
+                        self.limiter.record_throttled()
+                        await asyncio.sleep(RETRY_DELAY)
+                        continue
 
                     response_body = await response.json()
                     response.raise_for_status()
+                    cost = response_body.get('extensions', {}).get('cost')
+            finally:
+                self.limiter.release(operation, reserved_cost, cost, time.monotonic() - started_at)
 
-                    if len(response_body.get('errors', [])) > 0:
-                        for error in response_body['errors']:
-                            if error['message'] == 'Throttled':
-                                LOGGER.warning(f'update_inventory_quantity_graphql - Shopify shop api limit reached - Attempts: {attempts}')
-                                if attempts <= MAX_ATTEMPTS:
-                                    asyncio.sleep(3)
-                                    return await self.update_inventory_quantity_graphql(variant_list, location_id, attempts)
-                                raise Exception('update_inventory_quantity_graphql - Shopify shop api limit reached')
-
+            if any(error.get('message') == 'Throttled' for error in response_body.get('errors', [])):
+                # The limiter has been synchronised with the bucket, the next acquire waits as long as needed
+                LOGGER.warning(f'{operation} - Shopify shop api limit reached - Attempts: {attempts}')
+                self.limiter.record_throttled()
+                continue
 
+            return response_body
 
-                    if len(response_body.get('data', {}).get('inventoryBulkAdjustQuantityAtLocation', {}).get('userErrors', [])) > 0:
-                        errors = response_body['data']['inventoryBulkAdjustQuantityAtLocation']['userErrors']
-                        LOGGER.warning(f'Error processing bulk update: {json.dumps(errors)}')
-                        raise Exception(errors)
-                    LOGGER.debug(f'Updated variants with {json.dumps(response_body)}')
-                    return response_body.get('data', {}).get('inventoryBulkAdjustQuantityAtLocation', {}).get('inventoryLevels', [])
-        else:
-            LOGGER.info('No deltas to process, rejecting this inventory update..')
-            return []
+        raise Exception(f'{operation} - Shopify shop api limit reached')
 
-    async def get_inventory_quantity(self, variant_list: list, location_id: int, attempts=0):
-        attempts += 1
-        LOGGER.debug(f'Getting variants inventory levels from Shopify for variant_list: {variant_list}')
-        url_inventory = '{url}api/graphql.json'.format(
-            url=self.url)
+    async def update_inventory_quantity_graphql(self, variant_list: list, location_id: int):
+        LOGGER.debug(f'Updating variants:\n{json.dumps(variant_list)}')
         if len(variant_list) > 100:
             LOGGER.warning(
                 'Inventory GraphQL bulk update cannot process more than 100 items at a time')
@@ -140,74 +158,90 @@ class ShopifyConnector:
             "inventoryItemAdjustments": [
                 {
                     "inventoryItemId": f'gid://shopify/InventoryItem/{variant["inventory_item_id"]}',
-                    "availableDelta": 0
-                } for variant in variant_list
+                    "availableDelta": int(variant['delta'])
+                } for variant in variant_list if 'delta' in variant and variant['delta'] != 0
             ],
             "locationId": f'gid://shopify/Location/{location_id}'
         }
-        LOGGER.debug(f'Calling {url_inventory} with payload: \n{query}')
-        dummy_jar = aiohttp.DummyCookieJar()
-        async with aiohttp.ClientSession(cookie_jar=dummy_jar) as session:
-            async with await session.post(url=url_inventory, headers=self.auth_header, json={'query': mutation, 'variables': query}) as response:
-                if response.status == 429 or response.status >= 502:
-                    LOGGER.warning(f'get_inventory_quantity - Shopify shop api limit reached {response.status} - Attempts: {attempts}')
-                    if attempts <= MAX_ATTEMPTS:
-                        asyncio.sleep(3)
-                        return await self.get_inventory_quantity(variant_list, location_id, attempts)
-                    raise Exception('get_inventory_quantity - Shopify shop api limit reached')
-
-                response_body = await response.json()
-                response.raise_for_status()
-                LOGGER.debug(f'Response - get_inventory_quantity: {response_body}')
-
-                if len(response_body.get('errors', [])) > 0:
-                    for error in response_body['errors']:
-                        if error['message'] == 'Throttled':
-                            LOGGER.warning(f'get_inventory_quantity - Shopify shop api limit reached - Attempts: {attempts}')
-                            if attempts <= MAX_ATTEMPTS:
-                                asyncio.sleep(3)
-                                return await self.get_inventory_quantity(variant_list, location_id, attempts)
-                            raise Exception('get_inventory_quantity - Shopify shop api limit reached')
-
-                if len(response_body.get('data', {}).get('inventoryBulkAdjustQuantityAtLocation', {}).get('userErrors', [])) > 0:
-                    errors = response_body['data']['inventoryBulkAdjustQuantityAtLocation']['userErrors']
-                    LOGGER.warning(f'Error processing bulk update: {json.dumps(errors)}')
-                    # Limit number of retries
-                    if attempts <= MAX_ATTEMPTS:
-                        LOGGER.info(f'Remove variants or Setting Inventory. Attempts: {attempts}')
+        if len(query['inventoryItemAdjustments']) == 0:
+            LOGGER.info('No deltas to process, rejecting this inventory update..')
+            return []
+
+        response_body = await self._post_graphql('update_inventory_quantity_graphql', mutation, query)
+
+        if len(response_body.get('data', {}).get('inventoryBulkAdjustQuantityAtLocation', {}).get('userErrors', [])) > 0:
+            errors = response_body['data']['inventoryBulkAdjustQuantityAtLocation']['userErrors']
+            LOGGER.warning(f'Error processing bulk update: {json.dumps(errors)}')
+            raise Exception(errors)
+        LOGGER.debug(f'Updated variants with {json.dumps(response_body)}')
+        return response_body.get('data', {}).get('inventoryBulkAdjustQuantityAtLocation', {}).get('inventoryLevels', [])
+
+    async def get_inventory_levels(self, inventory_item_ids, location_ids, stock_missing=True):
+        """
+        Reads the available quantities of inventory items at one or more locations with read-only
+        `nodes` queries, fetching the levels of all locations for an item in the same query.
+        Arguments:
+            inventory_item_ids {iterable} -- Shopify inventory item ids (numeric)
+            location_ids {iterable} -- Shopify location ids (numeric)
+            stock_missing {bool} -- Stock items at locations where they are not stocked yet, with 0
+        Returns:
+            dict -- {location_id: {inventory_item_id: available}}, unknown items are left out
+        """
+        item_ids = [str(item_id) for item_id in dict.fromkeys(inventory_item_ids)]
+        location_ids = [str(location_id) for location_id in location_ids]
+        levels = {location_id: {} for location_id in location_ids}
+        if not item_ids or not location_ids:
+            return levels
+
+        query = _inventory_levels_query(len(location_ids))
+        # Every item costs one point plus one per location level
+        chunk_size = max(1, min(MAX_NODES_PER_QUERY, MAX_READ_QUERY_COST // (1 + len(location_ids))))
+        for start in range(0, len(item_ids), chunk_size):
+            chunk = item_ids[start:start + chunk_size]
+            variables = {'ids': [f'gid://shopify/InventoryItem/{item_id}' for item_id in chunk]}
+            for index, location_id in enumerate(location_ids):
+                variables[f'location{index}'] = f'gid://shopify/Location/{location_id}'
+
+            response_body = await self._post_graphql(
+                f'get_inventory_levels_{len(location_ids)}', query, variables)
+            if response_body.get('errors'):
+                LOGGER.warning(f'Error reading inventory levels: {json.dumps(response_body["errors"])}')
+                raise Exception(response_body['errors'])
+
+            for node in response_body.get('data', {}).get('nodes', []):
+                if not node:
+                    continue
+                item_id = node['id'].rsplit('/', 1)[-1]
+                for index, location_id in enumerate(location_ids):
+                    level = node.get(f'location{index}')
+                    if level is not None:
+                        levels[location_id][item_id] = level['available']
+                    elif stock_missing:
+                        LOGGER.info('The product is not stocked and hence setting inventory')
                         try:
-                            indexes = [int(error['field'][1]) for error in errors]
-                            indexes.reverse()
-                            error_index = len(indexes) -1
-                        except:
-                            LOGGER.warning('Failed to handle errors aborting.')
-                            return None
-
-                        for idx in indexes:
-                            LOGGER.info(f'errors[error_index]: {errors[error_index]}')
-                            if errors[error_index]["message"].startswith(
-                                    'Quantity couldn\'t be adjusted because this product isn\'t stocked at'):
-                                LOGGER.info('The product is not stocked and hence setting inventory')
-                                try:
-                                    await self.set_inventory_level(variant_list[idx]["inventory_item_id"], location_id, session)
-                                except Exception as error:
-                                    variant_removed = variant_list.pop(idx)
-                                    LOGGER.info(f'Exception thrown: {error} - Removed variant at index: {idx} value: {variant_removed}')
-                            else:
-                                variant_removed = variant_list.pop(idx)
-                                LOGGER.info(f'Removed variant at index: {idx} value: {variant_removed}')
-                            error_index = error_index-1
-                        asyncio.sleep(3)
-                        return await self.get_inventory_quantity(variant_list, location_id, attempts)
-                    else:
-                        LOGGER.warning('Too many attempts to get/set inventory levels at Shopify.')
-                        raise Exception(errors)
-                LOGGER.debug(f'Inventory variants list with: \n{response_body}')
-                if response_body.get('extensions', {}).get('cost', {}).get('throttleStatus', {}).get('currentlyAvailable', {}) < 100:
-                    LOGGER.info(f'Credits currently available lower than 100:\n{response_body}')
-                return response_body.get('data', {}).get('inventoryBulkAdjustQuantityAtLocation', {}).get('inventoryLevels', [])
-
-    async def get_locations(self, session):
+                            await self.set_inventory_level(item_id, location_id)
+                            levels[location_id][item_id] = 0
+                        except Exception as error:
+                            LOGGER.info(f'Exception thrown: {error} - Skipping inventory item {item_id}')
+
+        LOGGER.debug(f'Inventory levels from Shopify: {levels}')
+        return levels
+
+    async def get_inventory_quantity(self, variant_list: list, location_id: int):
+        """
+        Reads the inventory levels of the variants at one location
+        Returns:
+            list -- [{'available': int, 'item': {'id': inventory item gid}}]
+        """
+        LOGGER.debug(f'Getting variants inventory levels from Shopify for variant_list: {variant_list}')
+        levels = await self.get_inventory_levels(
+            [variant['inventory_item_id'] for variant in variant_list], [location_id])
+        return [
+            {'available': available, 'item': {'id': f'gid://shopify/InventoryItem/{item_id}'}}
+            for item_id, available in levels[str(location_id)].items()
+        ]
+
+    async def get_locations(self, session=None):
         """
         Get shopify list of products filtered to only show the variants
         Arguments:
@@ -223,6 +257,7 @@ class ShopifyConnector:
 
         LOGGER.info(f'Calling {url}')
 
+        session = session or self.get_session()
         async with await session.get(url=url, headers=self.auth_header, params={"active": "true"}) as response:
             used, maximum = _get_rate_limits(response)
             if used and maximum:
@@ -235,7 +270,7 @@ class ShopifyConnector:
 
             return locations_response
 
-    async def set_inventory_level(self, inv_item_id, location_id, session, atp=0):
+    async def set_inventory_level(self, inv_item_id, location_id, session=None, atp=0):
         LOGGER.info(f'Setting inventory ATP 0 for inventory_item_id {inv_item_id} and location_id {location_id}')
 
         url_inventory = f'{self.url}inventory_levels/set.json'
@@ -248,18 +283,38 @@ class ShopifyConnector:
 
         LOGGER.debug(f'Calling {url_inventory} with payload {json.dumps(inventory_data)}')
 
+        session = session or self.get_session()
         async with await session.post(url=url_inventory, headers=self.auth_header, json=inventory_data) as response:
             response_body = await response.json()
             if response.status == 429:
                 LOGGER.warning('set_inventory_level - Shopify shop api limit reached')
-                return await asyncio.ensure_future(
-                    self.set_inventory_level(inv_item_id, location_id, session))
+                await asyncio.sleep(RETRY_DELAY)
+                return await self.set_inventory_level(inv_item_id, location_id, session, atp)
             if 'errors' in response_body:
                 raise Exception(response_body['errors'][0])
             response.raise_for_status()
             LOGGER.info(f'Response - set_inventory_level: {json.dumps(response_body)}')
             return response_body
 
+def _inventory_levels_query(location_count):
+    locations = range(location_count)
+    variables = ', '.join(f'$location{index}: ID!' for index in locations)
+    levels = '\n'.join(
+        f'                    location{index}: inventoryLevel(locationId: $location{index}) {{ available }}'
+        for index in locations
+    )
+    return f"""
+        query inventoryLevels($ids: [ID!]!, {variables}) {{
+            nodes(ids: $ids) {{
+                ... on InventoryItem {{
+                    id
+{levels}
+                }}
+            }}
+        }}
+        """
+
+
 def _get_rate_limits(response):
     try:
         thresholds = response.headers.get(
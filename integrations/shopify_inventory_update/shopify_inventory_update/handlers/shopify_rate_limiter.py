@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import os
+import time
+
+LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
+LOG_LEVEL = logging.DEBUG if LOG_LEVEL_SET.lower() in ['debug'] else logging.INFO
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(LOG_LEVEL)
+
+# Defaults of a standard Shopify plan until the first response reports the real bucket
+DEFAULT_MAXIMUM_AVAILABLE = 1000.0
+DEFAULT_RESTORE_RATE = 50.0
+DEFAULT_QUERY_COST = 100.0
+
+# Limiters are shared by all connectors of a shop within the container
+_LIMITERS = {}
+
+
+class ShopifyCostLimiter:
+    """
+    Leaky bucket mirroring the Shopify GraphQL cost bucket of one shop.
+
+    Each request reserves its expected cost before it is sent, waiting until the bucket
+    has restored enough points. The bucket is re-synchronised with the `extensions.cost`
+    data of every response, and the expected cost of an operation is learned from its
+    last `requestedQueryCost`.
+    """
+
+    def __init__(self, maximum_available=DEFAULT_MAXIMUM_AVAILABLE, restore_rate=DEFAULT_RESTORE_RATE):
+        self.maximum_available = maximum_available
+        self.restore_rate = restore_rate
+        self.wait_seconds = 0.0
+        self.work_seconds = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self._available = maximum_available
+        self._updated_at = time.monotonic()
+        self._in_flight_cost = 0.0
+        self._costs = {}
+        self._lock = None
+        self._lock_loop = None
+
+    def available(self):
+        elapsed = time.monotonic() - self._updated_at
+        return min(self.maximum_available, self._available + elapsed * self.restore_rate)
+
+    def expected_cost(self, operation):
+        return min(self._costs.get(operation, DEFAULT_QUERY_COST), self.maximum_available)
+
+    async def acquire(self, operation):
+        """
+        Wait until the bucket holds the expected cost of `operation` and reserve it
+
+        Returns:
+            float -- The reserved cost, to be passed to release()
+        """
+        cost = self.expected_cost(operation)
+        started_at = time.monotonic()
+        async with self._get_lock():
+            available = self.available()
+            if available < cost:
+                delay = (cost - available) / self.restore_rate
+                LOGGER.debug(f'Waiting {delay:.2f}s for {cost} Shopify query cost points')
+                await asyncio.sleep(delay)
+                available = self.available()
+            self._available = available - cost
+            self._updated_at = time.monotonic()
+            self._in_flight_cost += cost
+        self.wait_seconds += time.monotonic() - started_at
+        return cost
+
+    def _get_lock(self):
+        # The limiter outlives the event loop of a lambda invocation, the lock must not
+        loop = asyncio.get_event_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def release(self, operation, reserved_cost, cost=None, work_seconds=0.0):
+        """
+        Give back a reservation and re-synchronise the bucket with the cost data of the response
+
+        Arguments:
+            operation {str} -- Name of the GraphQL operation
+            reserved_cost {float} -- Value returned by acquire()
+            cost {dict} -- The `extensions.cost` of the response, if any
+            work_seconds {float} -- Time spent on the request
+        """
+        self._in_flight_cost = max(0.0, self._in_flight_cost - reserved_cost)
+        self.requests += 1
+        self.work_seconds += work_seconds
+        if not cost:
+            return
+
+        if cost.get('requestedQueryCost') is not None:
+            self._costs[operation] = float(cost['requestedQueryCost'])
+        throttle_status = cost.get('throttleStatus') or {}
+        if throttle_status.get('maximumAvailable'):
+            self.maximum_available = float(throttle_status['maximumAvailable'])
+        if throttle_status.get('restoreRate'):
+            self.restore_rate = float(throttle_status['restoreRate'])
+        if throttle_status.get('currentlyAvailable') is not None:
+            # Other requests still in flight have not been charged by Shopify yet
+            self._available = float(throttle_status['currentlyAvailable']) - self._in_flight_cost
+            self._updated_at = time.monotonic()
+
+    def record_throttled(self):
+        self.throttled += 1
+
+    def metrics(self):
+        return {
+            'requests': self.requests,
+            'throttled': self.throttled,
+            'wait_seconds': round(self.wait_seconds, 3),
+            'work_seconds': round(self.work_seconds, 3),
+            'currently_available': round(self.available(), 1),
+            'restore_rate': self.restore_rate
+        }
+
+
+def get_limiter(shop):
+    """
+    Returns the limiter shared by all requests to `shop`
+    """
+    limiter = _LIMITERS.get(shop)
+    if limiter is None:
+        limiter = _LIMITERS[shop] = ShopifyCostLimiter()
+    return limiter
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+
+from shopify_inventory_update.handlers.sqs_handler import MAX_BATCH_ENTRIES
+
+LOG_LEVEL_SET = os.environ.get('LOG_LEVEL', 'INFO') or 'INFO'
+LOG_LEVEL = logging.DEBUG if LOG_LEVEL_SET.lower() in ['debug'] else logging.INFO
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(LOG_LEVEL)
+
+MAX_WORKERS = int(os.environ.get('SQS_CONSUMER_MAX_WORKERS', '10') or '10')
+WAIT_TIME_SECONDS = int(os.environ.get('SQS_CONSUMER_WAIT_TIME_SECONDS', '5') or '5')
+
+
+class SqsConsumer:
+    """
+    Long-polls a queue and processes the messages concurrently with a bounded number of workers.
+
+    `process_message` is awaited with each received message and returns True when the message
+    can be deleted. Deletes are sent with DeleteMessageBatch. Messages that fail are left in the
+    queue and become visible again after the visibility timeout.
+
+    The consumer stops when a receive comes back empty or `should_stop()` returns True; in the
+    latter case no new messages are received but the ones already in progress are finished.
+    """
+
+    def __init__(self, sqs_handler, process_message, max_workers=MAX_WORKERS, wait_time_seconds=WAIT_TIME_SECONDS):
+        self.sqs_handler = sqs_handler
+        self.process_message = process_message
+        self.max_workers = max_workers
+        self.wait_time_seconds = wait_time_seconds
+        self.processed_count = 0
+        self.failed_count = 0
+        self._tasks = set()
+        self._to_delete = []
+
+    async def run(self, should_stop=lambda: False):
+        """
+        Consume messages until the queue is drained or should_stop() returns True
+
+        Returns:
+            bool -- True if the queue was drained
+        """
+        drained = False
+        try:
+            while not should_stop():
+                if len(self._tasks) >= self.max_workers:
+                    await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                max_messages = min(MAX_BATCH_ENTRIES, self.max_workers - len(self._tasks))
+                messages = await self.sqs_handler.get_messages(
+                    max_messages=max_messages, wait_time_seconds=self.wait_time_seconds)
+                if not messages:
+                    drained = True
+                    break
+
+                for message in messages:
+                    task = asyncio.ensure_future(self._handle(message))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+        finally:
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._delete(flush=True)
+
+        LOGGER.info(f'Processed {self.processed_count} messages from queue {self.sqs_handler.queue_name}, '
+                    f'{self.failed_count} failed')
+        return drained
+
+    async def _handle(self, message):
+        try:
+            success = await self.process_message(message)
+        except Exception:
+            LOGGER.exception(f'Failed to process message {message.get("MessageId")}')
+            success = False
+
+        if not success:
+            self.failed_count += 1
+            return
+        self.processed_count += 1
+        self._to_delete.append(message['ReceiptHandle'])
+        await self._delete()
+
+    async def _delete(self, flush=False):
+        while len(self._to_delete) >= MAX_BATCH_ENTRIES or (flush and self._to_delete):
+            receipt_handles = self._to_delete[:MAX_BATCH_ENTRIES]
+            del self._to_delete[:MAX_BATCH_ENTRIES]
+            try:
+                await self.sqs_handler.delete_message_batch(receipt_handles)
+            except Exception:
+                LOGGER.exception(f'Failed to delete {len(receipt_handles)} processed messages')
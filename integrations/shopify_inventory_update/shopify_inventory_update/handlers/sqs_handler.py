@@ -1,10 +1,19 @@
 import aiobotocore
 from aiobotocore.session import get_session
+from contextlib import AsyncExitStack, asynccontextmanager
 import logging
 import asyncio
+import os
 
 logger = logging.getLogger(__name__)
 
+# SendMessageBatch accepts at most 10 entries and 256 KB of payload per call
+MAX_BATCH_ENTRIES = 10
+MAX_BATCH_BYTES = 256 * 1024
+MAX_IN_FLIGHT_BATCHES = int(os.environ.get('SQS_MAX_IN_FLIGHT_BATCHES', '8') or '8')
+MAX_SEND_ATTEMPTS = int(os.environ.get('SQS_MAX_SEND_ATTEMPTS', '5') or '5')
+RETRY_BASE_DELAY = 0.2
+
 
 class SqsHandler:
     def __init__(self, queue_name, queue_url=None, profile_name=None):
@@ -16,13 +25,45 @@ class SqsHandler:
         self.profile_name = profile_name
         self.session = get_session()
         self.sqs_url = queue_url
+        self._client = None
+        self._exit_stack = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """
+        Open a long-lived client used by all calls until close() is called
+        """
+        if self._client is None:
+            self._exit_stack = AsyncExitStack()
+            self._client = await self._exit_stack.enter_async_context(self.session.create_client('sqs'))
+        return self._client
+
+    async def close(self):
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+        self._client = None
+        self._exit_stack = None
+
+    @asynccontextmanager
+    async def _client_context(self):
+        if self._client is not None:
+            yield self._client
+        else:
+            async with self.session.create_client('sqs') as client:
+                yield client
 
     async def load_queues_info(self):
         if not self.sqs_url:
             self.sqs_url = await self.get_sqs_queue_url()
 
     async def get_sqs_queue_url(self):
-        async with self.session.create_client('sqs') as client:
+        async with self._client_context() as client:
             return (await client.get_queue_url(QueueName=self.queue_name))['QueueUrl']
 
     async def push_message(self, message):
@@ -37,7 +78,7 @@ class SqsHandler:
                 queue_name=self.queue_name))
             await self.load_queues_info()
             if message:
-                async with self.session.create_client('sqs') as client:
+                async with self._client_context() as client:
                     response = await client.send_message(
                         MessageBody=message,
                         QueueUrl=self.sqs_url
@@ -52,6 +93,19 @@ class SqsHandler:
 
         return response
 
+    async def push_message_batch(self, entries):
+        """
+        Push up to 10 messages into sqs queue with one call
+        :param entries: list of {'Id': ..., 'MessageBody': ...}
+        :return response: containing the 'Successful' and 'Failed' entries
+        """
+        await self.load_queues_info()
+        async with self._client_context() as client:
+            return await client.send_message_batch(
+                QueueUrl=self.sqs_url,
+                Entries=entries
+            )
+
     async def get_message(self):
         """
         Pull message from sqs queue
@@ -60,7 +114,7 @@ class SqsHandler:
         message = None
         try:
             await self.load_queues_info()
-            async with self.session.create_client('sqs') as client:
+            async with self._client_context() as client:
                 message = await client.receive_message(
                     QueueUrl=self.sqs_url,
                     AttributeNames=[
@@ -77,6 +131,32 @@ class SqsHandler:
             raise
         return message
 
+    async def get_messages(self, max_messages=MAX_BATCH_ENTRIES, wait_time_seconds=20):
+        """
+        Long-poll up to 10 messages from sqs queue
+        :param max_messages:
+        :param wait_time_seconds:
+        :return messages: list, empty when no message arrived within the wait time
+        """
+        try:
+            await self.load_queues_info()
+            async with self._client_context() as client:
+                response = await client.receive_message(
+                    QueueUrl=self.sqs_url,
+                    AttributeNames=[
+                        'SentTimestamp'
+                    ],
+                    MaxNumberOfMessages=max_messages,
+                    MessageAttributeNames=[
+                        'All'
+                    ],
+                    WaitTimeSeconds=wait_time_seconds
+                )
+        except Exception as ex:
+            logger.exception(ex)
+            raise
+        return response.get('Messages', [])
+
     async def delete_message(self, receipt_handle):
         """
         Delete message from sqs queue
@@ -84,7 +164,7 @@ class SqsHandler:
         """
         try:
             await self.load_queues_info()
-            async with self.session.create_client('sqs') as client:
+            async with self._client_context() as client:
                 return await client.delete_message(
                     QueueUrl=self.sqs_url,
                     ReceiptHandle=receipt_handle
@@ -95,13 +175,38 @@ class SqsHandler:
             logger.exception(ex)
             raise
 
+    async def delete_message_batch(self, receipt_handles):
+        """
+        Delete up to 10 messages from sqs queue with one call
+        :param receipt_handles:
+        :return failed: receipt handles that could not be deleted
+        """
+        try:
+            await self.load_queues_info()
+            async with self._client_context() as client:
+                response = await client.delete_message_batch(
+                    QueueUrl=self.sqs_url,
+                    Entries=[
+                        {'Id': str(index), 'ReceiptHandle': receipt_handle}
+                        for index, receipt_handle in enumerate(receipt_handles)
+                    ]
+                )
+        except Exception as ex:
+            logger.exception(ex)
+            raise
+        failed = [receipt_handles[int(failure['Id'])] for failure in response.get('Failed', [])]
+        if failed:
+            logger.warning('Failed to delete %s messages from queue %s: %s' % (
+                len(failed), self.queue_name, response['Failed']))
+        return failed
+
     async def get_messages_count(self):
         """
         Get number of messages enqueued
         """
         try:
             await self.load_queues_info()
-            async with self.session.create_client('sqs') as client:
+            async with self._client_context() as client:
                 response = await client.get_queue_attributes(
                     QueueUrl=self.sqs_url,
                     AttributeNames=[
@@ -115,3 +220,106 @@ class SqsHandler:
         except Exception as ex:
             logger.exception(ex)
             raise
+
+
+class SqsBatchProducer:
+    """
+    Packs messages into SendMessageBatch calls and keeps several batches in flight.
+
+    Usage:
+        async with SqsHandler(queue_name) as sqs_handler:
+            async with SqsBatchProducer(sqs_handler) as producer:
+                await producer.send(message)
+
+    Only the entries SQS reports as failed are retried, with exponential backoff.
+    Entries still failing after MAX_SEND_ATTEMPTS, or rejected as sender faults,
+    are logged and counted in `failed_count`.
+    """
+
+    def __init__(self, sqs_handler, max_in_flight=MAX_IN_FLIGHT_BATCHES, max_attempts=MAX_SEND_ATTEMPTS):
+        self.sqs_handler = sqs_handler
+        self.max_attempts = max_attempts
+        self.sent_count = 0
+        self.failed_count = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._in_flight = set()
+        self._entries = []
+        self._entries_size = 0
+        self._next_id = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.flush()
+
+    async def send(self, message):
+        """
+        Queue a message for sending; waits only when max_in_flight batches are already being sent
+        """
+        size = len(message.encode('utf-8'))
+        if size > MAX_BATCH_BYTES:
+            raise ValueError(f'Message of {size} bytes exceeds the SQS limit of {MAX_BATCH_BYTES} bytes')
+        if len(self._entries) == MAX_BATCH_ENTRIES or self._entries_size + size > MAX_BATCH_BYTES:
+            await self._dispatch()
+        self._entries.append({'Id': str(self._next_id), 'MessageBody': message})
+        self._entries_size += size
+        self._next_id += 1
+
+    async def flush(self):
+        """
+        Send the pending batch and wait for all batches in flight
+        """
+        if self._entries:
+            await self._dispatch()
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight)
+        logger.info(f'Pushed {self.sent_count} messages into queue {self.sqs_handler.queue_name}, '
+                    f'{self.failed_count} failed')
+
+    async def _dispatch(self):
+        entries = self._entries
+        self._entries = []
+        self._entries_size = 0
+        await self._semaphore.acquire()
+        task = asyncio.ensure_future(self._send_batch(entries))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send_batch(self, entries):
+        try:
+            attempts = 0
+            while entries:
+                attempts += 1
+                try:
+                    response = await self.sqs_handler.push_message_batch(entries)
+                except Exception as ex:
+                    logger.warning(f'SendMessageBatch failed - Attempts: {attempts}: {ex}')
+                    failed = entries
+                else:
+                    self.sent_count += len(response.get('Successful', []))
+                    failed = self._retryable(entries, response.get('Failed', []))
+
+                if failed and attempts >= self.max_attempts:
+                    logger.error(f'Giving up on {len(failed)} messages for queue {self.sqs_handler.queue_name} '
+                                 f'after {attempts} attempts')
+                    self.failed_count += len(failed)
+                    return
+                if failed:
+                    await asyncio.sleep(RETRY_BASE_DELAY * 2 ** (attempts - 1))
+                entries = failed
+        finally:
+            self._semaphore.release()
+
+    def _retryable(self, entries, failures):
+        if not failures:
+            return []
+        by_id = {entry['Id']: entry for entry in entries}
+        retry = []
+        for failure in failures:
+            if failure.get('SenderFault'):
+                logger.error(f'Message rejected by queue {self.sqs_handler.queue_name}: {failure}')
+                self.failed_count += 1
+            else:
+                retry.append(by_id[failure['Id']])
+        return retry
@@ -0,0 +1,52 @@
+"""
+Benchmark USD inventory item lookups against growing product mapping tables.
+
+Compares the previous linear scan over the mapping rows with the ProductMappingIndex.
+Run from the integration root: python -m tests.benchmark.benchmark_product_mapping_index
+"""
+from time import perf_counter
+
+from shopify_inventory_update.handlers.product_mapping_index import ProductMappingIndex
+
+LOOKUPS = 2000
+
+
+def _rows(size):
+    return [{
+        'product_sku': f'SKU-{i}',
+        'shopify_inventory_item_id': str(40000000000000 + i),
+        'updated_at': i
+    } for i in range(size)]
+
+
+def _linear_lookup(rows, product_sku):
+    entry = next(filter(lambda item: item['product_sku'] == product_sku, rows), None)
+    return entry['shopify_inventory_item_id'] if entry else None
+
+
+def _time_lookups(lookup, skus):
+    start = perf_counter()
+    for sku in skus:
+        lookup(sku)
+    return (perf_counter() - start) / len(skus) * 1e6
+
+
+def benchmark(sizes=(1000, 10000, 100000)):
+    print(f'{"rows":>8} {"linear us/lookup":>18} {"index us/lookup":>17} {"index build ms":>16}')
+    for size in sizes:
+        rows = _rows(size)
+        # Spread lookups over the table, including misses
+        skus = [f'SKU-{(i * 7919) % (size + size // 10)}' for i in range(LOOKUPS)]
+
+        index = ProductMappingIndex('benchmark', scan=lambda **kwargs: rows)
+        start = perf_counter()
+        index.refresh()
+        build_ms = (perf_counter() - start) * 1e3
+
+        linear = _time_lookups(lambda sku: _linear_lookup(rows, sku), skus[:max(LOOKUPS * 1000 // size, 20)])
+        indexed = _time_lookups(index.get, skus)
+        print(f'{size:>8} {linear:>18.2f} {indexed:>17.3f} {build_ms:>16.1f}')
+
+
+if __name__ == '__main__':
+    benchmark()
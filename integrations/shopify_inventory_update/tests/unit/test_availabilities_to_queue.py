@@ -1,2 +1,68 @@
+import os
+
+os.environ.setdefault('TENANT', 'frankandoak')
+os.environ.setdefault('STAGE', 'x')
+os.environ.setdefault('REGION', 'us-east-1')
+
+from shopify_inventory_update.aws import availabilities_to_queue as to_queue # pylint: disable=wrong-import-position
+
+
+def _variant(product_id, cad_id, node='DIXST', atp=1):
+    return {
+        'product_id': product_id,
+        'fulfillment_node_id': node,
+        'atp': atp,
+        'external_identifiers': [{'identifiers': {'shopify_inventory_item_id': cad_id}}]
+    }
+
+
 def test_transformer():
-    assert True
\ No newline at end of file
+    assert True
+
+
+def test_duplicates_are_dropped_across_batches():
+    variants = [_variant(f'P{i}', str(i)) for i in range(5)] + [_variant('P0', '0'), _variant('P4', '4')]
+    records = to_queue._unique_per_location(to_queue._with_cad_inventory_ids(iter(variants)))
+    records = to_queue._with_location_ids(records, {'DIXST': {'cad': '1', 'usd': '2'}})
+
+    batches = list(to_queue._batches(records, 2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+
+
+def test_variants_are_filtered():
+    variants = [
+        _variant('P/1', '1'),
+        {'product_id': 'P2', 'fulfillment_node_id': 'DIXST', 'atp': 1, 'external_identifiers': []},
+        _variant('P3', '3', node='UNKNOWN'),
+        _variant('P4', '4', atp='7')
+    ]
+    records = to_queue._with_cad_inventory_ids(to_queue._valid_variants(iter(variants)))
+    records = list(to_queue._with_location_ids(records, {'DIXST': {'cad': '1'}}))
+
+    assert records == [{'atp': 7, 'shopify_inventory_ids': {'cad': '4'}, 'location_ids': {'cad': '1'}}]
+
+
+def test_resume_from_product():
+    variants = [_variant('P1', '1'), _variant('P2', '2'), _variant('P3', '3')]
+
+    resumed = list(to_queue._resume_from_product(iter(variants), 'P2'))
+
+    assert [variant['product_id'] for variant in resumed] == ['P2', 'P3']
+
+
+def test_unchanged_quantities_are_dropped():
+    snapshot = to_queue.InventorySnapshot('state', scan=None, put=None)
+    snapshot.record('10', '1', 5)
+    snapshot.record('20', '2', 5)
+    snapshot.record('11', '1', 3)
+    records = [
+        {'atp': 5, 'shopify_inventory_ids': {'cad': '10', 'usd': '20'}, 'location_ids': {'cad': '1', 'usd': '2'}},
+        {'atp': 5, 'shopify_inventory_ids': {'cad': '11', 'usd': '21'}, 'location_ids': {'cad': '1', 'usd': '2'}}
+    ]
+    progress = {'unchanged_count': 0}
+
+    changed = list(to_queue._changed_since_last_push(iter(records), snapshot, progress))
+
+    assert changed == [{'atp': 5, 'shopify_inventory_ids': {'cad': '11', 'usd': '21'}, 'location_ids': {'cad': '1', 'usd': '2'}}]
+    assert progress['unchanged_count'] == 1
@@ -0,0 +1,86 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from shopify_inventory_update.handlers.export_reader import S3MultipartWriter, iter_export_variants, iter_json_array
+
+
+class FakeS3Handler:
+    def __init__(self, fail_on_complete=False):
+        self.fail_on_complete = fail_on_complete
+        self.parts = []
+        self.put = None
+        self.completed = False
+        self.aborted = False
+
+    def start_multipart_upload(self, metadata, content_type):
+        pass
+
+    def add_multipart_upload(self, part_number, part_data):
+        self.parts.append((part_number, part_data))
+
+    def complete_multipart_upload(self):
+        if self.fail_on_complete:
+            raise IOError('S3 unavailable')
+        self.completed = True
+
+    def abort_multipart_upload(self):
+        self.aborted = True
+
+    def put_object(self, data=b''):
+        self.put = data
+
+
+VARIANTS = [{'product_id': f'P{i}', 'atp': i, 'name': 'Café été'} for i in range(500)]
+
+
+def _zipped(data):
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, mode='w', compression=zipfile.ZIP_DEFLATED) as zipf:
+        zipf.writestr('inventory_levels.json', data)
+    return file
+
+
+def test_iter_json_array_across_small_chunks():
+    data = json.dumps(VARIANTS, indent=2, ensure_ascii=False).encode('utf-8')
+
+    assert list(iter_json_array(io.BytesIO(data), chunk_size=7)) == VARIANTS
+    assert list(iter_json_array(io.BytesIO(b' [ ] '))) == []
+
+
+def test_iter_export_variants_uploads_raw_document():
+    data = json.dumps(VARIANTS).encode('utf-8')
+    s3_handler = FakeS3Handler()
+
+    variants = iter_export_variants(_zipped(data), is_zip=True, s3_handler=s3_handler)
+
+    assert list(variants) == VARIANTS
+    assert s3_handler.put == data
+
+
+def test_iter_export_variants_completes_upload_when_closed_early():
+    data = json.dumps(VARIANTS).encode('utf-8')
+    s3_handler = FakeS3Handler()
+    variants = iter_export_variants(io.BytesIO(data), is_zip=False, s3_handler=s3_handler)
+
+    assert next(variants) == VARIANTS[0]
+    variants.close()
+
+    assert s3_handler.put == data
+
+
+def test_iter_export_variants_aborts_upload_when_completing_fails(monkeypatch):
+    monkeypatch.setattr(S3MultipartWriter.__init__, '__defaults__', ('application/json', 1024))
+    data = json.dumps(VARIANTS).encode('utf-8')
+    fileobj = io.BytesIO(data)
+    s3_handler = FakeS3Handler(fail_on_complete=True)
+
+    with pytest.raises(IOError):
+        list(iter_export_variants(fileobj, is_zip=False, s3_handler=s3_handler))
+
+    assert s3_handler.parts
+    assert s3_handler.aborted
+    assert not s3_handler.completed
+    assert fileobj.closed
@@ -0,0 +1,44 @@
+import time
+
+from shopify_inventory_update.handlers.inventory_snapshot import InventorySnapshot
+
+
+class FakeTable:
+    def __init__(self):
+        self.rows = {}
+
+    def scan(self, table_name, filter_expression=None):
+        prefix = filter_expression.get_expression()['values'][1]
+        return [row for identifier, row in self.rows.items() if identifier.startswith(prefix)]
+
+    def put(self, table_name, items):
+        for item in items:
+            self.rows[item['identifier']] = item
+
+
+def test_recorded_quantities_survive_a_reload():
+    table = FakeTable()
+    table.rows['current_job_state'] = {'identifier': 'current_job_state'}
+    snapshot = InventorySnapshot('state', scan=table.scan, put=table.put)
+    snapshot.record('42', 7, 3)
+
+    assert snapshot.save() == 1
+    assert snapshot.save() == 0
+    row = table.rows['inventory_snapshot#7#42']
+    assert row['expires_at'] == row['pushed_at'] + snapshot.max_age_seconds
+
+    reloaded = InventorySnapshot('state', scan=table.scan, put=table.put)
+    assert reloaded.load() == 1
+    assert reloaded.is_unchanged('42', '7', 3)
+    assert not reloaded.is_unchanged('42', '7', 4)
+    assert reloaded.get('43', '7') is None
+
+
+def test_expired_entries_are_ignored():
+    table = FakeTable()
+    table.put('state', [{'identifier': 'inventory_snapshot#7#42', 'available': 3, 'pushed_at': int(time.time()) - 100}])
+
+    snapshot = InventorySnapshot('state', max_age_seconds=60, scan=table.scan, put=table.put)
+
+    assert snapshot.load() == 0
+    assert snapshot.get('42', '7') is None
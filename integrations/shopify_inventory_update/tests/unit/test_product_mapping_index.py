@@ -0,0 +1,50 @@
+from shopify_inventory_update.handlers import product_mapping_index
+from shopify_inventory_update.handlers.product_mapping_index import ProductMappingIndex
+
+
+class FakeTable:
+    def __init__(self, rows):
+        self.rows = rows
+        self.scans = 0
+
+    def scan(self, table_name):
+        self.scans += 1
+        return list(self.rows)
+
+
+def test_index_is_reused_until_it_expires(monkeypatch):
+    now = {'value': 1000}
+    monkeypatch.setattr(product_mapping_index.time, 'monotonic', lambda: now['value'])
+    table = FakeTable([
+        {'product_sku': 'A', 'shopify_inventory_item_id': '1'},
+        {'product_sku': 'B', 'shopify_inventory_item_id': '2'}
+    ])
+    index = ProductMappingIndex('mapping', refresh_seconds=900, scan=table.scan)
+
+    assert index.refresh() == 2
+    assert index.get('A') == '1'
+    assert index.get('C') is None
+
+    table.rows[0] = {'product_sku': 'A', 'shopify_inventory_item_id': '10'}
+    now['value'] += 899
+    assert index.refresh() == 0
+    assert table.scans == 1
+    assert index.get('A') == '1'
+
+    now['value'] += 1
+    assert index.refresh() == 2
+    assert table.scans == 2
+    assert index.get('A') == '10'
+
+
+def test_forced_refresh_drops_deleted_rows():
+    table = FakeTable([{'product_sku': 'A', 'shopify_inventory_item_id': '1'}])
+    index = ProductMappingIndex('mapping', scan=table.scan)
+    index.refresh()
+
+    table.rows = [{'product_sku': 'B', 'shopify_inventory_item_id': '2'}]
+    index.refresh(force=True)
+
+    assert 'A' not in index
+    assert index.get('B') == '2'
+    assert len(index) == 1
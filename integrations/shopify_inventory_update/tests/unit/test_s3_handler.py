@@ -0,0 +1,47 @@
+import io
+import json
+import os
+import zipfile
+
+import boto3
+import pytest
+from moto import mock_s3
+
+from shopify_inventory_update.handlers.s3_handler import S3Handler
+
+BUCKET = 'test-bucket'
+
+
+@pytest.fixture
+def s3():
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    with mock_s3():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_zip_members_are_read_from_ranges(s3):
+    members = {'a.json': os.urandom(300 * 1024), 'b.json': b'{"atp": 1}'}
+    file = io.BytesIO()
+    with zipfile.ZipFile(file, mode='w', compression=zipfile.ZIP_DEFLATED) as zipf:
+        for name, data in members.items():
+            zipf.writestr(name, data)
+    s3.put_object(Bucket=BUCKET, Key='exports/export.zip', Body=file.getvalue())
+
+    s3_handler = S3Handler(bucket_name=BUCKET, key_name='exports/export.zip')
+    s3_handler.RANGE_SIZE = 64 * 1024
+
+    assert s3_handler.getFiles() == members
+    assert s3_handler.getS3File() == {'file': 'export.zip', 'data': members['a.json']}
+
+
+def test_get_json_files_dict(s3):
+    for index in range(15):
+        s3.put_object(Bucket=BUCKET, Key=f'config/{index}.json', Body=json.dumps({'index': index}))
+    s3.put_object(Bucket=BUCKET, Key='config/notes.txt', Body=b'text')
+
+    jsons = S3Handler(bucket_name=BUCKET).get_json_files_dict()
+
+    assert len(jsons) == 15
+    assert jsons['config/3.json'] == {'index': 3}
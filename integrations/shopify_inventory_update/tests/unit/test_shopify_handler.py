@@ -0,0 +1,36 @@
+import asyncio
+
+from shopify_inventory_update.handlers.shopify_handler import ShopifyConnector
+
+
+class FakeConnector(ShopifyConnector):
+    def __init__(self, nodes):
+        super().__init__('key', 'password', 'shop')
+        self.nodes = nodes
+        self.requests = []
+        self.stocked = []
+
+    async def _post_graphql(self, operation, query, variables):
+        self.requests.append(variables)
+        return {'data': {'nodes': [self.nodes.get(item_id) for item_id in variables['ids']]}}
+
+    async def set_inventory_level(self, inv_item_id, location_id, session=None, atp=0):
+        self.stocked.append((inv_item_id, location_id))
+
+
+def test_get_inventory_levels_reads_all_locations_in_one_query():
+    connector = FakeConnector({
+        'gid://shopify/InventoryItem/1': {
+            'id': 'gid://shopify/InventoryItem/1',
+            'location0': {'available': 5},
+            'location1': None
+        }
+    })
+
+    levels = asyncio.run(connector.get_inventory_levels(['1', '1', '2'], [10, 20]))
+
+    assert levels == {'10': {'1': 5}, '20': {'1': 0}}
+    assert len(connector.requests) == 1
+    assert connector.requests[0]['ids'] == ['gid://shopify/InventoryItem/1', 'gid://shopify/InventoryItem/2']
+    assert connector.requests[0]['location1'] == 'gid://shopify/Location/20'
+    assert connector.stocked == [('1', '20')]
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+from shopify_inventory_update.handlers.shopify_rate_limiter import ShopifyCostLimiter
+
+
+def _cost(requested, available, restore_rate=50.0, maximum=1000.0):
+    return {
+        'requestedQueryCost': requested,
+        'actualQueryCost': requested,
+        'throttleStatus': {
+            'maximumAvailable': maximum,
+            'currentlyAvailable': available,
+            'restoreRate': restore_rate
+        }
+    }
+
+
+def test_limiter_learns_cost_and_bucket_state():
+    limiter = ShopifyCostLimiter()
+
+    async def request():
+        reserved = await limiter.acquire('query')
+        limiter.release('query', reserved, _cost(112, 500, restore_rate=100.0), work_seconds=0.1)
+
+    asyncio.run(request())
+
+    assert limiter.expected_cost('query') == 112
+    assert limiter.restore_rate == 100.0
+    assert 500 <= limiter.available() < 510
+    assert limiter.metrics()['requests'] == 1
+
+
+def test_limiter_waits_for_points_to_restore():
+    limiter = ShopifyCostLimiter(maximum_available=100.0, restore_rate=1000.0)
+
+    async def requests():
+        for _ in range(3):
+            reserved = await limiter.acquire('query')
+            limiter.release('query', reserved)
+
+    started_at = time.monotonic()
+    asyncio.run(requests())
+    elapsed = time.monotonic() - started_at
+
+    # The first request drains the bucket, the next two wait 0.1s each for it to refill
+    assert elapsed >= 0.18
+    assert limiter.wait_seconds >= 0.18
@@ -0,0 +1,65 @@
+import asyncio
+
+from shopify_inventory_update.handlers.sqs_consumer import SqsConsumer
+
+
+class FakeSqsHandler:
+    queue_name = 'queue'
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.receives = []
+        self.deleted = []
+
+    async def get_messages(self, max_messages, wait_time_seconds):
+        self.receives.append(max_messages)
+        received, self.messages = self.messages[:max_messages], self.messages[max_messages:]
+        return received
+
+    async def delete_message_batch(self, receipt_handles):
+        self.deleted.append(list(receipt_handles))
+        return []
+
+
+def _messages(count):
+    return [{'MessageId': str(i), 'ReceiptHandle': f'r{i}', 'Body': str(i)} for i in range(count)]
+
+
+def test_messages_are_processed_concurrently_and_deleted_in_batches():
+    handler = FakeSqsHandler(_messages(25))
+    running = {'now': 0, 'max': 0}
+
+    async def process(message):
+        running['now'] += 1
+        running['max'] = max(running['max'], running['now'])
+        await asyncio.sleep(0.01)
+        running['now'] -= 1
+        return message['Body'] != '7'
+
+    consumer = SqsConsumer(handler, process, max_workers=5, wait_time_seconds=0)
+    drained = asyncio.run(consumer.run())
+
+    assert drained
+    assert running['max'] == 5
+    assert max(handler.receives) == 5
+    assert consumer.processed_count == 24
+    assert consumer.failed_count == 1
+    deleted = [handle for batch in handler.deleted for handle in batch]
+    assert sorted(deleted) == sorted(f'r{i}' for i in range(25) if i != 7)
+    assert all(len(batch) <= 10 for batch in handler.deleted)
+
+
+def test_stop_finishes_messages_in_progress():
+    handler = FakeSqsHandler(_messages(25))
+    stop = {'value': False}
+
+    async def process(message):
+        stop['value'] = True
+        return True
+
+    consumer = SqsConsumer(handler, process, max_workers=10, wait_time_seconds=0)
+    drained = asyncio.run(consumer.run(lambda: stop['value']))
+
+    assert not drained
+    assert consumer.processed_count == 10
+    assert len(handler.deleted) == 1
@@ -0,0 +1,57 @@
+import asyncio
+
+from shopify_inventory_update.handlers import sqs_handler
+from shopify_inventory_update.handlers.sqs_handler import SqsBatchProducer
+
+
+class FakeSqsHandler:
+    queue_name = 'queue'
+
+    def __init__(self, fail_once=()):
+        self.calls = []
+        self.fail_once = set(fail_once)
+
+    async def push_message_batch(self, entries):
+        self.calls.append([entry['MessageBody'] for entry in entries])
+        failed = [entry for entry in entries if entry['MessageBody'] in self.fail_once]
+        self.fail_once -= {entry['MessageBody'] for entry in failed}
+        return {
+            'Successful': [{'Id': entry['Id']} for entry in entries if entry not in failed],
+            'Failed': [{'Id': entry['Id'], 'SenderFault': False} for entry in failed]
+        }
+
+
+async def _send_all(handler, messages):
+    async with SqsBatchProducer(handler, max_in_flight=2) as producer:
+        for message in messages:
+            await producer.send(message)
+    return producer
+
+
+def test_messages_are_packed_in_batches_of_ten():
+    handler = FakeSqsHandler()
+
+    producer = asyncio.run(_send_all(handler, [str(i) for i in range(25)]))
+
+    assert sorted(len(call) for call in handler.calls) == [5, 10, 10]
+    assert producer.sent_count == 25
+
+
+def test_batches_respect_payload_limit():
+    handler = FakeSqsHandler()
+    message = 'x' * (sqs_handler.MAX_BATCH_BYTES // 3 + 1)
+
+    asyncio.run(_send_all(handler, [message] * 4))
+
+    assert [len(call) for call in handler.calls] == [2, 2]
+
+
+def test_only_failed_entries_are_retried(monkeypatch):
+    monkeypatch.setattr(sqs_handler, 'RETRY_BASE_DELAY', 0)
+    handler = FakeSqsHandler(fail_once={'3'})
+
+    producer = asyncio.run(_send_all(handler, [str(i) for i in range(5)]))
+
+    assert handler.calls == [['0', '1', '2', '3', '4'], ['3']]
+    assert producer.sent_count == 5
+    assert producer.failed_count == 0
@@ -16,4 +16,7 @@ setup(
         'setuptools'
     ],
     test_suite='tests',
+    tests_require=[
+        'moto==2.0.5',
+    ],
 )
@@ -1,13 +1,114 @@
+import json
+import os
+import threading
+import time
+
 import boto3
 import logging
+from botocore.config import Config
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.INFO)
 
+# Seconds parameter values are cached for, 0 disables the cache
+CACHE_TTL = int(os.environ.get('PARAM_STORE_CACHE_TTL', '300') or '0')
+# Load the whole tenant/stage subtree on the first cache miss instead of one parameter at a time
+PREFETCH = os.environ.get('PARAM_STORE_PREFETCH', '1') == '1'
+
+# Maximum page size of GetParametersByPath and batch size of GetParameters
+MAX_RESULTS = 10
+MAX_NAMES = 10
+
+_CLIENT = None
+_CACHE = None
+
+
+class ParamCache():
+    """Process wide cache of parameter values by full name.
+
+    Values are kept for `ttl` seconds, parameters known to be missing are cached as None.
+    Paths loaded with GetParametersByPath are remembered, so names below them that were
+    never cached are known not to exist; a path and its values expire together. Paths that failed to load are not tried again
+    before `ttl` passed. Lookups are counted in `stats`.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.json_values = {}
+        self.paths = {}
+        self.failed_paths = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'ssm_calls': 0}
+
+    def get(self, name):
+        """Return `(found, value)` for a parameter, `found` is False when SSM has to be asked."""
+        entry = self.values.get(name)
+        if entry is not None:
+            if entry[1] > time.time():
+                return True, entry[0]
+            # An expired value has to be read again, even below a loaded path
+            return False, None
+        return self.is_loaded(name), None
+
+    def put(self, name, value, ttl, expires_at=None):
+        if ttl > 0:
+            self.values[name] = (value, expires_at or time.time() + ttl)
+
+    def put_path(self, path, ttl, expires_at=None):
+        if ttl > 0:
+            self.paths[path] = expires_at or time.time() + ttl
+
+    def is_loaded(self, name):
+        """Whether `name` is below a path loaded within the TTL, `/a/b` does not cover `/a/bc`."""
+        now = time.time()
+        return any(expires_at > now and name.startswith(path.rstrip('/') + '/')
+                   for path, expires_at in list(self.paths.items()))
+
+    def put_failed_path(self, path, ttl):
+        self.failed_paths[path] = time.time() + ttl
+
+    def has_failed(self, path):
+        return self.failed_paths.get(path, 0) > time.time()
+
+    def count(self, stat, amount=1):
+        with self.lock:
+            self.stats[stat] += amount
+
+    def clear(self):
+        self.values.clear()
+        self.json_values.clear()
+        self.paths.clear()
+        self.failed_paths.clear()
+
+
+def get_cache():
+    """Return the parameter cache shared by all ParamStore instances of the process."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ParamCache()
+    return _CACHE
+
+
+def get_client():
+    """Return the SSM client shared by all ParamStore instances, retrying throttled calls adaptively."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = boto3.client('ssm', config=Config(retries={'max_attempts': 10, 'mode': 'adaptive'}))
+    return _CLIENT
+
+
+def get_cache_stats():
+    """Return the counters of the shared cache: hits, misses and SSM calls."""
+    return dict(get_cache().stats)
+
 
 class ParamStore():
     """Simple interface to SSM Param Store.
 
+    Values are cached process wide for `PARAM_STORE_CACHE_TTL` seconds (default 300). On the
+    first miss the whole `/tenant/stage/` subtree is loaded with GetParametersByPath, unless
+    `PARAM_STORE_PREFETCH` is set to 0; if that fails, single parameters are requested.
+
     Usage:
         ```
         from param_store.client import ParamStore
@@ -16,13 +117,15 @@ class ParamStore():
         STAGE = 'x'
         param_store = ParamStore(TENANT, STAGE)
         single_param = param_store.get_param('shopify/us')
+        json_param = param_store.get_json_param('newstore')
+        batch = param_store.get_params(['shopify/us', 'shopify/ca'])
         multiple_params = param_store.get_params_by_path('shopify')
         ```
     """
 
-    def __init__(self, tenant, stage):
+    def __init__(self, tenant, stage, ttl=CACHE_TTL, prefetch=PREFETCH):
         """Initialize the module.
-        By creating a new instance of the boto3 session client for accessing SSM
+        By using the SSM client shared by all instances for accessing SSM
         Param Store. Also use a root path for all calls to tie access to a single
         tenant + stage.
 
@@ -35,15 +138,18 @@ class ParamStore():
         Args:
             tenant: Name of Newstore tenant (e.g., "aninebing").
             stage: One-letter symbol representing the stage (e.g., "x", or "s" or "p").
-            region: AWS region code where the SSM Param Store is configured.
-                Defaults to `us-east-1`.
+            ttl: Seconds values are cached for, 0 disables the cache.
+            prefetch: Load the whole root path on the first cache miss.
 
         Returns:
             New instance of ParamStore.
         """
         self.tenant = tenant
         self.stage = stage
-        self.client = boto3.client('ssm')
+        self.client = get_client()
+        self.cache = get_cache()
+        self.ttl = ttl
+        self.prefetch_enabled = prefetch and ttl > 0
         self.path_root = '/%s/%s/' % (tenant, stage)
 
     def get_client(self):
@@ -69,20 +175,84 @@ class ParamStore():
             value: The value of the parameter matching `key` or None if no match.
         """
         path = self.path_root + key
-        response = None
+        found, value = self._get_cached(path)
+        if found:
+            return value
 
         try:
+            self.cache.count('ssm_calls')
             response = self.client.get_parameter(
                 Name=path, WithDecryption=False)
-            return response['Parameter']['Value']
+            value = response['Parameter']['Value']
+        except self.client.exceptions.ParameterNotFound:
+            LOGGER.exception(f'Error when trying to get parameter {path}')
+            self.cache.put(path, None, self.ttl)
+            return None
         except Exception:
             LOGGER.exception(f'Error when trying to get parameter {path}')
             return None
 
+        self.cache.put(path, value, self.ttl)
+        return value
+
+    def get_json_param(self, key='', memoize=True):
+        """Get a single parameter and parse it as JSON.
+
+        Args:
+            key: Name of the parameter to get (not including the root path).
+            memoize: Reuse the parsed value while the parameter is unchanged. The
+                memoized value is shared by all callers and must not be modified.
+
+        Returns:
+            value: The parsed value of the parameter or None if no match.
+        """
+        value = self.get_param(key)
+        if value is None:
+            return None
+        if not memoize:
+            return json.loads(value)
+
+        path = self.path_root + key
+        entry = self.cache.json_values.get(path)
+        if entry is None or entry[0] is not value:
+            entry = (value, json.loads(value))
+            self.cache.json_values[path] = entry
+        return entry[1]
+
+    def get_params(self, keys):
+        """Get several parameters, requesting the ones not cached with batched GetParameters calls.
+
+        Args:
+            keys: Names of the parameters to get (not including the root path).
+
+        Returns:
+            values: A dict of the values by key, None for parameters that do not exist.
+        """
+        values = {}
+        missing = []
+        for key in keys:
+            found, value = self._get_cached(self.path_root + key)
+            if found:
+                values[key] = value
+            else:
+                missing.append(key)
+
+        prefix_len = len(self.path_root)
+        for start in range(0, len(missing), MAX_NAMES):
+            batch = [self.path_root + key for key in missing[start:start + MAX_NAMES]]
+            self.cache.count('ssm_calls')
+            response = self.client.get_parameters(Names=batch, WithDecryption=False)
+            for param in response['Parameters']:
+                values[param['Name'][prefix_len:]] = param['Value']
+                self.cache.put(param['Name'], param['Value'], self.ttl)
+            for name in response.get('InvalidParameters', []):
+                values[name[prefix_len:]] = None
+                self.cache.put(name, None, self.ttl)
+        return values
+
     def get_params_by_path(self, input_path=''):
         """Get multiple parameters from the SSM Param Store.
-        Returns an array of parameter dicts which contain a `name` and a `value` attribute;
-        the `value` attribute being parsed as JSON and formatted as a dict itself.
+        Returns an array of parameter dicts which contain a `key` and a `value` attribute.
 
         Args:
             path: A string indicating the base path from which to retrieve values.
@@ -93,54 +263,92 @@ class ParamStore():
             parameters: An array of key/value pair dicts representing all params that
                 match the `path` that was provided or an empty array if no matches.
         """
-        def param_to_dict_minus_prefix(plen=0):
-            """Return a dict containing two attributes: key + value.
-            """
-            def param_to_dict(param):
-                return {
-                    "key": param['Name'][plen:],
-                    "value": param['Value']
-                }
-
-            return param_to_dict
         path = self.path_root + input_path
         prefix_len = len(self.path_root)
-        has_next_token = True
+        if self.prefetch_enabled:
+            self.prefetch()
+
+        parent = path.rstrip('/') + '/'
+        if self.ttl > 0 and self.cache.is_loaded(parent):
+            # Served from the cache, only the direct children like the non recursive SSM call
+            self.cache.count('hits')
+            now = time.time()
+            return [{"key": name[prefix_len:], "value": value}
+                    for name, (value, expires_at) in list(self.cache.values.items())
+                    if value is not None and expires_at > now
+                    and name.startswith(parent) and '/' not in name[len(parent):]]
+
+        self.cache.count('misses')
+        return [{"key": param['Name'][prefix_len:], "value": param['Value']}
+                for param in self._load_path(path, recursive=False)]
+
+    def prefetch(self, input_path=''):
+        """Load all parameters below the path into the cache with paged GetParametersByPath calls.
+        Does nothing while the path is cached. Errors are logged, parameters are then requested
+        one at a time.
+
+        Args:
+            input_path: Path below the root path, the whole tenant/stage subtree by default.
+
+        Returns:
+            loaded: True if the parameters of the path are cached.
+        """
+        path = self.path_root + input_path
+        if self.cache.is_loaded(path):
+            return True
+        if self.cache.has_failed(path):
+            return False
+        # The path and all its values expire together, however long the pages take
+        expires_at = time.time() + self.ttl
+        try:
+            self._load_path(path, recursive=True, expires_at=expires_at)
+        except Exception:
+            LOGGER.exception(f'Error when trying to prefetch parameters of {path}')
+            self.cache.put_failed_path(path, self.ttl)
+            return False
+        self.cache.put_path(path, self.ttl, expires_at)
+        return True
+
+    def invalidate(self):
+        """Drop all cached values of the process."""
+        self.cache.clear()
+
+    @staticmethod
+    def get_cache_stats():
+        return get_cache_stats()
+
+    def _get_cached(self, path):
+        if self.ttl <= 0:
+            self.cache.count('misses')
+            return False, None
+        found, value = self.cache.get(path)
+        if not found and self.prefetch_enabled and self.prefetch():
+            found, value = self.cache.get(path)
+        self.cache.count('hits' if found else 'misses')
+        return found, value
+
+    def _load_path(self, path, recursive, expires_at=None):
         next_token = None
         parameters = []
 
-        while has_next_token:
-            response = None
-
-            if next_token == None:
-                # Initial parameter request (without `NextToken`).
-                response = self.client.get_parameters_by_path(
-                    Path=path,
-                    Recursive=False,
-                    WithDecryption=False,
-                    MaxResults=3
-                )
-            else:
-                # If next_token has a value the continue requesting from server
-                # to retrieve remaining parameters.
-                response = self.client.get_parameters_by_path(
-                    Path=path,
-                    Recursive=False,
-                    WithDecryption=False,
-                    MaxResults=3,
-                    NextToken=next_token
-                )
-
-            # Append all retrieved parameters to the `parameters` list, formatted
-            # as dicts with `key`/`value` pairs.
-            parameters += list(map(param_to_dict_minus_prefix(prefix_len),
-                                   response['Parameters']))
-
-            # If there's a `NextToken` in the response, then continue requesting
-            # more params, otherwise stop the loop.
-            if 'NextToken' in response:
-                next_token = response['NextToken']
-            else:
-                has_next_token = False
+        while True:
+            kwargs = {
+                'Path': path,
+                'Recursive': recursive,
+                'WithDecryption': False,
+                'MaxResults': MAX_RESULTS
+            }
+            # If next_token has a value the continue requesting from server
+            # to retrieve remaining parameters.
+            if next_token is not None:
+                kwargs['NextToken'] = next_token
+            self.cache.count('ssm_calls')
+            response = self.client.get_parameters_by_path(**kwargs)
+
+            for param in response['Parameters']:
+                self.cache.put(param['Name'], param['Value'], self.ttl, expires_at)
+            parameters += response['Parameters']
 
-        return parameters
+            next_token = response.get('NextToken')
+            if next_token is None:
+                return parameters
@@ -0,0 +1,150 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+import boto3
+from moto import mock_ssm
+
+from param_store import client
+from param_store.client import ParamStore, get_cache_stats
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+PARAMS = {
+    '/tenant/x/newstore': json.dumps({'host': 'tenant.x.newstore.net'}),
+    '/tenant/x/netsuite': json.dumps({'account_id': '123'}),
+    '/tenant/x/shopify/us': 'us-shop',
+    '/tenant/x/shopify/ca': 'ca-shop',
+    '/tenant/x/shopify/dc/location_map': '{}',
+    '/other/x/newstore': 'other'
+}
+
+
+class TestParamStore(unittest.TestCase):
+
+    def setUp(self):
+        ssm_mock = mock_ssm()
+        ssm_mock.start()
+        self.addCleanup(ssm_mock.stop)
+        client._CLIENT = None
+        client._CACHE = None
+        ssm = boto3.client('ssm')
+        for name, value in list(PARAMS.items()) + [('/tenant/x/extra/%s' % i, str(i)) for i in range(24)]:
+            ssm.put_parameter(Name=name, Value=value, Type='String')
+
+    def test_prefetch_loads_the_subtree_once(self):
+        param_store = ParamStore('tenant', 'x')
+
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+        self.assertEqual(param_store.get_param('shopify/dc/location_map'), '{}')
+        self.assertEqual(ParamStore('tenant', 'x').get_param('extra/7'), '7')
+        self.assertIsNone(param_store.get_param('missing'))
+
+        # 29 parameters below /tenant/x/ in pages of 10
+        self.assertEqual(get_cache_stats(), {'hits': 4, 'misses': 0, 'ssm_calls': 3})
+
+    def test_get_param_without_prefetch(self):
+        param_store = ParamStore('tenant', 'x', prefetch=False)
+
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+        self.assertIsNone(param_store.get_param('missing'))
+        self.assertIsNone(param_store.get_param('missing'))
+
+        self.assertEqual(get_cache_stats(), {'hits': 2, 'misses': 2, 'ssm_calls': 2})
+
+    def test_cache_disabled(self):
+        param_store = ParamStore('tenant', 'x', ttl=0)
+
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+
+        self.assertEqual(get_cache_stats()['ssm_calls'], 2)
+
+    def test_get_params_is_batched(self):
+        param_store = ParamStore('tenant', 'x', prefetch=False)
+        keys = ['extra/%s' % i for i in range(15)] + ['missing']
+
+        values = param_store.get_params(keys)
+
+        self.assertEqual(values['extra/3'], '3')
+        self.assertIsNone(values['missing'])
+        self.assertEqual(len(values), 16)
+        self.assertEqual(get_cache_stats()['ssm_calls'], 2)
+        self.assertEqual(param_store.get_params(['extra/3', 'missing']), {'extra/3': '3', 'missing': None})
+        self.assertEqual(get_cache_stats()['ssm_calls'], 2)
+
+    def test_json_param_is_memoized(self):
+        param_store = ParamStore('tenant', 'x')
+
+        newstore = param_store.get_json_param('newstore')
+
+        self.assertEqual(newstore, {'host': 'tenant.x.newstore.net'})
+        self.assertIs(param_store.get_json_param('newstore'), newstore)
+        self.assertIsNot(param_store.get_json_param('newstore', memoize=False), newstore)
+
+    def test_get_params_by_path(self):
+        expected = [{'key': 'shopify/ca', 'value': 'ca-shop'}, {'key': 'shopify/us', 'value': 'us-shop'}]
+
+        uncached = ParamStore('tenant', 'x', ttl=0).get_params_by_path('shopify')
+        cached = ParamStore('tenant', 'x').get_params_by_path('shopify')
+
+        self.assertEqual(sorted(uncached, key=lambda param: param['key']), expected)
+        self.assertEqual(sorted(cached, key=lambda param: param['key']), expected)
+
+    def test_failed_prefetch_falls_back_to_get_parameter(self):
+        param_store = ParamStore('tenant', 'x')
+
+        def fail(**kwargs):
+            raise RuntimeError('AccessDenied')
+
+        param_store.client.get_parameters_by_path = fail
+
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+        self.assertEqual(param_store.get_param('shopify/ca'), 'ca-shop')
+
+    def test_values_of_all_pages_expire_with_their_path(self):
+        now = {'value': 1000.0}
+        param_store = ParamStore('tenant', 'x', ttl=300)
+        get_parameters_by_path = param_store.client.get_parameters_by_path
+
+        def slow_page(**kwargs):
+            now['value'] += 0.5
+            return get_parameters_by_path(**kwargs)
+
+        with mock.patch.object(client.time, 'time', lambda: now['value']), \
+                mock.patch.object(param_store.client, 'get_parameters_by_path', side_effect=slow_page) as pages:
+            self.assertEqual(param_store.get_param('newstore'), PARAMS['/tenant/x/newstore'])
+            self.assertGreater(pages.call_count, 1)
+
+            # Values of the first pages are still cached right before the path expires
+            now['value'] = 1000.0 + 299.8
+            self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+            self.assertEqual(param_store.get_param('extra/23'), '23')
+            loaded_pages = pages.call_count
+
+            # Everything is read again once the path expired
+            now['value'] = 1000.0 + 300.1
+            self.assertEqual(param_store.get_param('shopify/ca'), 'ca-shop')
+            self.assertGreater(pages.call_count, loaded_pages)
+
+    def test_expired_value_is_a_miss(self):
+        param_store = ParamStore('tenant', 'x', prefetch=False)
+        param_store.cache.put_path('/tenant/x/', 300)
+        param_store.cache.values['/tenant/x/shopify/us'] = ('old', 0)
+
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+
+    def test_loaded_path_does_not_cover_siblings_with_the_same_prefix(self):
+        param_store = ParamStore('tenant', 'x', prefetch=False)
+
+        self.assertTrue(param_store.prefetch('shop'))
+
+        self.assertEqual(param_store.get_param('shopify/us'), 'us-shop')
+        self.assertFalse(param_store.cache.is_loaded('/tenant/x/shopify/ca'))
+        self.assertTrue(param_store.cache.is_loaded('/tenant/x/shop/us'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Iterable
 from typing import Callable
 
@@ -38,3 +39,40 @@ class SQSHandler:
         return self.resource.send_message(
             MessageBody=message_body,
             DelaySeconds=delay_seconds)
+
+
+def process_sqs_batch(sqs_event: dict, process_record: Callable[[dict], any], max_workers: int = 1) -> dict:
+    """
+    Calls process_record for every record of an sqs lambda event, up to max_workers records at a time,
+    and returns the partial batch response, so that sqs only retries the messages that raised.
+    The event source mapping needs ReportBatchItemFailures in its FunctionResponseTypes.
+
+    Records of fifo queues are processed one after the other, and once a message failed the following
+    messages of its group fail too, to keep their order.
+    """
+    records = sqs_event.get("Records", [])
+    is_fifo = any(record.get("eventSourceARN", "").endswith(".fifo") for record in records)
+    failed_groups = set()
+
+    def process(record: dict):
+        group_id = record.get("attributes", {}).get("MessageGroupId")
+        if is_fifo and group_id in failed_groups:
+            logger.info(f"Skipping sqs message {record['messageId']} after a failure in its group {group_id}")
+            return record["messageId"]
+        try:
+            process_record(record)
+            return None
+        except Exception:
+            logger.exception(f"Failed to process sqs message {record['messageId']}")
+            failed_groups.add(group_id)
+            return record["messageId"]
+
+    if max_workers > 1 and len(records) > 1 and not is_fifo:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(records))) as executor:
+            failed = list(executor.map(process, records))
+    else:
+        failed = [process(record) for record in records]
+
+    failed = [message_id for message_id in failed if message_id]
+    logger.info(f"Processed {len(records) - len(failed)} of {len(records)} sqs messages")
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in failed]}
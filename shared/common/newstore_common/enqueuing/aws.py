@@ -4,8 +4,10 @@ import os
 from pathlib import Path
 
 from newstore_common.aws.http import api_status
+from newstore_common.aws.sqs import process_sqs_batch
 from newstore_common.enqueuing import Enqueuing
-from newstore_common.newstore.events import validate_event_base, NewstoreEvent, create_from_sqs
+from newstore_common.newstore.events import validate_event_base, NewstoreEvent, create_from_sqs, \
+    create_from_sqs_record
 
 logger = logging.getLogger(__name__)
 logging.basicConfig()
@@ -72,3 +74,20 @@ def dequeue_sqs_event(aws_event: {}, enqueuing_config: {}, lambda_parameters: {}
     result = enqueuing.dequeue(ns_event)
 
     return result
+
+
+def dequeue_sqs_batch(aws_event: {}, enqueuing_config: {}, lambda_parameters: {}, max_workers: int = 1):
+    """
+    Dequeues every event of the sqs batch, up to max_workers at a time, and returns the batchItemFailures
+    of the events that were invalid or whose handler raised, so that only those are retried.
+    """
+    enqueuing = Enqueuing(enqueuing_config["default_queue"], enqueuing_config, lambda_parameters)
+
+    def dequeue_record(record: dict):
+        success, message, ns_event = create_from_sqs_record(record)
+        if not success:
+            # todo push directly into dlq
+            raise Exception(f"Got invalid event in queue: {message}")
+        return enqueuing.dequeue(ns_event)
+
+    return process_sqs_batch(aws_event, dequeue_record, max_workers)
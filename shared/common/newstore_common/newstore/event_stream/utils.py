@@ -6,6 +6,7 @@ from dataclasses import dataclass
 from typing import Callable, Any
 from decimal import Decimal
 from dacite import from_dict, Config
+from newstore_common.aws.sqs import process_sqs_batch
 from newstore_common.newstore.event_stream.order_completed import OrderCompleted
 
 from . import OrderCreated, OrderItemsCancelled, ReturnProcessed, FulfillmentRequestItemsCompleted, \
@@ -79,7 +80,11 @@ def _from_eventbridge(raw_event: dict):
 
 
 def _from_sqs(raw_event: dict):
-    return from_json(json.loads(raw_event["Records"][0]["body"]))
+    return _from_sqs_record(raw_event["Records"][0])
+
+
+def _from_sqs_record(record: dict):
+    return from_json(json.loads(record["body"]))
 
 
 def _from_any(raw_event):
@@ -116,6 +121,47 @@ def with_any(method: Callable[[dataclass, object, dict, Any], Any]) -> Any:
     return wrapper
 
 
+# Decorator
+def with_sqs_batch(method: Callable[[dataclass, object, dict, Any], Any] = None, max_workers: int = 1) -> Any:
+    """
+    Calls the method for every record of the sqs event, with the record instead of the raw event,
+    and returns the batchItemFailures of the records that raised.
+    Use @with_sqs_batch, or @with_sqs_batch(max_workers=...) to process records in a thread pool.
+    """
+    def decorator(inner: Callable[[dataclass, object, dict, Any], Any]) -> Any:
+        @wraps(inner)
+        def wrapper(raw_event: {}, context: object, *args) -> Any:
+            return process_sqs_batch(
+                raw_event, lambda record: inner(_from_sqs_record(record), context, record, *args), max_workers)
+
+        return wrapper
+
+    if method is None:
+        return decorator
+    return decorator(method)
+
+
+# Decorator
+def with_any_batch(method: Callable[[dataclass, object, dict, Any], Any] = None, max_workers: int = 1) -> Any:
+    """
+    Like with_sqs_batch for sqs events, eventbridge events are passed on as they are by with_any.
+    """
+    def decorator(inner: Callable[[dataclass, object, dict, Any], Any]) -> Any:
+        sqs_wrapper = with_sqs_batch(inner, max_workers=max_workers)
+
+        @wraps(inner)
+        def wrapper(raw_event: {}, context: object, *args) -> Any:
+            if "Records" in raw_event:
+                return sqs_wrapper(raw_event, context, *args)
+            return inner(_from_eventbridge(raw_event), context, raw_event, *args)
+
+        return wrapper
+
+    if method is None:
+        return decorator
+    return decorator(method)
+
+
 # Decorator
 def with_flask(data_class: dataclass) -> Callable[..., Any]:
     def decorator(method: Callable[..., Any]) -> Any:
@@ -47,7 +47,11 @@ class EventBuilder:
 
 def create_from_sqs(sqs_event) -> Tuple[bool, str, Optional[NewstoreEvent]]:
     logger.info(f"Received sqs event: {sqs_event}")
-    newstore_event = json.loads(sqs_event["Records"][0]["body"])
+    return create_from_sqs_record(sqs_event["Records"][0])
+
+
+def create_from_sqs_record(sqs_record: dict) -> Tuple[bool, str, Optional[NewstoreEvent]]:
+    newstore_event = json.loads(sqs_record["body"])
     logger.info(
         f"received newstore event:  {json.dumps(newstore_event, indent=4)}")
     (result, message) = validate_event_dict(newstore_event)
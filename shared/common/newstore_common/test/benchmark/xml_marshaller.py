@@ -0,0 +1,54 @@
+"""
+Compares XmlMarshaller and CompiledXmlMarshaller on a generated SFCC order export.
+
+ - XmlMarshaller: parse, then xml_to_dataclass for every order
+ - compiled: parse, then CompiledXmlMarshaller.xml_to_dataclass for every order
+ - compiled iterparse: CompiledXmlMarshaller.iter_dataclasses over the export
+
+Usage: python -m newstore_common.test.benchmark.xml_marshaller [orders]
+"""
+import io
+import sys
+import time
+from xml.etree import ElementTree
+
+from newstore_common.sfcc.xml_api.order.order_data import Order
+from newstore_common.xml.xml_marshaller import XmlMarshaller, CompiledXmlMarshaller, NamingConvention
+from newstore_common.test.unit.xml.sample_orders import build_orders
+
+
+def _parse_and_marshal(marshaller):
+    def run(export: bytes):
+        root = ElementTree.parse(io.BytesIO(export)).getroot()
+        return sum(1 for order in root if marshaller.xml_to_dataclass(order, Order))
+
+    return run
+
+
+def _iterparse(marshaller):
+    def run(export: bytes):
+        return sum(1 for _ in marshaller.iter_dataclasses(io.BytesIO(export), 'order', Order))
+
+    return run
+
+
+def benchmark(count: int):
+    export = build_orders(count).encode('utf-8')
+    print(f'{count} orders, {len(export) / 1024 / 1024:.1f} MB')
+    runs = [
+        ('XmlMarshaller', _parse_and_marshal(XmlMarshaller(NamingConvention.KEBAB_CASE,
+                                                           has_wrapper_around_lists=True))),
+        ('compiled', _parse_and_marshal(CompiledXmlMarshaller(NamingConvention.KEBAB_CASE,
+                                                              has_wrapper_around_lists=True))),
+        ('compiled iterparse', _iterparse(CompiledXmlMarshaller(NamingConvention.KEBAB_CASE,
+                                                                has_wrapper_around_lists=True)))
+    ]
+    for name, run in runs:
+        started_at = time.time()
+        built = run(export)
+        elapsed = time.time() - started_at
+        print(f'{name:<20} {built} orders in {elapsed:.2f}s: {built / elapsed:.0f} orders/s')
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,69 @@
+"""
+Compares XmlTrimmer and CompiledXmlTrimmer on a generated SFCC order export, time and peak memory.
+
+ - XmlTrimmer: parse, trim, remove_namespaces
+ - compiled parse: CompiledXmlTrimmer.parse, trimmed while parsed
+ - compiled iter_elements: CompiledXmlTrimmer.iter_elements, one trimmed order at a time
+
+Usage: python -m newstore_common.test.benchmark.xml_trimmer [orders]
+"""
+import io
+import sys
+import time
+import tracemalloc
+from xml.etree import ElementTree
+
+from newstore_common.xml.xml_trimmer import XmlTrimmer, CompiledXmlTrimmer
+from newstore_common.test.unit.xml.sample_orders import build_orders, NAMESPACE
+
+TRIMMING_CONFIG = {
+    'order': {
+        'product-lineitems': {
+            'product-lineitem': {
+                'custom-attributes': '.*',
+                'price-adjustments': 'self'
+            }
+        },
+        'shipments': 'self',
+        'totals': 'self',
+        'custom-attributes': 'custom-'
+    }
+}
+WHITELISTED_ATTRIBUTES = {'attribute-id': ['channel']}
+
+
+def _xml_trimmer(export: bytes):
+    root = ElementTree.parse(io.BytesIO(export)).getroot()
+    XmlTrimmer(TRIMMING_CONFIG, WHITELISTED_ATTRIBUTES).trim(root)
+    XmlTrimmer.remove_namespaces(root)
+    return len(root)
+
+
+def _compiled_parse(export: bytes):
+    trimmer = CompiledXmlTrimmer(TRIMMING_CONFIG, WHITELISTED_ATTRIBUTES, strip_namespaces=True)
+    return len(trimmer.parse(io.BytesIO(export)))
+
+
+def _compiled_iter_elements(export: bytes):
+    trimmer = CompiledXmlTrimmer(TRIMMING_CONFIG, WHITELISTED_ATTRIBUTES, strip_namespaces=True)
+    return sum(1 for _ in trimmer.iter_elements(io.BytesIO(export), 'order'))
+
+
+def benchmark(count: int):
+    export = build_orders(count, NAMESPACE).encode('utf-8')
+    print(f'{count} orders, {len(export) / 1024 / 1024:.1f} MB')
+    for name, run in [('XmlTrimmer', _xml_trimmer), ('compiled parse', _compiled_parse),
+                      ('compiled iter_elements', _compiled_iter_elements)]:
+        started_at = time.time()
+        orders = run(export)
+        elapsed = time.time() - started_at
+
+        tracemalloc.start()
+        run(export)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{name:<24} {orders} orders in {elapsed:.2f}s, peak memory {peak / 1024 / 1024:.1f} MB')
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
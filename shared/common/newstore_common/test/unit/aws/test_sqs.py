@@ -0,0 +1,48 @@
+from newstore_common.aws.sqs import process_sqs_batch
+
+
+def _record(message_id: str, body: str, group_id: str = None):
+    record = {"messageId": message_id, "body": body, "eventSourceARN": "arn:aws:sqs:us-east-1:1:queue"}
+    if group_id:
+        record["eventSourceARN"] += ".fifo"
+        record["attributes"] = {"MessageGroupId": group_id}
+    return record
+
+
+def _fail_on_bad(record):
+    if record["body"] == "bad":
+        raise ValueError("bad message")
+    return record["body"]
+
+
+class TestProcessSqsBatch:
+
+    def test_reports_failed_messages(self):
+        event = {"Records": [_record("1", "ok"), _record("2", "bad"), _record("3", "ok")]}
+
+        assert process_sqs_batch(event, _fail_on_bad) == {"batchItemFailures": [{"itemIdentifier": "2"}]}
+
+    def test_thread_pool(self):
+        processed = []
+        event = {"Records": [_record(str(index), "bad" if index % 3 == 0 else "ok") for index in range(10)]}
+
+        def process(record):
+            processed.append(record["messageId"])
+            _fail_on_bad(record)
+
+        response = process_sqs_batch(event, process, max_workers=4)
+        assert sorted(processed) == sorted(str(index) for index in range(10))
+        assert response == {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in ["0", "3", "6", "9"]]}
+
+    def test_fifo_group_fails_after_first_failure(self):
+        processed = []
+        event = {"Records": [_record("1", "ok", "a"), _record("2", "bad", "a"), _record("3", "ok", "a"),
+                             _record("4", "ok", "b")]}
+
+        def process(record):
+            processed.append(record["messageId"])
+            _fail_on_bad(record)
+
+        response = process_sqs_batch(event, process, max_workers=4)
+        assert processed == ["1", "2", "4"]
+        assert response == {"batchItemFailures": [{"itemIdentifier": "2"}, {"itemIdentifier": "3"}]}
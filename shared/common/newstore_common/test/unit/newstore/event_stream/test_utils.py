@@ -1,7 +1,7 @@
 from newstore_common.aws.context import FakeAwsContext
 from newstore_common.newstore.event_stream import FulfillmentRequestItemsCompleted
 
-from newstore_common.newstore.event_stream.utils import with_any
+from newstore_common.newstore.event_stream.utils import with_any, with_sqs_batch, with_any_batch
 
 class TestUtils:
 
@@ -59,3 +59,38 @@ class TestUtils:
         assert ret[2] == raw_event
         assert ret[3] == "extra1"
         assert ret[4] == "extra2"
+
+    def test_with_sqs_batch(self):
+        body = "{\"tenant\": \"ganni\", \"name\": \"fulfillment_request.items_completed\", \"published_at\": \"2019-04-11T13: 19: 01.255Z\", \"payload\": {\"service_level\": \"LEVEL\", \"id\": \"%s\", \"order_id\": \"ac1e1b20-a22d-4772-8688-6c4195cd71ca\", \"logical_timestamp\": 175, \"fulfillment_location_id\": \"STRG\", \"associate_id\": \"unknown\", \"items\": [{\"id\": \"9ea84bce-a657-4962-885f-1b18059ce690\", \"product_id\": \"F317218008\"}]}}"
+        raw_event = {
+            "Records": [
+                {"messageId": "m1", "body": body % "fr-1"},
+                {"messageId": "m2", "body": body % "fr-2"},
+                {"messageId": "m3", "body": "not json"}
+            ]
+        }
+        received = []
+
+        @with_sqs_batch(max_workers=2)
+        def method(event, context, record, extra):
+            assert type(event) == FulfillmentRequestItemsCompleted
+            assert extra == "extra"
+            if event.payload.id == "fr-2":
+                raise Exception("handler failed")
+            received.append(record["messageId"])
+
+        ret = method(raw_event, FakeAwsContext, "extra")
+        assert received == ["m1"]
+        assert ret == {"batchItemFailures": [{"itemIdentifier": "m2"}, {"itemIdentifier": "m3"}]}
+
+    def test_with_any_batch_eventbridge(self):
+
+        @with_any_batch
+        def method(event, context, raw_event):
+            return event
+
+        raw_event = {
+            "detail": {"tenant": "ganni", "name": "fulfillment_request.items_completed", "published_at": "2019-04-11T13: 19: 01.255Z", "payload": {"service_level": "LEVEL", "id": "1f3bc00b-4c07-4a52-a33b-6e622b57d1da", "order_id": "ac1e1b20-a22d-4772-8688-6c4195cd71ca", "logical_timestamp": 175, "fulfillment_location_id": "STRG", "associate_id": "unknown", "items": [{"id": "9ea84bce-a657-4962-885f-1b18059ce690", "product_id": "F317218008"}]}}
+        }
+
+        assert type(method(raw_event, FakeAwsContext)) == FulfillmentRequestItemsCompleted
@@ -0,0 +1,145 @@
+NAMESPACE = 'http://www.demandware.com/xml/impex/order/2006-10-31'
+
+ADDRESS = '''
+            <first-name>Jane</first-name>
+            <last-name>Doe</last-name>
+            <address1>Main Street 1</address1>
+            <city>Copenhagen</city>
+            <postal-code>1000</postal-code>
+            <country-code>DK</country-code>
+            <phone>+45 12345678</phone>'''
+
+PRICE_ADJUSTMENT = '''
+                <price-adjustment>
+                    <net-price>-8.00</net-price>
+                    <tax>-2.00</tax>
+                    <gross-price>-10.00</gross-price>
+                    <base-price>-10.00</base-price>
+                    <lineitem-text>Summer sale</lineitem-text>
+                    <tax-basis>-10.00</tax-basis>
+                    <promotion-id>summer</promotion-id>
+                    <campaign-id>summer-campaign</campaign-id>
+                </price-adjustment>'''
+
+TOTAL = '''
+            <{name}>
+                <net-price>80.00</net-price>
+                <tax>20.00</tax>
+                <gross-price>100.00</gross-price>
+                <price-adjustments>{adjustments}
+                </price-adjustments>
+            </{name}>'''
+
+PRODUCT_LINEITEM = '''
+        <product-lineitem>
+            <net-price>40.00</net-price>
+            <tax>10.00</tax>
+            <gross-price>50.00</gross-price>
+            <base-price>50.00</base-price>
+            <lineitem-text>Shirt {position}</lineitem-text>
+            <tax-basis>50.00</tax-basis>
+            <position>{position}</position>
+            <product-id>SKU-{position}</product-id>
+            <product-name>Shirt</product-name>
+            <quantity unit="">1.0</quantity>
+            <tax-rate>0.25</tax-rate>
+            <shipment-id>00001</shipment-id>
+            <gift>false</gift>
+            <price-adjustments>{adjustments}
+            </price-adjustments>
+            <custom-attributes>
+                <custom-attribute attribute-id="color">blue</custom-attribute>
+            </custom-attributes>
+        </product-lineitem>'''
+
+ORDER = '''
+    <order order-no="{order_no}">
+        <order-date>2020-01-01T10:00:00.000Z</order-date>
+        <created-by>storefront</created-by>
+        <original-order-no>{order_no}</original-order-no>
+        <currency>DKK</currency>
+        <customer-locale>da_DK</customer-locale>
+        <taxation>gross</taxation>
+        <invoice-no>INV{order_no}</invoice-no>
+        <customer>
+            <customer-no>C1</customer-no>
+            <customer-name>Jane Doe</customer-name>
+            <customer-email>jane@example.com</customer-email>
+            <billing-address>{address}
+            </billing-address>
+        </customer>
+        <status>
+            <order-status>NEW</order-status>
+            <shipping-status>NOT_SHIPPED</shipping-status>
+            <confirmation-status>CONFIRMED</confirmation-status>
+            <payment-status>PAID</payment-status>
+        </status>
+        <current-order-no>{order_no}</current-order-no>
+        <product-lineitems>{product_lineitems}
+        </product-lineitems>
+        <shipping-lineitems>
+            <shipping-lineitem>
+                <net-price>4.00</net-price>
+                <tax>1.00</tax>
+                <gross-price>5.00</gross-price>
+                <base-price>5.00</base-price>
+                <lineitem-text>Shipping</lineitem-text>
+                <tax-basis>5.00</tax-basis>
+                <item-id>STANDARD_SHIPPING</item-id>
+                <shipment-id>00001</shipment-id>
+                <tax-rate>0.25</tax-rate>
+            </shipping-lineitem>
+        </shipping-lineitems>
+        <shipments>
+            <shipment shipment-id="00001">
+                <status>
+                    <shipping-status>NOT_SHIPPED</shipping-status>
+                </status>
+                <shipping-method>standard</shipping-method>
+                <shipping-address>{address}
+                </shipping-address>
+                <gift>false</gift>
+                <totals>{shipment_totals}
+                </totals>
+            </shipment>
+        </shipments>
+        <totals>{order_totals}
+        </totals>
+        <payments>
+            <payment>
+                <custom-method>
+                    <method-name>ADYEN</method-name>
+                </custom-method>
+                <transaction-id>T{order_no}</transaction-id>
+                <amount>105.00</amount>
+            </payment>
+        </payments>
+        <custom-attributes>
+            <custom-attribute attribute-id="channel">web</custom-attribute>
+            <custom-attribute attribute-id="newsletter">true</custom-attribute>
+        </custom-attributes>
+    </order>'''
+
+
+def build_order(order_no: int, lineitems: int = 3) -> str:
+    def total(name, adjustments=''):
+        return TOTAL.format(name=name, adjustments=adjustments)
+
+    return ORDER.format(
+        order_no=order_no,
+        address=ADDRESS,
+        product_lineitems=''.join(PRODUCT_LINEITEM.format(position=position, adjustments=PRICE_ADJUSTMENT)
+                                  for position in range(1, lineitems + 1)),
+        shipment_totals=''.join(total(name) for name in ['merchandize-total', 'adjusted-merchandize-total',
+                                                          'shipping-total', 'adjusted-shipping-total',
+                                                          'shipment-total']),
+        order_totals=''.join(total(name, PRICE_ADJUSTMENT if name == 'merchandize-total' else '')
+                             for name in ['merchandize-total', 'adjusted-merchandize-total', 'shipping-total',
+                                          'adjusted-shipping-total', 'order-total'])
+    )
+
+
+def build_orders(count: int, namespace: str = '') -> str:
+    xmlns = f' xmlns="{namespace}"' if namespace else ''
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<orders{xmlns}>' + \
+        ''.join(build_order(order_no) for order_no in range(1, count + 1)) + '\n</orders>\n'
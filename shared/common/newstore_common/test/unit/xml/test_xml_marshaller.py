@@ -0,0 +1,44 @@
+import io
+from xml.etree import ElementTree
+
+from newstore_common.sfcc.xml_api.order.order_data import Order
+from newstore_common.xml.xml_marshaller import XmlMarshaller, CompiledXmlMarshaller, NamingConvention
+from newstore_common.test.unit.xml.sample_orders import build_orders, NAMESPACE
+
+
+class TestCompiledXmlMarshaller:
+
+    def test_same_dataclasses_as_xml_marshaller(self):
+        root = ElementTree.fromstring(build_orders(3))
+        marshaller = XmlMarshaller(NamingConvention.KEBAB_CASE, has_wrapper_around_lists=True)
+        compiled = CompiledXmlMarshaller(NamingConvention.KEBAB_CASE, has_wrapper_around_lists=True)
+
+        expected = [marshaller.xml_to_dataclass(order, Order) for order in root]
+        orders = [compiled.xml_to_dataclass(order, Order) for order in root]
+
+        assert orders == expected
+        assert orders[1].order_id == '2'
+        assert orders[0].product_lineitems[2].position == 3
+        assert orders[0].product_lineitems[0].gift is False
+        assert orders[0].custom_attributes[0].attributes == {'attribute-id': 'channel'}
+        assert orders[0].payments[0].custom_method.method_name == 'ADYEN'
+        assert orders[0].payments[0].gift_certificate is None
+
+    def test_tree_is_not_modified(self):
+        root = ElementTree.fromstring(build_orders(1))
+        compiled = CompiledXmlMarshaller(NamingConvention.KEBAB_CASE, has_wrapper_around_lists=True)
+
+        compiled.xml_to_dataclass(root[0], Order)
+
+        assert root[0].find('order-date') is not None
+
+    def test_iter_dataclasses(self):
+        expected_root = ElementTree.fromstring(build_orders(5))
+        marshaller = XmlMarshaller(NamingConvention.KEBAB_CASE, has_wrapper_around_lists=True)
+        expected = [marshaller.xml_to_dataclass(order, Order) for order in expected_root]
+
+        compiled = CompiledXmlMarshaller(NamingConvention.KEBAB_CASE, has_wrapper_around_lists=True,
+                                         ignore_namespaces=True)
+        source = io.BytesIO(build_orders(5, NAMESPACE).encode('utf-8'))
+
+        assert list(compiled.iter_dataclasses(source, 'order', Order)) == expected
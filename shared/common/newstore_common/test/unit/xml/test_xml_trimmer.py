@@ -0,0 +1,69 @@
+import io
+from xml.etree import ElementTree
+
+from newstore_common.xml.xml_trimmer import XmlTrimmer, CompiledXmlTrimmer
+from newstore_common.test.unit.xml.sample_orders import build_orders, NAMESPACE
+
+TRIMMING_CONFIG = {
+    'order': {
+        'product-lineitems': {
+            'product-lineitem': {
+                'custom-attributes': '.*',
+                'price-adjustments': 'price-'
+            }
+        },
+        'shipments': 'self',
+        'custom-attributes': 'custom-'
+    }
+}
+WHITELISTED_ATTRIBUTES = {'attribute-id': ['channel']}
+
+
+def _trimmed_by_xml_trimmer(document: str) -> bytes:
+    root = ElementTree.fromstring(document)
+    XmlTrimmer(TRIMMING_CONFIG, WHITELISTED_ATTRIBUTES).trim(root)
+    XmlTrimmer.remove_namespaces(root)
+    return ElementTree.tostring(root)
+
+
+class TestCompiledXmlTrimmer:
+
+    def test_parse_trims_like_xml_trimmer(self):
+        document = build_orders(3, NAMESPACE)
+        trimmer = CompiledXmlTrimmer(TRIMMING_CONFIG, WHITELISTED_ATTRIBUTES, strip_namespaces=True)
+
+        root = trimmer.parse(io.BytesIO(document.encode('utf-8')))
+
+        assert ElementTree.tostring(root) == _trimmed_by_xml_trimmer(document)
+        order = root.find('order')
+        assert order.find('shipments') is None
+        assert [el.get('attribute-id') for el in order.find('custom-attributes')] == ['channel']
+        assert len(order.find('product-lineitems/product-lineitem/custom-attributes')) == 0
+
+    def test_trim_in_place(self):
+        document = build_orders(2)
+        root = ElementTree.fromstring(document)
+
+        CompiledXmlTrimmer(TRIMMING_CONFIG, WHITELISTED_ATTRIBUTES).trim(root)
+
+        assert ElementTree.tostring(root) == _trimmed_by_xml_trimmer(document)
+
+    def test_siblings_of_removed_elements_are_trimmed(self):
+        document = '<root><a/><a/><b><c/><c/><d/></b></root>'
+        trimmer = CompiledXmlTrimmer({'a': 'self', 'b': 'c'}, None)
+
+        root = ElementTree.fromstring(document)
+        trimmer.trim(root)
+
+        assert ElementTree.tostring(root) == b'<root><b><d /></b></root>'
+        assert ElementTree.tostring(trimmer.parse(io.BytesIO(document.encode('utf-8')))) == ElementTree.tostring(root)
+
+    def test_iter_elements(self):
+        document = build_orders(4, NAMESPACE).encode('utf-8')
+        trimmer = CompiledXmlTrimmer(TRIMMING_CONFIG, WHITELISTED_ATTRIBUTES, strip_namespaces=True)
+        expected = list(trimmer.parse(io.BytesIO(document)))
+
+        orders = list(trimmer.iter_elements(io.BytesIO(document), 'order'))
+
+        assert [order.get('order-no') for order in orders] == ['1', '2', '3', '4']
+        assert [ElementTree.tostring(order) for order in orders] == [ElementTree.tostring(order) for order in expected]
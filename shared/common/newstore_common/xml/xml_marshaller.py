@@ -1,6 +1,6 @@
 import copy
 from enum import IntEnum
-from typing import Type, Union, TypeVar, _GenericAlias, Any, List
+from typing import Type, Union, TypeVar, _GenericAlias, Any, List, Callable, Dict, Iterator, NamedTuple, Tuple
 from dataclasses import fields, dataclass, is_dataclass
 from xml.etree import ElementTree
 from newstore_common.sfcc.xml_api.order.common_fields import TextNode
@@ -131,3 +131,160 @@ class XmlMarshaller:
         return hasattr(type_, '__origin__')
 
 
+
+
+class _FieldKind(IntEnum):
+    PLAIN = 0
+    LIST = 1
+    OPTIONAL = 2
+
+
+class _FieldPlan(NamedTuple):
+    name: str
+    kind: _FieldKind
+    field_type: Type
+    inner_type: Type
+    build_leaf: Callable[[ElementTree.Element], Any]
+
+
+class _DataclassPlan(NamedTuple):
+    fields: Tuple[_FieldPlan, ...]
+    has_attributes: bool
+
+
+class CompiledXmlMarshaller(XmlMarshaller):
+    """
+    Builds the same dataclasses as XmlMarshaller, without copying the tree or renaming its tags:
+    - the fields of every dataclass and how to build them are worked out once and cached
+    - tags are mapped to field names on lookup, each mapped tag name is cached
+    - the children of an element are grouped by field name in one pass instead of a findall per field
+
+    iter_dataclasses() builds the dataclasses of a document while it is parsed, so that only the element
+    being built is held in memory.
+    """
+
+    _plans: Dict[Type, _DataclassPlan] = {}
+    _leaf_builders: Dict[Any, Callable[[ElementTree.Element], Any]] = {}
+
+    def __init__(
+            self,
+            source_casing: NamingConvention,
+            data_class_field_casing: NamingConvention = NamingConvention.SNAKE_CASE,
+            has_wrapper_around_lists: bool = False,
+            ignore_namespaces: bool = False):
+        super().__init__(source_casing, data_class_field_casing, has_wrapper_around_lists)
+        self.ignore_namespaces = ignore_namespaces
+        self._tag_names: Dict[str, str] = {}
+
+    def xml_to_dataclass(self, xml_element: ElementTree.Element, data_class: dc_type) -> dc_type:
+        return self._build_compiled(xml_element, data_class, None)
+
+    def iter_dataclasses(self, source, tag: str, data_class: dc_type) -> Iterator[dc_type]:
+        """
+        Parses a document with iterparse and yields a dataclass for every element named tag, e.g. every
+        order of an order export. Elements are cleared once they are built.
+
+        :param source: file name or binary file object of the document
+        :param tag: name of the elements to build in the source casing, without namespace
+        :param data_class: dataclass to build from the elements
+        """
+        name = self._get_name(tag)
+        path = []
+        for event, element in ElementTree.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                path.append(element)
+                continue
+
+            path.pop()
+            if self._get_name(element.tag) != name:
+                continue
+            yield self._build_compiled(element, data_class, None)
+            element.clear()
+            if path:
+                path[-1].remove(element)
+
+    def _get_name(self, tag: str) -> str:
+        name = self._tag_names.get(tag)
+        if name is None:
+            local_tag = tag.rsplit('}', 1)[-1] if self.ignore_namespaces else tag
+            name = self._tag_names[tag] = self._combine_tokens(self._split_to_tokens(local_tag))
+        return name
+
+    def _build_compiled(
+            self,
+            xml_element: ElementTree.Element,
+            data_class: dataclass,
+            outer_type: Type) -> dataclass:
+        if xml_element is None or not len(xml_element):
+            return self._get_leaf_builder(data_class if outer_type is None else outer_type)(xml_element)
+
+        plan = self._get_plan(data_class)
+        children = {}
+        get_name = self._get_name
+        for child in xml_element:
+            name = get_name(child.tag)
+            if name in children:
+                children[name].append(child)
+            else:
+                children[name] = [child]
+
+        dataclass_params = {}
+        build = self._build_compiled
+        for field in plan.fields:
+            elements = children.get(field.name)
+            if field.kind == _FieldKind.LIST:
+                if self.has_wrapper_around_lists and elements:
+                    elements = list(elements[0])
+                inner_type, build_leaf = field.inner_type, field.build_leaf
+                dataclass_params[field.name] = [build(el, inner_type, inner_type) if len(el) else build_leaf(el)
+                                                for el in elements or ()]
+            elif not elements:
+                dataclass_params[field.name] = field.build_leaf(None) if field.kind == _FieldKind.OPTIONAL else None
+            elif len(elements[0]):
+                field_class = field.inner_type if field.kind == _FieldKind.OPTIONAL else field.field_type
+                dataclass_params[field.name] = build(elements[0], field_class, field.field_type)
+            else:
+                dataclass_params[field.name] = field.build_leaf(elements[0])
+
+        if plan.has_attributes:
+            dataclass_params['attributes'] = dict(xml_element.attrib)
+
+        return data_class(**dataclass_params)
+
+    def _get_plan(self, data_class: dataclass) -> _DataclassPlan:
+        plan = self._plans.get(data_class)
+        if plan is None:
+            field_plans = []
+            for field in fields(data_class):
+                if self._is_list_type(field.type):
+                    kind = _FieldKind.LIST
+                elif self._is_optional_type(field.type):
+                    kind = _FieldKind.OPTIONAL
+                else:
+                    kind = _FieldKind.PLAIN
+                inner_type = self._get_inner_type(field.type) if kind != _FieldKind.PLAIN else None
+                # the builder of the field's elements without children
+                build_leaf = self._get_leaf_builder(inner_type if kind == _FieldKind.LIST else field.type)
+                field_plans.append(_FieldPlan(field.name, kind, field.type, inner_type, build_leaf))
+            plan = self._plans[data_class] = _DataclassPlan(
+                tuple(field_plans), any(field.name == 'attributes' for field in field_plans))
+        return plan
+
+    def _get_leaf_builder(self, field_type: Union[type, _GenericAlias]) -> Callable[[ElementTree.Element], Any]:
+        builder = self._leaf_builders.get(field_type)
+        if builder is None:
+            builder = self._leaf_builders[field_type] = self._compile_leaf_builder(field_type)
+        return builder
+
+    def _compile_leaf_builder(self, field_type: Union[type, _GenericAlias]) -> Callable[[ElementTree.Element], Any]:
+        if field_type == bool:
+            return lambda element: element.text.lower() in ['true', '1']
+        elif field_type == TextNode:
+            return lambda element: TextNode(attributes=dict(element.attrib), text=element.text)
+        elif self._is_optional_type(field_type):
+            constructor = self._get_inner_type(field_type)
+            return lambda element: None if element is None or element.text is None else constructor(element.text)
+        elif not is_dataclass(field_type):
+            return lambda element: field_type(element.text)
+        else:
+            return lambda element: None
@@ -1,4 +1,7 @@
 import re
+import sys
+from enum import IntEnum
+from typing import Dict, Iterator, Optional, Pattern, Tuple, Union
 from xml.etree import ElementTree
 
 
@@ -47,4 +50,196 @@ class XmlTrimmer:
 
     def is_whitelisted(self, element):
         common_attributes = set(element.keys()).intersection(self.whitelisted_attributes.keys())
-        return any(element.get(attrib) in self.whitelisted_attributes.get(attrib) for attrib in common_attributes)
\ No newline at end of file
+        return any(element.get(attrib) in self.whitelisted_attributes.get(attrib) for attrib in common_attributes)
+
+
+class _TrimAction(IntEnum):
+    REMOVE = 0
+    REMOVE_CHILDREN = 1
+    TRIM = 2
+
+
+_TrimRules = Dict[str, Tuple[_TrimAction, Union[None, Pattern, dict]]]
+
+READ_SIZE = 64 * 1024
+
+
+class CompiledXmlTrimmer:
+    """
+    Trims like XmlTrimmer with the trimming config compiled once into a table of tag -> action, with the
+    patterns compiled and the namespace stripped tags cached.
+
+    parse() and iter_elements() trim while the document is parsed: the elements that are trimmed away are
+    never built, so large feeds are trimmed in one pass without holding the untrimmed tree.
+    Unlike XmlTrimmer.trim, siblings that follow a removed element are trimmed too.
+    """
+
+    def __init__(self, trimming_config, whitelisted_attributes, strip_namespaces: bool = False):
+        """
+        :param trimming_config: tag -> 'self' to remove the element, a pattern to remove the children whose tag
+                                matches it, or the config of the element's children
+        :param whitelisted_attributes: attribute -> values of the elements that patterns never remove
+        :param strip_namespaces: whether parsed elements have tags without namespace, like after remove_namespaces
+        """
+        self.rules = self.compile(trimming_config)
+        whitelisted_attributes = whitelisted_attributes if whitelisted_attributes else {}
+        self.whitelisted_attributes = {attribute: frozenset(values)
+                                       for attribute, values in whitelisted_attributes.items()}
+        self.strip_namespaces = strip_namespaces
+        self._local_tags: Dict[str, str] = {}
+
+    @classmethod
+    def compile(cls, trim_config: dict) -> _TrimRules:
+        rules = {}
+        for tag, config in trim_config.items():
+            if type(config) == str:
+                if config == 'self':
+                    rules[tag] = (_TrimAction.REMOVE, None)
+                else:
+                    rules[tag] = (_TrimAction.REMOVE_CHILDREN, re.compile(config))
+            else:
+                rules[tag] = (_TrimAction.TRIM, cls.compile(config))
+        return rules
+
+    def local_tag(self, tag: str) -> str:
+        local_tag = self._local_tags.get(tag)
+        if local_tag is None:
+            local_tag = self._local_tags[tag] = sys.intern(tag.rsplit('}', 1)[-1])
+        return local_tag
+
+    def is_whitelisted(self, attrib: dict) -> bool:
+        return any(attrib.get(attribute) in values for attribute, values in self.whitelisted_attributes.items()
+                   if attribute in attrib)
+
+    def trim(self, element: ElementTree.Element, trim_config: dict = None):
+        """
+        Trims an element that is already parsed, in place.
+        """
+        self._trim(element, self.rules if trim_config is None else self.compile(trim_config))
+
+    def _trim(self, element: ElementTree.Element, rules: _TrimRules):
+        for child in list(element):
+            rule = rules.get(self.local_tag(child.tag))
+            if rule is None:
+                continue
+            action, argument = rule
+            if action == _TrimAction.REMOVE:
+                element.remove(child)
+            elif action == _TrimAction.REMOVE_CHILDREN:
+                for grandchild in list(child):
+                    if argument.match(self.local_tag(grandchild.tag)) and not self.is_whitelisted(grandchild.attrib):
+                        child.remove(grandchild)
+            else:
+                self._trim(child, argument)
+
+    def parse(self, source) -> ElementTree.Element:
+        """
+        Parses and trims a document in one pass.
+
+        :param source: file name or binary file object of the document
+        :return: the trimmed root element
+        """
+        builder = _TrimmingTreeBuilder(self)
+        for _ in self._feed(source, builder):
+            pass
+        return builder.root
+
+    def iter_elements(self, source, tag: str) -> Iterator[ElementTree.Element]:
+        """
+        Parses and trims a document in one pass, yielding every trimmed element named tag (without namespace),
+        e.g. every order of an order export, as soon as it is complete. Yielded elements are detached from the
+        tree, so only the current ones are held in memory.
+
+        :param source: file name or binary file object of the document
+        :param tag: name of the elements to yield
+        """
+        builder = _TrimmingTreeBuilder(self, sys.intern(tag))
+        for _ in self._feed(source, builder):
+            yield from builder.completed
+            builder.completed.clear()
+
+    @staticmethod
+    def _feed(source, builder: '_TrimmingTreeBuilder'):
+        close_source = not hasattr(source, 'read')
+        if close_source:
+            source = open(source, 'rb')
+        try:
+            parser = ElementTree.XMLParser(target=builder)
+            for data in iter(lambda: source.read(READ_SIZE), b''):
+                parser.feed(data)
+                yield
+            parser.close()
+            yield
+        finally:
+            if close_source:
+                source.close()
+
+
+class _TrimmingTreeBuilder:
+    """
+    Parser target that passes on to a TreeBuilder only the elements that are kept by the trimmer's rules.
+    """
+
+    def __init__(self, trimmer: CompiledXmlTrimmer, collect_tag: Optional[str] = None):
+        self.trimmer = trimmer
+        self.builder = ElementTree.TreeBuilder()
+        self.collect_tag = collect_tag
+        self.completed = []
+        self.root = None
+        # the rules of the children of every open element: a dict of rules, a pattern or None
+        self.rules = []
+        self.elements = []
+        self.skip_depth = 0
+        self.skip_tail = False
+
+    def start(self, tag: str, attrib: dict):
+        if self.skip_depth:
+            self.skip_depth += 1
+            return
+        self.skip_tail = False
+        local_tag = self.trimmer.local_tag(tag)
+
+        if not self.rules:
+            child_rules = self.trimmer.rules
+        else:
+            rules = self.rules[-1]
+            child_rules = None
+            if type(rules) == dict:
+                rule = rules.get(local_tag)
+                if rule is not None:
+                    action, argument = rule
+                    if action == _TrimAction.REMOVE:
+                        self.skip_depth = 1
+                        return
+                    child_rules = argument
+            elif rules is not None and rules.match(local_tag) and not self.trimmer.is_whitelisted(attrib):
+                self.skip_depth = 1
+                return
+
+        element = self.builder.start(local_tag if self.trimmer.strip_namespaces else tag, attrib)
+        if self.root is None:
+            self.root = element
+        self.rules.append(child_rules)
+        self.elements.append(element)
+
+    def end(self, tag: str):
+        if self.skip_depth:
+            self.skip_depth -= 1
+            # the tail of a trimmed element is dropped with it
+            self.skip_tail = not self.skip_depth
+            return
+        self.skip_tail = False
+        self.rules.pop()
+        element = self.elements.pop()
+        self.builder.end(element.tag)
+        if self.collect_tag is not None and self.trimmer.local_tag(tag) == self.collect_tag and self.elements:
+            self.elements[-1].remove(element)
+            self.completed.append(element)
+
+    def data(self, data: str):
+        if not self.skip_depth and not self.skip_tail:
+            self.builder.data(data)
+
+    def close(self) -> ElementTree.Element:
+        self.builder.close()
+        return self.root
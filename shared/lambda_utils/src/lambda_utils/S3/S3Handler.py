@@ -2,18 +2,25 @@ import logging
 import zipfile
 import glob
 import os
-import io
 import os.path
 import boto3
 import botocore
 import shutil
 import json
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
 
 class S3Handler:
     DOWNLOAD_PATH = '/tmp'
+    # Objects are downloaded with concurrent ranged GETs of RANGE_SIZE bytes into a temp file
+    # that stays in memory up to SPOOL_MAX_SIZE bytes
+    RANGE_SIZE = 8 * 1024 * 1024
+    MAX_CONCURRENCY = 10
+    SPOOL_MAX_SIZE = 64 * 1024 * 1024
 
     def __init__(self, record=None, bucket_name=None, key_name=None, profile_name=None, config=None):
         self.s3 = None
@@ -94,20 +101,79 @@ class S3Handler:
         self.load_s3_Object()
         self.object.put(Body=data)
 
-    def getFiles(self):
-        logger.info('Get File for Key --> %s' % self.getS3BucketKey())
+    def download_to_file(self, key=None, range_size=None, max_concurrency=None):
+        """
+        Downloads an object with concurrent ranged GETs into a temp file, kept in memory up to SPOOL_MAX_SIZE bytes.
+        :param key: the key of the object, the handler key by default
+        :param range_size: the size of the ranges
+        :param max_concurrency: the maximum number of GETs running at once
+        :return: the temp file, positioned at its start; the caller closes it
+        """
+        key = key or self.getS3BucketKey()
+        range_size = range_size or self.RANGE_SIZE
+        max_concurrency = max_concurrency or self.MAX_CONCURRENCY
+        s3 = self.getS3()
+        temp_file = tempfile.SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE, dir=self.DOWNLOAD_PATH)
 
-        obj = self.getS3Resource().Object(self.getS3BucketName(), self.getS3BucketKey())
+        # The first range also tells the size of the object, small objects need a single GET
+        try:
+            response = s3.get_object(Bucket=self.getS3BucketName(), Key=key, Range='bytes=0-%d' % (range_size - 1))
+        except botocore.exceptions.ClientError as e:
+            if e.response['Error']['Code'] != 'InvalidRange':
+                raise e
+            # empty objects have no byte range
+            response = s3.get_object(Bucket=self.getS3BucketName(), Key=key)
+        temp_file.write(response['Body'].read())
+        size = int(response.get('ContentRange', '/%d' % response['ContentLength']).split('/')[-1])
+        etag = response.get('ETag')
+        ranges = [(start, min(start + range_size, size) - 1) for start in range(range_size, size, range_size)]
+
+        if ranges:
+            lock = threading.Lock()
+
+            def get_range(byte_range):
+                start, end = byte_range
+                kwargs = {'IfMatch': etag} if etag else {}
+                data = s3.get_object(
+                    Bucket=self.getS3BucketName(), Key=key, Range='bytes=%d-%d' % (start, end), **kwargs)['Body'].read()
+                with lock:
+                    temp_file.seek(start)
+                    temp_file.write(data)
+
+            try:
+                with ThreadPoolExecutor(max_workers=min(max_concurrency, len(ranges))) as executor:
+                    list(executor.map(get_range, ranges))
+            except Exception:
+                temp_file.close()
+                raise
+
+        logger.info('Downloaded %s bytes of %s in %s ranges', size, key, len(ranges) + 1)
+        temp_file.seek(0)
+        return temp_file
+
+    def iter_files(self, key=None):
+        """
+        Yields the files of an object as (name, stream) one at a time. The members of a zip file are decompressed
+        lazily while their stream is read, other objects yield a single file. Streams are closed when the
+        next file is yielded.
+        :param key: the key of the object, the handler key by default
+        """
+        key = key or self.getS3BucketKey()
+        with self.download_to_file(key) as temp_file:
+            if not key.endswith('.zip'):
+                yield key.split("/")[-1], temp_file
+                return
+
+            with zipfile.ZipFile(temp_file, mode='r') as zipf:
+                for info in zipf.infolist():
+                    if info.filename.startswith('__MACOSX') or info.is_dir():
+                        continue
+                    with zipf.open(info) as member:
+                        yield info.filename, member
 
-        if self.getS3BucketKey().endswith('.zip'):
-            with io.BytesIO(obj.get()["Body"].read()) as tf:
-                # rewind the file
-                tf.seek(0)
-                # Read the file as a zipfile and process the members
-                with zipfile.ZipFile(tf, mode='r') as zf:
-                    return {name: zf.read(name) for name in zf.namelist()}
-        else:
-            return {self.getS3BucketKey().split("/")[-1]: obj.get()['Body'].read()}
+    def getFiles(self):
+        logger.info('Get File for Key --> %s' % self.getS3BucketKey())
+        return {name: stream.read() for name, stream in self.iter_files()}
 
     def getS3File(self):
         """
@@ -119,24 +185,11 @@ class S3Handler:
             logger.info("Reading Bucket and key name")
             # logger.info("Bucket: %s | File: %s" % (self.getS3BucketName(), self.getS3BucketKey()))
             filename = self.getS3BucketKey().split("/")[-1]
-            obj = self.getS3Resource().Object(self.getS3BucketName(), self.getS3BucketKey())
-
-            if self.getS3BucketKey().endswith('.zip'):
-                with io.BytesIO(obj.get()["Body"].read()) as tf:
-                    # rewind the file
-                    tf.seek(0)
-                    # Read the file as a zipfile and process the members
-                    with zipfile.ZipFile(tf, mode='r') as zipf:
-                        for subfile in zipf.namelist():
-                            if subfile.startswith('__MACOSX'):
-                                continue
-                            # Assumes only one.
-                            return {'file': filename, 'data': zipf.read(subfile)}
+            is_zip = self.getS3BucketKey().endswith('.zip')
 
-            else:
-                logger.info("Reading csv file")
-                byte_data = obj.get()['Body'].read()
-                return {'file': self.getS3BucketKey(), 'data': byte_data}
+            for _, stream in self.iter_files():
+                # Assumes only one.
+                return {'file': filename if is_zip else self.getS3BucketKey(), 'data': stream.read()}
         except Exception as ex:
             logger.exception(ex)
             raise ex
@@ -150,37 +203,37 @@ class S3Handler:
         try:
             logger.info("Reading Bucket and key name")
             # logger.info("Bucket: %s | File: %s" % (self.getS3BucketName(), self.getS3BucketKey()))
-            obj = self.getS3Resource().Object(self.getS3BucketName(), self.getS3BucketKey())
-
             if self.getS3BucketKey().endswith('.zip'):
-                with io.BytesIO(obj.get()["Body"].read()) as tf:
-                    # rewind the file
-                    tf.seek(0)
-                    # Read the file as a zipfile and process the members
-                    with zipfile.ZipFile(tf, mode='r') as zipf:
-                        files = []
-                        for subfile in zipf.namelist():
-                            if subfile.startswith('__MACOSX'):
-                                continue
-                            files.append({'file': subfile, 'data': zipf.read(subfile)})
-                        return files
+                return [{'file': name, 'data': stream.read()} for name, stream in self.iter_files()]
 
-            else:
-                logger.info("Reading csv file")
-                byte_data = obj.get()['Body'].read()
-                return [{'file': self.getS3BucketKey(), 'data': byte_data}]
+            logger.info("Reading csv file")
+            return [{'file': self.getS3BucketKey(), 'data': stream.read()} for _, stream in self.iter_files()]
         except Exception as ex:
             logger.exception(ex)
             raise ex
 
+    def get_objects(self, keys, max_concurrency=None):
+        """
+        Downloads many objects with at most max_concurrency GETs running at once.
+        :param keys: the keys of the objects
+        :return: a dict of key to object content
+        """
+        keys = list(keys)
+        s3 = self.getS3()
+
+        def get_object(key):
+            return key, s3.get_object(Bucket=self.getS3BucketName(), Key=key)['Body'].read()
+
+        if not keys:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(max_concurrency or self.MAX_CONCURRENCY, len(keys))) as executor:
+            return dict(executor.map(get_object, keys))
+
     def get_json_files_dict(self):
-        jsons = {}
         s3 = self.getS3Resource()
         bucket = s3.Bucket(self.getS3BucketName())
-        for file in bucket.objects.all():
-            if file.key[-4:] == 'json':
-                jsons[file.key] = json.loads(file.get()['Body'].read())
-        return jsons
+        keys = [file.key for file in bucket.objects.all() if file.key[-4:] == 'json']
+        return {key: json.loads(data) for key, data in self.get_objects(keys).items()}
 
     def validate_exists(self):
         if self.object is None:
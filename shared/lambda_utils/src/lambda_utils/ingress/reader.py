@@ -1,29 +1,132 @@
+import codecs
 import csv
 import datetime
+import io
 import logging
-from cStringIO import StringIO
-from structures import FailSafeDict, ATTR_MAP
+from .structures import FailSafeDict, ResultDict, ATTR_MAP
 
 logger = logging.getLogger()
 
+READ_BUFFER_SIZE = 1024 * 1024
+# Column groups of the ATTR_N::ATTR format that records() turns into lists: (kind, column key, record key)
+DELIMITED_GROUPS = [('image', 'IMAGE', 'images'), ('category', 'CATEGORY', 'categories')]
+
+
 class ContentReadError(Exception):
      def __init__(self, value):
          self.value = value
      def __str__(self):
          return repr(self.value)
-class ContentReader(csv.DictReader):
-    def next(self):
-        values = csv.DictReader.next(self)
-        decoded_values = {}
-        for k, v in values.iteritems():
-            try:
-                decoded_values[k] = v.decode('string_escape')
-            except Exception:
-                logger.error('Failed to decode \'%s\': \'%s\'', k, v)
-
-        if len(values) != len(decoded_values):
-            raise ContentReadError('Failed to decode \'{}\''.format(values))           
-        return FailSafeDict(decoded_values)
+
+
+class _RawStream(io.RawIOBase):
+    """
+    Adapts an object that only has a read(size) method, e.g. an S3 StreamingBody, to the io stack.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        return size
+
+
+def open_text(content, encoding='utf-8'):
+    """
+    Returns a text stream over CSV content that is read lazily.
+
+    :param content: CSV as a string or bytes, or a text or binary stream such as an S3 body or a zip member
+    :param string encoding: Encoding of binary content
+    """
+    if isinstance(content, str):
+        return io.StringIO(content, newline='')
+    if isinstance(content, (bytes, bytearray)):
+        content = io.BytesIO(content)
+    if isinstance(content, io.TextIOBase):
+        return content
+    if not isinstance(content, io.BufferedIOBase):
+        content = io.BufferedReader(_RawStream(content), READ_BUFFER_SIZE)
+    return io.TextIOWrapper(content, encoding=encoding, newline='')
+
+
+def decode_escapes(value):
+    """
+    Decodes backslash escapes like the former Python 2 value.decode('string_escape').
+    """
+    if '\\' not in value:
+        return value
+    return codecs.escape_decode(value.encode('utf-8'))[0].decode('utf-8')
+
+
+class ContentReader(object):
+    """
+    Iterates the CSV rows as FailSafeDicts keyed by the column names of the first line,
+    with backslash escapes decoded.
+    """
+
+    def __init__(self, file_object, *args, **kwargs):
+        self.reader = csv.reader(file_object, *args, **kwargs)
+        self._fieldnames = None
+
+    @property
+    def fieldnames(self):
+        if self._fieldnames is None:
+            self._fieldnames = next(self.reader, [])
+        return self._fieldnames
+
+    @property
+    def line_num(self):
+        return self.reader.line_num
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        fieldnames = self.fieldnames
+        row = next(self.reader)
+        while not row:
+            row = next(self.reader)
+
+        if len(row) != len(fieldnames):
+            logger.error('Row %s has %s values for %s columns', self.line_num, len(row), len(fieldnames))
+            raise ContentReadError('Failed to decode \'{}\''.format(row))
+        try:
+            return FailSafeDict(zip(fieldnames, map(decode_escapes, row)))
+        except Exception:
+            logger.error('Failed to decode row %s: \'%s\'', self.line_num, row)
+            raise ContentReadError('Failed to decode \'{}\''.format(row))
+
+
+class RecordPlan(object):
+    """
+    Column layout of the CSV content compiled once from its column names: which columns are
+    plain attributes, extended attributes, external identifiers or delimited attribute groups.
+    """
+
+    def __init__(self, fieldnames, extended_attributes, external_identifiers):
+        special = set(extended_attributes) | set(external_identifiers)
+        self.extended_attributes = [name for name in extended_attributes if name in fieldnames]
+        self.external_identifiers = list(external_identifiers)
+        self.delimited_groups = []
+        for kind, key, root in DELIMITED_GROUPS:
+            marker = key + '_'
+            columns = [column for column in fieldnames if marker in column]
+            if columns:
+                self.delimited_groups.append((kind, key, root))
+                special.update(columns)
+
+        type_cast = ATTR_MAP['type_cast']
+        self.plain_columns = [
+            (column, column.lower(), type_cast.get(column.lower()))
+            for column in fieldnames if column and column not in special
+        ]
+
 
 class CSVReader(object):
     path_map = {
@@ -34,11 +137,14 @@ class CSVReader(object):
 
     def __init__(self, csv_content, with_extra_attributes=False, init_head_call=None, *args, **kwargs):
         """
-        :param string csv_content: Contents of CSV file as a string
+        :param csv_content: CSV as a string or bytes, or a text or binary stream such as an S3 body or a zip member;
+                            streams are read lazily
         :param bool with_extra_attributes: Whether to populate a head with extra attributes or not
         :param callable init_head_call: A callable to use for head initiation
+        :param string encoding: Encoding of binary content, utf-8 by default
         """
-        self.file_object = StringIO(csv_content)
+        encoding = kwargs.pop('encoding', 'utf-8')
+        self.file_object = open_text(csv_content, encoding)
         self.csv_args, self.csv_kwargs = args, kwargs
         self.head, self.extended_attributes, self.external_identifiers, self.is_full_import, extra_attributes, self.traits, self.release_allocations = (
             init_head_call or self.init_head)()
@@ -48,6 +154,51 @@ class CSVReader(object):
                 self.with_extra_attributes(attr_type, attrs)
 
         self.content = ContentReader(self.file_object, *args, **kwargs)
+        self._record_plan = None
+
+    def rows(self):
+        """
+        Yields the rows of the CSV content one at a time.
+        """
+        return iter(self.content)
+
+    @property
+    def record_plan(self):
+        if self._record_plan is None:
+            self._record_plan = RecordPlan(self.content.fieldnames, self.extended_attributes, self.external_identifiers)
+        return self._record_plan
+
+    def to_record(self, lookup):
+        """
+        Builds the NewStore import record of a row: plain columns with lower case names,
+        extended attributes, external identifiers and the IMAGE_N / CATEGORY_N groups.
+
+        :param dict lookup: Row of the CSV content
+        """
+        plan = self.record_plan
+        record = ResultDict()
+        for column, name, cast in plan.plain_columns:
+            value = lookup[column]
+            record[name] = cast(value) if cast and value else value
+        if plan.extended_attributes:
+            record.set_extended_attributes(lookup, plan.extended_attributes)
+        if plan.external_identifiers:
+            record.set_external_identifiers(lookup, plan.external_identifiers)
+        for kind, key, root in plan.delimited_groups:
+            record.set_delimited_attributes(lookup, kind, key, root)
+        return record
+
+    def records(self, transform=None):
+        """
+        Yields the NewStore import records of the CSV content one at a time.
+
+        :param callable transform: Builds the record of a row instead of to_record(), rows it returns None for are skipped
+        """
+        transform = transform or self.to_record
+        for lookup in self.content:
+            record = transform(lookup)
+            if record is not None:
+                yield record
 
     @staticmethod
     def get_default_head():
@@ -117,7 +268,7 @@ class CSVReader(object):
         head = self.get_default_head()
 
         reader = csv.reader(self.file_object, *self.csv_args, **self.csv_kwargs)
-        csv_head = zip(*(next(reader) for _ in range(2)))  # we assume that head is constructed from first 2 lines
+        csv_head = list(zip(*(next(reader) for _ in range(2))))  # we assume that head is constructed from first 2 lines
 
         for column, value in csv_head:
             if column and value:  # we don't need empty columns and values
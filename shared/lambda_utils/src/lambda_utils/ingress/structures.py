@@ -10,8 +10,80 @@ ATTR_MAP = {
     'value_cast': {'true': True, '1': True, 1: True, 'false': False, '0': False, 0: False}
 }
 
+# Kinds of the columns of a delimited attribute plan, see compile_delimited_plan()
+LEGACY, MULTI_VALUE, SINGLE_VALUE, IGNORED, INVALID = range(5)
+MAX_DELIMITED_PLANS = 64
+_DELIMITED_PLANS = {}
+
+
+def compile_delimited_plan(columns, key, multi_attr_map, cast_attr_map, count_delim='_', attr_delim='::'):
+    """
+    Parses the column names of a delimited attribute group once, so that rows only have to look up values.
+    Returns a list of (column, column kind, count, attribute name, attribute count, cast) in column order.
+
+    :param iterable columns: column names of the CSV content
+    :param string key: key that is used to find attr related columns
+    :param dict multi_attr_map: mapping of attrs with multiple values from CSV to item
+    :param dict cast_attr_map: mapping of attr name to type to cast to
+    :param string count_delim: delimiter that is used to find current attribute count
+    :param string attr_delim: delimiter that is used to find extended attributes
+    """
+    plan = []
+    marker = '%s%s' % (key, count_delim)
+
+    for column in columns:
+        if marker not in column:
+            continue
+
+        parts = column.split(attr_delim)
+        count_parts = parts[0].split(count_delim)
+
+        if len(count_parts) != 2:  # raised by the first row with a value, like the uncompiled version did
+            plan.append((column, INVALID, None, None, None, None))
+            continue
+
+        count = count_parts[1]
+
+        if len(parts) == 1:
+            plan.append((column, LEGACY, count, None, None, None))
+            continue
+
+        attr = parts[1].lower()
+        attr_parts = attr.split(count_delim)
+
+        if len(attr_parts) == 2 and attr_parts[1].isdigit():
+            attr, attr_count = attr_parts
+
+            if attr in multi_attr_map:
+                plan.append((column, MULTI_VALUE, count, multi_attr_map[attr], attr_count, cast_attr_map.get(attr, str)))
+            else:
+                plan.append((column, IGNORED, count, None, None, None))
+        else:
+            plan.append((column, SINGLE_VALUE, count, attr, None, cast_attr_map.get(attr, str)))
+
+    return plan
+
+
+def get_delimited_plan(columns, key, multi_attr_map, cast_attr_map, count_delim='_', attr_delim='::'):
+    """
+    Returns the compiled plan of compile_delimited_plan(), cached for all rows with the same columns.
+    """
+    plan_key = (tuple(columns), key, tuple(multi_attr_map.items()), tuple(cast_attr_map.items()), count_delim,
+                attr_delim)
+    plan = _DELIMITED_PLANS.get(plan_key)
+
+    if plan is None:
+        if len(_DELIMITED_PLANS) >= MAX_DELIMITED_PLANS:
+            _DELIMITED_PLANS.clear()
+        plan = _DELIMITED_PLANS[plan_key] = compile_delimited_plan(
+            plan_key[0], key, multi_attr_map, cast_attr_map, count_delim, attr_delim)
+
+    return plan
+
 
 class FailSafeDict(dict):
+    _import_job = None
+
     @property
     def import_job(self):
         return self._import_job
@@ -34,7 +106,7 @@ class ResultDict(dict):
         """
         Makes sure to call self.__setitem__()
         """
-        for k, v in kwargs.iteritems():
+        for k, v in kwargs.items():
             self[k] = v
 
     def __setitem__(self, key, value):
@@ -133,41 +205,32 @@ class ResultDict(dict):
         if cast_attr_map is None:
             cast_attr_map = ATTR_MAP['type_cast']
 
-        # generates all attribute data with order hints in one go
-        for lookup_key in lookup:
-            if not '%s%s' % (key, count_delim) in lookup_key:
-                continue
-
+        # generates all attribute data with order hints in one go, the column names are only parsed once
+        for lookup_key, column_kind, count, attr, attr_count, cast in get_delimited_plan(
+                lookup, key, multi_attr_map, cast_attr_map, count_delim, attr_delim):
             lookup_value = lookup[lookup_key].strip()
 
             if not lookup_value:
                 continue
 
-            parts = lookup_key.split(attr_delim)
-            _, count = parts[0].split(count_delim)
+            if column_kind == INVALID:
+                _, count = lookup_key.split(attr_delim)[0].split(count_delim)
 
             if count not in items:
                 items[count] = kind_method(lookup_key, lookup_value, add_internal_attributes, False)
 
-            if len(parts) == 1:  # old format without extended attributes support, i.e. ATTR_1, ATTR_2
+            if column_kind == LEGACY:  # old format without extended attributes support, i.e. ATTR_1, ATTR_2
                 items[count] = kind_method(lookup_key, lookup_value, add_internal_attributes, True)
 
                 if count == 1:
                     items[count]['is_main'] = True
-            else:
-                attr = parts[1].lower()
-                attr_parts = attr.split(count_delim)
-
-                if len(attr_parts) == 2 and attr_parts[1].isdigit():  # attr with multiple values, i.e. ATTR_1::NAME
-                    attr, attr_count = attr_parts
-
-                    if attr in multi_attr_map:
-                        if not multi_attr_map[attr] in items[count]:
-                            items[count][multi_attr_map[attr]] = {}
+            elif column_kind == MULTI_VALUE:  # attr with multiple values, i.e. ATTR_1::NAME_1
+                if not attr in items[count]:
+                    items[count][attr] = {}
 
-                        items[count][multi_attr_map[attr]][attr_count] = cast_attr_map.get(attr, str)(lookup_value)
-                else:
-                    items[count][attr] = cast_attr_map.get(attr, str)(lookup_value)
+                items[count][attr][attr_count] = cast(lookup_value)
+            elif column_kind == SINGLE_VALUE:
+                items[count][attr] = cast(lookup_value)
 
         # inserts data maintaining same order as in CSV using order hints from above
         for ii in sorted(items):
@@ -0,0 +1,249 @@
+# Copyright (C) 2016 NewStore Inc, all rights reserved.
+
+# streams import files to S3 while they are being written
+import io
+import json
+import logging
+from zipfile import ZipFile, ZIP_DEFLATED
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# S3 parts must be at least 5 MiB, except for the last one
+MIN_PART_SIZE = 5 * 1024 * 1024
+PART_SIZE = 8 * 1024 * 1024
+
+
+class MultipartUploadWriter(io.RawIOBase):
+    """
+    Write only file object that uploads its content to S3 in parts of part_size bytes as they fill,
+    so only one part is held in memory. Content smaller than one part is sent with a single put_object.
+    """
+
+    def __init__(self, s3_client, bucket_name, object_key, part_size=PART_SIZE, content_type='application/zip'):
+        """
+        :param s3_client: boto3 S3 client
+        :param string bucket_name: Bucket to upload to
+        :param string object_key: Key of the uploaded object
+        :param int part_size: Size of the uploaded parts, at least 5 MiB
+        :param string content_type: Content type of the uploaded object
+        """
+        super(MultipartUploadWriter, self).__init__()
+        self.s3_client = s3_client
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.content_type = content_type
+        self.upload_id = None
+        self.parts = []
+        self.size = 0
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError('write to closed file')
+        self.buffer += data
+        self.size += len(data)
+        while len(self.buffer) >= self.part_size:
+            self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+        return len(data)
+
+    def _upload_part(self, data):
+        if self.upload_id is None:
+            self.upload_id = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.object_key, ContentType=self.content_type)['UploadId']
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket_name, Key=self.object_key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=data)
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        logger.info('Uploaded part %s of s3://%s/%s', part_number, self.bucket_name, self.object_key)
+
+    def close(self):
+        """
+        Uploads the rest of the content and completes the upload.
+        """
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name, Key=self.object_key, Body=bytes(self.buffer), ContentType=self.content_type)
+            else:
+                if self.buffer:
+                    self._upload_part(bytes(self.buffer))
+                self.s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.object_key, UploadId=self.upload_id,
+                    MultipartUpload={'Parts': self.parts})
+            self.buffer = bytearray()
+        except Exception:
+            self.abort()
+            raise
+        super(MultipartUploadWriter, self).close()
+
+    def abort(self):
+        """
+        Drops the uploaded parts, nothing is written to S3.
+        """
+        if self.upload_id is not None:
+            try:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=self.bucket_name, Key=self.object_key, UploadId=self.upload_id)
+            except Exception:
+                logger.exception('Failed to abort upload %s', self.upload_id)
+            self.upload_id = None
+        self.buffer = bytearray()
+        super(MultipartUploadWriter, self).close()
+
+
+class ImportFileWriter(object):
+    """
+    Writes an import file of the form {"head": head, "items": [...]} as a zipped JSON member to S3,
+    one item at a time. The JSON is compressed and uploaded while items are written, so the whole
+    file is never held in memory.
+
+    Usage:
+        with ImportFileWriter(s3_client, bucket_name, object_key, member_name, head) as import_file:
+            for item in items:
+                import_file.write_item(item)
+        source_uri = import_file.source_uri
+
+    The upload is aborted if the block raises.
+    """
+
+    def __init__(self, s3_client, bucket_name, object_key, member_name, head=None, items_key='items',
+                 part_size=PART_SIZE):
+        """
+        :param s3_client: boto3 S3 client
+        :param string bucket_name: Bucket to upload to
+        :param string object_key: Key of the zip file
+        :param string member_name: Name of the JSON file in the zip file
+        :param dict head: Head of the import file, not written if None
+        :param string items_key: Key of the list of items
+        :param int part_size: Size of the uploaded parts
+        """
+        self.source_uri = 's3://%s/%s' % (bucket_name, object_key)
+        self.member_name = member_name
+        self.head = head
+        self.items_key = items_key
+        self.item_count = 0
+        self.upload = MultipartUploadWriter(s3_client, bucket_name, object_key, part_size)
+        self.zip_archive = None
+        self.member = None
+
+    def open(self):
+        self.zip_archive = ZipFile(self.upload, mode='w', compression=ZIP_DEFLATED)
+        # force_zip64 as the size of the member is not known up front
+        self.member = io.TextIOWrapper(
+            self.zip_archive.open(self.member_name, mode='w', force_zip64=True), encoding='utf-8')
+        self.member.write('{')
+        if self.head is not None:
+            self.member.write('"head":%s,' % json.dumps(self.head, separators=(',', ':')))
+        self.member.write('%s:[' % json.dumps(self.items_key))
+        return self
+
+    def write_item(self, item):
+        if self.item_count:
+            self.member.write(',')
+        self.member.write(json.dumps(item, separators=(',', ':')))
+        self.item_count += 1
+
+    def write_items(self, items):
+        for item in items:
+            self.write_item(item)
+
+    def close(self):
+        self.member.write(']}')
+        self.member.close()
+        self.zip_archive.close()
+        self.upload.close()
+        logger.info('Wrote %s items to %s, %s bytes zipped', self.item_count, self.source_uri, self.upload.size)
+
+    def abort(self):
+        try:
+            self.member.close()
+            self.zip_archive.close()
+        except Exception:
+            logger.warning('Failed to close %s while aborting its upload', self.member_name)
+        self.upload.abort()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ImportCollectionWriter(object):
+    """
+    Writes several JSON documents as members of one zip file to S3. Every document is serialized,
+    compressed and uploaded while it is written, so neither the documents' JSON nor the zip file
+    is held in memory.
+
+    Usage:
+        with ImportCollectionWriter(s3_client, bucket_name, object_key) as collection:
+            for name, content in documents:
+                collection.write_member(name, content)
+        source_uri = collection.source_uri
+
+    The upload is aborted if the block raises.
+    """
+
+    def __init__(self, s3_client, bucket_name, object_key, part_size=PART_SIZE):
+        """
+        :param s3_client: boto3 S3 client
+        :param string bucket_name: Bucket to upload to
+        :param string object_key: Key of the zip file
+        :param int part_size: Size of the uploaded parts
+        """
+        self.source_uri = 's3://%s/%s' % (bucket_name, object_key)
+        self.member_count = 0
+        self.upload = MultipartUploadWriter(s3_client, bucket_name, object_key, part_size)
+        self.zip_archive = None
+
+    def open(self):
+        self.zip_archive = ZipFile(self.upload, mode='w', compression=ZIP_DEFLATED)
+        return self
+
+    def write_member(self, member_name, content, indent=None):
+        """
+        :param string member_name: Name of the JSON file in the zip file
+        :param content: JSON serializable document
+        :param int indent: Indent of the JSON, compact if None
+        """
+        separators = None if indent is not None else (',', ':')
+        encoder = json.JSONEncoder(indent=indent, separators=separators)
+        # force_zip64 as the size of the member is not known up front
+        with io.TextIOWrapper(self.zip_archive.open(member_name, mode='w', force_zip64=True),
+                              encoding='utf-8') as member:
+            for chunk in encoder.iterencode(content):
+                member.write(chunk)
+        self.member_count += 1
+
+    def close(self):
+        self.zip_archive.close()
+        self.upload.close()
+        logger.info('Wrote %s members to %s, %s bytes zipped', self.member_count, self.source_uri, self.upload.size)
+
+    def abort(self):
+        try:
+            self.zip_archive.close()
+        except Exception:
+            logger.warning('Failed to close %s while aborting its upload', self.source_uri)
+        self.upload.abort()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
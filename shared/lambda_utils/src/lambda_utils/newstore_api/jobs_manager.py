@@ -18,6 +18,7 @@ else:
 from zipfile import ZipFile, ZIP_DEFLATED
 import json
 from newstore_adapter import impex, Context
+from lambda_utils.newstore_api.import_file import ImportCollectionWriter, ImportFileWriter, PART_SIZE
 
 # Remove this when explore fixes the NA-10222
 # This is a hack to json loader that forces the float number to have teo decimals letters
@@ -128,19 +129,73 @@ class JobsManager:
 
         return source_uri
 
-    def create_file(self, inventory, append_to_file_name_typology=None):
-        # Set filename & paths
+    def create_streaming_collection(self, members, part_size=PART_SIZE):
+        """
+        Streams a collection like create_collection does, one zip member per key, to S3. Every member is
+        serialized and uploaded while it is written, so only the member being written has to be in memory
+        when `members` is an iterator of (key, content) pairs. Returns the source_uri for start_job.
+        """
+        basename = "%s-%s" % (
+            self.get_import_typology(),
+            datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S.%f")
+        )
+        if hasattr(members, 'items'):
+            members = members.items()
+
+        with ImportCollectionWriter(
+                self.get_s3_handler().getS3(),
+                self.get_env_variables()["s3_bucket"],
+                "import_files/%s.zip" % basename,
+                part_size=part_size) as collection:
+            for item, content in members:
+                collection.write_member("%s-%s.json" % (basename, item), content, indent=4)
+        return collection.source_uri
+
+    def get_file_name(self, append_to_file_name_typology=None):
         if append_to_file_name_typology is not None:
-            filename = "%s-%s-%s.json" % (
+            return "%s-%s-%s.json" % (
                 self.get_import_typology(),
                 append_to_file_name_typology,
                 datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S.%f")
             )
-        else:
-            filename = "%s-%s.json" % (
-                self.get_import_typology(),
-                datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S.%f")
-            )
+        return "%s-%s.json" % (
+            self.get_import_typology(),
+            datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S.%f")
+        )
+
+    def open_import_file(self, head=None, append_to_file_name_typology=None, items_key='items', part_size=PART_SIZE):
+        """
+        Returns an ImportFileWriter that streams an import file to the import_files folder of the bucket,
+        its source_uri is the one to start the job with. Use it as a context manager:
+
+            with jobs_manager.open_import_file(head) as import_file:
+                import_file.write_items(items)
+            jobs_manager.start_job(import_job, import_file.source_uri)
+        """
+        filename = self.get_file_name(append_to_file_name_typology)
+        return ImportFileWriter(
+            self.get_s3_handler().getS3(),
+            self.get_env_variables()["s3_bucket"],
+            "import_files/%s.zip" % filename,
+            filename,
+            head=head,
+            items_key=items_key,
+            part_size=part_size
+        )
+
+    def create_streaming_file(self, items, head=None, append_to_file_name_typology=None, items_key='items'):
+        """
+        Streams {"head": head, "items": [...]} from an iterator of items to S3 as a zipped import file,
+        uploading parts while the items are serialized. Unlike create_file, the import never has to fit
+        in memory. Returns the source_uri for start_job.
+        """
+        with self.open_import_file(head, append_to_file_name_typology, items_key) as import_file:
+            import_file.write_items(items)
+        return import_file.source_uri
+
+    def create_file(self, inventory, append_to_file_name_typology=None):
+        # Set filename & paths
+        filename = self.get_file_name(append_to_file_name_typology)
 
         source_uri = "s3://%s/import_files/%s" % (self.get_env_variables()["s3_bucket"], filename + ".zip")
 
@@ -0,0 +1,110 @@
+import io
+import json
+import unittest
+from unittest import mock
+from zipfile import ZipFile
+from ..newstore_api import import_file
+
+
+class FakeS3Client(object):
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = 'upload-%s' % len(self.uploads)
+        self.uploads[upload_id] = {}
+        return {'UploadId': upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {'ETag': 'etag-%s' % PartNumber}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b''.join(parts[part['PartNumber']] for part in MultipartUpload['Parts'])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId)
+        self.aborted.append(UploadId)
+
+
+def read_member(body, name):
+    with ZipFile(io.BytesIO(body)) as zip_archive:
+        return json.loads(zip_archive.read(name).decode('utf-8'))
+
+
+class ImportFileTestCase(unittest.TestCase):
+
+    def test_small_file_is_put(self):
+        """Files smaller than a part are uploaded with one put_object"""
+        s3_client = FakeS3Client()
+        with import_file.ImportFileWriter(s3_client, 'bucket', 'import_files/a.zip', 'a.json', {'shop': 'x'}) as writer:
+            writer.write_items([{'sku': '1'}, {'sku': '2'}])
+
+        self.assertEqual('s3://bucket/import_files/a.zip', writer.source_uri)
+        self.assertEqual({'head': {'shop': 'x'}, 'items': [{'sku': '1'}, {'sku': '2'}]},
+                         read_member(s3_client.objects['import_files/a.zip'], 'a.json'))
+
+    @mock.patch.object(import_file, 'MIN_PART_SIZE', 1024 * 1024)
+    def test_large_file_is_uploaded_in_parts(self):
+        """Parts are uploaded as they fill"""
+        s3_client = FakeS3Client()
+        items = ({'sku': str(index), 'noise': '%032x' % (index * 2654435761 % 2 ** 128)} for index in range(300000))
+        with import_file.ImportFileWriter(s3_client, 'bucket', 'b.zip', 'b.json', part_size=1024 * 1024) as writer:
+            writer.write_items(items)
+
+        self.assertEqual(300000, writer.item_count)
+        self.assertGreater(len(writer.upload.parts), 1)
+        content = read_member(s3_client.objects['b.zip'], 'b.json')
+        self.assertEqual(300000, len(content['items']))
+        self.assertEqual({'sku': '299999', 'noise': '%032x' % (299999 * 2654435761 % 2 ** 128)}, content['items'][-1])
+
+    @mock.patch.object(import_file, 'MIN_PART_SIZE', 1024 * 1024)
+    def test_failure_aborts_upload(self):
+        """Nothing is written to S3 if writing the items fails"""
+        s3_client = FakeS3Client()
+        with self.assertRaises(ValueError):
+            with import_file.ImportFileWriter(s3_client, 'bucket', 'c.zip', 'c.json', part_size=1024 * 1024) as writer:
+                writer.write_items({'noise': '%032x' % (index * 2654435761 % 2 ** 128)} for index in range(300000))
+                raise ValueError('source failed')
+
+        self.assertEqual({}, s3_client.objects)
+        self.assertEqual(['upload-0'], s3_client.aborted)
+
+    @mock.patch.object(import_file, 'MIN_PART_SIZE', 1024 * 1024)
+    def test_collection_members_share_one_upload(self):
+        """Every member is written to the same zip file, uploaded in parts"""
+        s3_client = FakeS3Client()
+        documents = {
+            'products': [{'sku': str(index), 'noise': '%032x' % (index * 2654435761 % 2 ** 128)}
+                         for index in range(100000)],
+            'prices': {'currency': 'USD', 'items': [{'sku': '1', 'price': 10.5}]}
+        }
+        with import_file.ImportCollectionWriter(s3_client, 'bucket', 'd.zip', part_size=1024 * 1024) as collection:
+            for name, content in documents.items():
+                collection.write_member('%s.json' % name, content, indent=4)
+
+        self.assertEqual('s3://bucket/d.zip', collection.source_uri)
+        self.assertEqual(2, collection.member_count)
+        self.assertGreater(len(collection.upload.parts), 1)
+        body = s3_client.objects['d.zip']
+        self.assertEqual(documents['products'], read_member(body, 'products.json'))
+        with ZipFile(io.BytesIO(body)) as zip_archive:
+            self.assertEqual(json.dumps(documents['prices'], indent=4), zip_archive.read('prices.json').decode('utf-8'))
+
+    @mock.patch.object(import_file, 'MIN_PART_SIZE', 1024 * 1024)
+    def test_collection_failure_aborts_upload(self):
+        """Nothing is written to S3 if a member fails"""
+        s3_client = FakeS3Client()
+        with self.assertRaises(TypeError):
+            with import_file.ImportCollectionWriter(s3_client, 'bucket', 'e.zip', part_size=1024 * 1024) as collection:
+                collection.write_member('a.json', ['%032x' % (index * 2654435761 % 2 ** 128) for index in range(300000)])
+                collection.write_member('b.json', {'not serializable': object()})
+
+        self.assertEqual({}, s3_client.objects)
+        self.assertEqual(['upload-0'], s3_client.aborted)
@@ -0,0 +1,51 @@
+"""
+Measures the rows/sec of the CSV ingress reader on a generated catalog.
+
+The catalog is written to a temporary file and read as a binary stream, like an S3 body:
+ - rows: decoded rows only
+ - records: NewStore import records with images and extended attributes
+
+Usage: python -m lambda_utils.tests.ingress_benchmark [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from lambda_utils.ingress.reader import CSVReader
+
+HEAD = 'catalog,locale,extended_attributes\nstorefront-catalog-en,en-US,color|size\n'
+COLUMNS = ['product_id', 'title', 'description', 'color', 'size', 'IMAGE_1::URL', 'IMAGE_1::TAG_1',
+           'IMAGE_2::URL', 'IMAGE_2::POSITION', 'CATEGORY_1']
+
+
+def write_catalog(file_object, rows):
+    file_object.write(HEAD.encode('utf-8'))
+    file_object.write((','.join(COLUMNS) + '\n').encode('utf-8'))
+    for index in range(rows):
+        line = '{0},Product {0},"A product, described",red,M,https://img/{0}/1.jpg,front,https://img/{0}/2.jpg,2,' \
+               'Apparel > Shirts\n'.format(index)
+        file_object.write(line.encode('utf-8'))
+
+
+def measure(path, consume):
+    with open(path, 'rb') as csv_file:
+        csvreader = CSVReader(csv_file)
+        started_at = time.time()
+        count = sum(1 for _ in consume(csvreader))
+        return count, time.time() - started_at
+
+
+def benchmark(rows):
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as csv_file:
+        write_catalog(csv_file, rows)
+    try:
+        for name, consume in [('rows', CSVReader.rows), ('records', CSVReader.records)]:
+            count, elapsed = measure(csv_file.name, consume)
+            print('%-8s %d in %.2fs: %d rows/sec' % (name, count, elapsed, count / elapsed))
+    finally:
+        os.remove(csv_file.name)
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
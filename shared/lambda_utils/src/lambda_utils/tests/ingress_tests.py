@@ -1,5 +1,6 @@
 import unittest
 import csv
+import io
 import os
 import sys
 from ..ingress import reader
@@ -38,13 +39,52 @@ class IngressTestCase(unittest.TestCase):
         head = parse_header(params)
         self.assertEqual(3, len(head['store_mapping']), 'Multiple traits for 2 pricebooks')
 
+    def test_import_from_binary_stream(self):
+        """Streams are read the same way as strings"""
+        file_name = os.path.join(os.path.dirname(__file__), '../../../', 'test_data', 'traits_in_multi_pricebooks.txt')
+
+        params = read_file(file_name)
+        expected = [dict(row) for row in reader.CSVReader(params['data']).rows()]
+        csvreader = reader.CSVReader(io.BytesIO(params['data'].encode('utf-8')))
+        self.assertEqual(expected, [dict(row) for row in csvreader.rows()], 'Stream rows match string rows')
+
+    def test_import_decodes_escapes(self):
+        """Backslash escapes in values are decoded"""
+        csvreader = reader.CSVReader(HEAD + 'product_id,title\n1,Caf\u00e9 line\\nbreak\n')
+        self.assertEqual([{'product_id': '1', 'title': 'Caf\u00e9 line\nbreak'}], list(csvreader.rows()))
+
+    def test_import_ragged_row(self):
+        """Rows with more values than columns fail"""
+        csvreader = reader.CSVReader(HEAD + 'product_id,title\n1,a,b\n')
+        with self.assertRaises(reader.ContentReadError):
+            list(csvreader.rows())
+
+    def test_import_records(self):
+        """Records have typed delimited attributes"""
+        csvreader = reader.CSVReader(
+            HEAD + 'product_id,IMAGE_1::URL,IMAGE_1::TAG_1,IMAGE_1::TAG_2,IMAGE_2::URL,IMAGE_2::POSITION\n'
+            '1,http://a,front,main,http://b,2\n'
+            '2,,,,,\n')
+        records = list(csvreader.records())
+        self.assertEqual('1', records[0]['product_id'])
+        self.assertEqual([
+            {'internal_dimension_height': 200, 'internal_dimension_width': 200,
+             'internal_dominant_color': '#FFFFFF', 'url': 'http://a', 'tags': ['front', 'main']},
+            {'internal_dimension_height': 200, 'internal_dimension_width': 200,
+             'internal_dominant_color': '#FFFFFF', 'url': 'http://b', 'position': 2}
+        ], records[0]['images'])
+        self.assertNotIn('images', records[1])
+
+
+HEAD = 'catalog,locale\nstorefront-catalog-en,en-US\n'
+
 
 def read_file(filename):
     params = {
         'data' : ''
     }
 
-    with open(filename, 'rb') as csv_file:
+    with open(filename, 'r', newline='') as csv_file:
         csv_reader = csv.reader(csv_file, delimiter = ',', quotechar = '\'')
         for row in csv_reader:
             params['data'] = params['data'] + ','.join(row) + '\n'
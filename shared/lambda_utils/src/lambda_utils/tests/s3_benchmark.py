@@ -0,0 +1,104 @@
+"""
+Compares the single GET read of a zipped export with the concurrent ranged read of S3Handler.
+
+A zipped JSON export of --size-mb MB is uploaded to --bucket, then read:
+ - single GET: the whole body read into memory, every member read eagerly (the former getFiles)
+ - ranged: S3Handler.iter_files, members read in 1 MB chunks
+
+Without --bucket a local moto server is started, which shows the overhead of the read path but not
+the S3 latency that the concurrent ranges hide; run it against a real bucket for throughput numbers.
+
+Usage: python -m lambda_utils.tests.s3_benchmark [--bucket BUCKET] [--size-mb 300]
+"""
+import argparse
+import io
+import logging
+import os
+import time
+import zipfile
+import boto3
+
+from lambda_utils.S3.S3Handler import S3Handler
+
+KEY = 's3-benchmark/export.zip'
+CHUNK_SIZE = 1024 * 1024
+
+
+def build_export(size_mb):
+    data = io.BytesIO()
+    line = b'{"product_id":"%08d","location":"store-%03d","atp":%d},\n'
+    with zipfile.ZipFile(data, mode='w', compression=zipfile.ZIP_DEFLATED) as zip_archive:
+        with zip_archive.open('export.json', mode='w', force_zip64=True) as member:
+            written, index = 0, 0
+            while written < size_mb * 1024 * 1024:
+                # Random digits keep the export from compressing to almost nothing
+                chunk = b''.join(line % (index + offset, offset % 1000, int.from_bytes(os.urandom(3), 'big'))
+                                 for offset in range(10000))
+                member.write(chunk)
+                written += len(chunk)
+                index += 10000
+    return data.getvalue()
+
+
+def read_single_get(s3, bucket):
+    body = s3.get_object(Bucket=bucket, Key=KEY)['Body'].read()
+    with zipfile.ZipFile(io.BytesIO(body), mode='r') as zip_archive:
+        return sum(len(zip_archive.read(name)) for name in zip_archive.namelist())
+
+
+def read_ranged(s3, bucket):
+    handler = S3Handler(bucket_name=bucket, key_name=KEY)
+    handler.s3 = s3
+    size = 0
+    for _, stream in handler.iter_files():
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+            size += len(chunk)
+    return size
+
+
+def benchmark(bucket, size_mb, endpoint_url=None):
+    s3 = boto3.client('s3', endpoint_url=endpoint_url)
+    if endpoint_url:
+        s3.create_bucket(Bucket=bucket)
+    export = build_export(size_mb)
+    s3.put_object(Bucket=bucket, Key=KEY, Body=export)
+    print('export: %.1f MB zipped' % (len(export) / 1024 / 1024))
+    del export
+
+    try:
+        for name, read in [('single GET', read_single_get), ('ranged', read_ranged)]:
+            started_at = time.time()
+            size = read(s3, bucket)
+            elapsed = time.time() - started_at
+            print('%-10s %.1f MB unzipped in %.2fs: %.1f MB/s' % (name, size / 1024 / 1024, elapsed,
+                                                                 size / 1024 / 1024 / elapsed))
+    finally:
+        s3.delete_object(Bucket=bucket, Key=KEY)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bucket')
+    parser.add_argument('--size-mb', type=int, default=300)
+    args = parser.parse_args()
+
+    if args.bucket:
+        benchmark(args.bucket, args.size_mb)
+        return
+
+    from moto.server import ThreadedMotoServer
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    server = ThreadedMotoServer(port=0)
+    server.start()
+    try:
+        host, port = server.get_host_and_port()
+        benchmark('s3-benchmark', args.size_mb, endpoint_url='http://%s:%s' % (host, port))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
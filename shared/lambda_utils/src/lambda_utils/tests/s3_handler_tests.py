@@ -0,0 +1,66 @@
+import io
+import json
+import os
+import unittest
+import zipfile
+import boto3
+from moto import mock_s3
+from ..S3.S3Handler import S3Handler
+
+BUCKET = 'test-bucket'
+
+
+def zipped(files):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, mode='w', compression=zipfile.ZIP_DEFLATED) as zip_archive:
+        for name, content in files.items():
+            zip_archive.writestr(name, content)
+    return data.getvalue()
+
+
+@mock_s3
+class S3HandlerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        self.s3 = boto3.client('s3')
+        self.s3.create_bucket(Bucket=BUCKET)
+
+    def test_download_in_ranges(self):
+        """Ranges are written at their offset"""
+        data = os.urandom(1024 * 1024 + 17)
+        self.s3.put_object(Bucket=BUCKET, Key='export.bin', Body=data)
+
+        handler = S3Handler(bucket_name=BUCKET, key_name='export.bin')
+        with handler.download_to_file(range_size=100 * 1024, max_concurrency=4) as temp_file:
+            self.assertEqual(data, temp_file.read())
+
+    def test_download_empty_object(self):
+        """Empty objects have no byte range"""
+        self.s3.put_object(Bucket=BUCKET, Key='empty.csv', Body=b'')
+
+        handler = S3Handler(bucket_name=BUCKET, key_name='empty.csv')
+        self.assertEqual({'empty.csv': b''}, handler.getFiles())
+
+    def test_zip_members(self):
+        """Zip members are read lazily, __MACOSX members are skipped"""
+        files = {'a.json': b'{"a": 1}', '__MACOSX/a.json': b'', 'b.json': b'[2]' * 100000}
+        self.s3.put_object(Bucket=BUCKET, Key='in/export.zip', Body=zipped(files))
+
+        handler = S3Handler(bucket_name=BUCKET, key_name='in/export.zip')
+        handler.RANGE_SIZE = 64 * 1024
+        self.assertEqual(['a.json', 'b.json'], [name for name, _ in handler.iter_files()])
+        self.assertEqual({'file': 'export.zip', 'data': b'{"a": 1}'}, handler.getS3File())
+        self.assertEqual([{'file': 'a.json', 'data': files['a.json']}, {'file': 'b.json', 'data': files['b.json']}],
+                         handler.getS3Files())
+
+    def test_json_files_dict(self):
+        """JSON files are fetched concurrently"""
+        for index in range(25):
+            self.s3.put_object(Bucket=BUCKET, Key='config/%s.json' % index, Body=json.dumps({'index': index}))
+        self.s3.put_object(Bucket=BUCKET, Key='config/readme.txt', Body=b'text')
+
+        handler = S3Handler(bucket_name=BUCKET)
+        jsons = handler.get_json_files_dict()
+        self.assertEqual(25, len(jsons))
+        self.assertEqual({'index': 7}, jsons['config/7.json'])
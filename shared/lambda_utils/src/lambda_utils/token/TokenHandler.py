@@ -1,7 +1,7 @@
-import aiohttp
-import asyncio
 import logging
 
+from newstore_adapter.token_broker import get_broker, fetch_password_token
+
 logger = logging.getLogger(__name__)
 
 
@@ -9,46 +9,30 @@ class Token():
     host = None
     username = None
     password = None
-    token = None
 
     def __init__(self, host, username, password):
         self.host = host
         self.username = username
         self.password = password
-        self.loop = asyncio.get_event_loop()
-
-
 
     def get_token(self):
-        return self.loop.run_until_complete(self.__get_token())
-
-
-    async def __get_token(self):
-        if self.token:
-            LOGGER.info(
-                'Token already exists %s', self.token)
-            return self.token['access_token']
-        else:
-            logger.info(
-                'Getting token from newstore {host}'.format(host=self.host))
-            url = 'https://{host}/v0/token'.format(host=self.host)
-            headers = {
-                'Host': self.host
-            }
-            form = {
-                'grant_type': 'password',
-                'username': self.username,
-                'password': self.password
-            }
-            try:
-                async with aiohttp.ClientSession(loop=asyncio.get_event_loop()) as session:
-                    async with session.post(url=url, headers=headers, data=form) as response:
-                        response.raise_for_status()
-                        self.token = await response.json()
-                        return self.token['access_token']
-            except Exception as e:
-                logger.info("TokenHandler - Not able to get the token")
-                raise
-
-
-
+        """
+        Return the access token of the API user, from the process wide token cache
+        unless it holds no valid token for the host and user.
+        """
+        try:
+            token = get_broker().get_token((None, self.host, self.username), self.__fetch_token)
+        except Exception:
+            logger.info("TokenHandler - Not able to get the token")
+            raise
+        return token['access_token']
+
+    @property
+    def token(self):
+        """ The cached token response, None when there is no valid token. """
+        return get_broker().get_cached_token((None, self.host, self.username))
+
+    def __fetch_token(self):
+        logger.info(
+            'Getting token from newstore {host}'.format(host=self.host))
+        return fetch_password_token(self.host, self.username, self.password)
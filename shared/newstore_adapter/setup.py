@@ -18,6 +18,9 @@ setup(
         'setuptools',
         'requests>=2.11.1'
     ],
+    extras_require={
+        'async': ['aiohttp>=3.7'],
+    },
     test_suite="newstore_adapter.tests",
     tests_require=[
         'requests-mock',
@@ -1,8 +1,9 @@
+import decimal
 import logging
 import os
-import requests
 import json
 from . import Context
+from .session import get_session, get_timeout
 from requests import HTTPError
 from .exceptions import NewStoreAdapterException
 
@@ -10,7 +11,7 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 class NewStoreAdapter(object):
-    def __init__(self, tenant, context, username=None, password=None, host=None):
+    def __init__(self, tenant, context, username=None, password=None, host=None, session=None, timeout=None):
         self.tenant = tenant
         self.context = context
         self.username = username if username else os.environ.get('newstore_username')
@@ -21,6 +22,9 @@ class NewStoreAdapter(object):
         self.auth_lambda = os.environ.get('newstore_auth_lambda')
         self.use_auth_lambda = os.environ.get('newstore_use_auth_lambda', '0') == '1'
         self.graphql_client = None
+        self.ctx = None
+        self.session = session if session else get_session()
+        self.timeout = timeout if timeout else get_timeout()
         logger.info('Headers to be utilized on calls to NewStore API: %s' % json.dumps(self.headers, indent=4))
 
     def get_api_auth(self, auth_required=True):
@@ -28,12 +32,15 @@ class NewStoreAdapter(object):
         if not auth_required:
             return None
 
-        self.ctx = Context(url=self.host)
-        if self.use_auth_lambda and self.auth_lambda is not None:
-            self.ctx.set_auth_lambda(self.auth_lambda)
-        else:
-            self.ctx.set_user(self.username, self.password)
-        return self.ctx.auth
+        # The Bearer auth caches the token itself, it only has to be built once
+        if self.auth is None:
+            self.ctx = Context(url=self.host)
+            if self.use_auth_lambda and self.auth_lambda is not None:
+                self.ctx.set_auth_lambda(self.auth_lambda)
+            else:
+                self.ctx.set_user(self.username, self.password)
+            self.auth = self.ctx.auth
+        return self.auth
 
     def get_headers(self):
         function_name = self.context.function_name if self.context else ''
@@ -51,7 +58,8 @@ class NewStoreAdapter(object):
         if search_json:
             logger.info('Search params:\n%s' % (json.dumps(search_json, indent=4)))
 
-        response = requests.get(resource_path, headers=self.headers, auth=self.get_api_auth(auth_required), params=search_json)
+        response = self.session.get(resource_path, headers=self.headers, auth=self.get_api_auth(auth_required),
+                                    params=search_json, timeout=self.timeout)
 
         try:
             response.raise_for_status()
@@ -65,8 +73,8 @@ class NewStoreAdapter(object):
         logger.info('POST %s' % resource_path)
         logger.info('Sending:\n%s' % (json.dumps(send_json, indent=4)))
 
-        response = requests.post(resource_path, headers=self.headers,
-                                 auth=self.get_api_auth(), data=json.dumps(send_json, cls=DecimalEncoder))
+        response = self.session.post(resource_path, headers=self.headers, auth=self.get_api_auth(),
+                                  data=json.dumps(send_json, cls=DecimalEncoder), timeout=self.timeout)
 
         try:
             response.raise_for_status()
@@ -79,22 +87,8 @@ class NewStoreAdapter(object):
         logger.info('PUT %s' % resource_path)
         logger.info('Sending:\n%s' % (json.dumps(send_json, indent=4)))
 
-        response = requests.put(resource_path, headers=self.headers,
-                                 auth=self.get_api_auth(), data=json.dumps(send_json, cls=DecimalEncoder))
-        try:
-            response.raise_for_status()
-        except HTTPError as ex:
-            logger.exception('Response: %s; \nException: %s' % (response.text, str(ex)))
-            raise NewStoreAdapterException(response.text)
-
-        return response
-
-    def put_request(self, resource_path, send_json):
-        logger.info('PUT %s' % resource_path)
-        logger.info('Sending:\n%s' % (json.dumps(send_json, indent=4)))
-
-        response = requests.put(resource_path, headers=self.headers,
-                                 auth=self.get_api_auth(), data=json.dumps(send_json, cls=DecimalEncoder))
+        response = self.session.put(resource_path, headers=self.headers, auth=self.get_api_auth(),
+                                  data=json.dumps(send_json, cls=DecimalEncoder), timeout=self.timeout)
 
         try:
             response.raise_for_status()
@@ -109,7 +103,8 @@ class NewStoreAdapter(object):
         if send_json:
             logger.info('Sending:\n%s' % (json.dumps(send_json, indent=4)))
 
-        response = requests.patch(resource_path, headers=self.headers, auth=self.get_api_auth(), json=send_json)
+        response = self.session.patch(resource_path, headers=self.headers, auth=self.get_api_auth(), json=send_json,
+                                      timeout=self.timeout)
 
         try:
             response.raise_for_status()
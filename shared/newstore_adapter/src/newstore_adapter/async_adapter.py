@@ -0,0 +1,226 @@
+"""
+Asyncio variant of the NewStore adapter, sharing one pooled aiohttp session per event loop.
+
+Copyright (C) 2021 NewStore, Inc. All rights reserved.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .adapter import NewStoreAdapter, DecimalEncoder
+from .exceptions import NewStoreAdapterException
+from .session import POOL_SIZE, MAX_RETRIES, BACKOFF_FACTOR, RETRY_STATUSES, IDEMPOTENT_METHODS
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+MAX_CONNECTIONS = int(os.environ.get('newstore_max_connections', '100') or '100')
+# Requests per second sent to one host, 0 disables the limit
+RATE_LIMIT = float(os.environ.get('newstore_rate_limit', '25') or '0')
+
+_SESSION = None
+_SESSION_LOOP = None
+_RATE_LIMITERS = {}
+
+
+class RateLimiter(object):
+
+    """
+    Token bucket allowing `rate` requests per second, with bursts of up to `burst` requests.
+    Only used from the event loop thread, so no lock is needed between checking and taking a token.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst if burst else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def get_rate_limiter(host, rate=RATE_LIMIT):
+    """ Return the rate limiter shared by all requests sent to `host`. """
+    limiter = _RATE_LIMITERS.get(host)
+    if limiter is None:
+        limiter = _RATE_LIMITERS[host] = RateLimiter(rate)
+    return limiter
+
+
+def build_async_session(pool_size=POOL_SIZE, max_connections=MAX_CONNECTIONS):
+    """
+    Create an aiohttp session keeping up to `pool_size` connections open per host.
+    Must be called from a running event loop.
+    """
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=pool_size, ttl_dns_cache=300)
+    return aiohttp.ClientSession(connector=connector)
+
+
+def get_async_session():
+    """
+    Return the session shared by all async adapters of the running event loop.
+    A new session is created when the loop changes, e.g. for every `asyncio.run`.
+    """
+    global _SESSION, _SESSION_LOOP
+    loop = asyncio.get_running_loop()
+    if _SESSION is None or _SESSION.closed or _SESSION_LOOP is not loop:
+        _SESSION = build_async_session()
+        _SESSION_LOOP = loop
+    return _SESSION
+
+
+async def close_async_session():
+    """ Close the shared session, to be awaited before the event loop is closed. """
+    global _SESSION, _SESSION_LOOP
+    if _SESSION is not None and _SESSION_LOOP is asyncio.get_running_loop():
+        await _SESSION.close()
+    _SESSION = None
+    _SESSION_LOOP = None
+
+
+class AsyncResponse(object):
+
+    """
+    Status and body of a completed request, read before the connection is released.
+    """
+
+    def __init__(self, status, text):
+        self.status_code = status
+        self.text = text
+        self._json = None
+
+    def json(self):
+        if self._json is None:
+            self._json = json.loads(self.text)
+        return self._json
+
+
+class AsyncNewStoreAdapter(NewStoreAdapter):
+
+    """
+    NewStoreAdapter whose get, post, put and patch requests are coroutines.
+    429 responses are retried for every method, 5xx responses and connection errors
+    only for idempotent methods, with exponential backoff plus jitter like the sync session.
+    """
+
+    def __init__(self, tenant, context, username=None, password=None, host=None, session=None, timeout=None,
+                 max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, rate_limit=RATE_LIMIT):
+        super(AsyncNewStoreAdapter, self).__init__(tenant, context, username, password, host, timeout=timeout)
+        self.client_session = session
+        self.client_timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.rate_limit = rate_limit
+        self.auth_lock = None
+        self.auth_loop = None
+
+    def get_client_session(self):
+        return self.client_session if self.client_session else get_async_session()
+
+    async def get_request_headers(self, auth_required=True):
+        api_auth = self.get_api_auth(auth_required)
+        if api_auth is None:
+            return self.headers
+
+        headers = api_auth.add_host(dict(self.headers))
+        if api_auth.has_valid_token():
+            headers['Authorization'] = api_auth.api_auth()
+            return headers
+        # Fetching the token blocks, only one request does it while the others wait for the cache
+        loop = asyncio.get_running_loop()
+        if self.auth_loop is not loop:
+            self.auth_lock = asyncio.Lock()
+            self.auth_loop = loop
+        async with self.auth_lock:
+            if api_auth.has_valid_token():
+                headers['Authorization'] = api_auth.api_auth()
+            else:
+                headers['Authorization'] = await loop.run_in_executor(None, api_auth.api_auth)
+        return headers
+
+    async def get_request(self, resource_path, search_json=None, auth_required=True):
+        logger.info('GET %s' % resource_path)
+        if search_json:
+            logger.info('Search params:\n%s' % (json.dumps(search_json, indent=4)))
+        params = {key: value for key, value in search_json.items() if value is not None} if search_json else None
+        return await self.request('GET', resource_path, params=params, auth_required=auth_required)
+
+    async def post_request(self, resource_path, send_json):
+        logger.info('POST %s' % resource_path)
+        logger.info('Sending:\n%s' % (json.dumps(send_json, indent=4, cls=DecimalEncoder)))
+        return await self.request('POST', resource_path, data=json.dumps(send_json, cls=DecimalEncoder))
+
+    async def put_request(self, resource_path, send_json):
+        logger.info('PUT %s' % resource_path)
+        logger.info('Sending:\n%s' % (json.dumps(send_json, indent=4, cls=DecimalEncoder)))
+        return await self.request('PUT', resource_path, data=json.dumps(send_json, cls=DecimalEncoder))
+
+    async def patch_request(self, resource_path, send_json={}):
+        logger.info('PATCH %s' % resource_path)
+        if send_json:
+            logger.info('Sending:\n%s' % (json.dumps(send_json, indent=4, cls=DecimalEncoder)))
+        return await self.request('PATCH', resource_path, data=json.dumps(send_json, cls=DecimalEncoder))
+
+    async def request(self, method, resource_path, params=None, data=None, auth_required=True):
+        """
+        Send the request, retrying throttled and failed attempts.
+        Raises NewStoreAdapterException with the response body for error statuses.
+        """
+        headers = await self.get_request_headers(auth_required)
+        limiter = get_rate_limiter(urlsplit(resource_path).netloc, self.rate_limit)
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            try:
+                async with self.get_client_session().request(method, resource_path, headers=headers, params=params,
+                                                             data=data, timeout=self.client_timeout) as response:
+                    result = AsyncResponse(response.status, await response.text())
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                retry = attempt < self.max_retries and (idempotent or isinstance(ex, aiohttp.ClientConnectorError))
+                if not retry:
+                    raise
+                logger.warning('%s %s failed, retrying: %s' % (method, resource_path, repr(ex)))
+                await asyncio.sleep(self.get_backoff_time(attempt))
+                attempt += 1
+                continue
+
+            retry = result.status_code == 429 or (idempotent and result.status_code in RETRY_STATUSES)
+            if retry and attempt < self.max_retries:
+                logger.warning('%s %s answered %s, retrying' % (method, resource_path, result.status_code))
+                await asyncio.sleep(self.get_backoff_time(attempt, retry_after))
+                attempt += 1
+                continue
+
+            if result.status_code >= 400:
+                logger.error('Response: %s; \nStatus: %s' % (result.text, result.status_code))
+                raise NewStoreAdapterException(result.text if result.text else 'HTTP %s' % result.status_code)
+            return result
+
+    def get_backoff_time(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return max(float(retry_after), 0)
+            except ValueError:
+                pass
+        if self.backoff_factor <= 0:
+            return 0
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_factor)
@@ -7,13 +7,10 @@ Copyright (C) 2017 NewStore, Inc. All rights reserved.
 """
 
 import os
-import time
-import json
 import requests
+from .token_broker import get_broker, fetch_lambda_token
 
 
-AUTH_CACHE = None
-
 class Bearer(requests.auth.AuthBase):
 
     """
@@ -23,6 +20,7 @@ class Bearer(requests.auth.AuthBase):
     def __init__(self):
         self.credentials = None
         self.lambda_name = None
+        self.tenant = None
         self.hostname = None
         self.url = None
 
@@ -40,6 +38,7 @@ class Bearer(requests.auth.AuthBase):
 
     def with_context(self, ctx):
         """ Set defaults from `ctx` """
+        self.tenant = ctx.tenant
         self.hostname = ctx.api_host()
         self.url = ctx.api_url('token')
         return self
@@ -67,27 +66,27 @@ class Bearer(requests.auth.AuthBase):
         self.lambda_name = lambda_name
         return self
 
+    def cache_key(self):
+        """ Key of the token in the shared token broker: (tenant, host, user). """
+        if self.lambda_name:
+            user = 'lambda:%s' % self.lambda_name
+        elif self.credentials:
+            user = self.credentials.get('username') or self.credentials.get('client_id')
+        else:
+            user = None
+        return (self.tenant, self.hostname, user)
+
+    def fetch_token(self):
+        """ Request a new token, from the auth lambda if one is configured. """
+        return self.auth_lambda_request() if self.lambda_name else self.auth_request()
+
+    def has_valid_token(self):
+        """ Whether the shared token broker holds a valid token, so api_auth will not block. """
+        return get_broker().get_cached_token(self.cache_key()) is not None
+
     def api_auth(self):
         """ Perform authentication if necessary. """
-        global AUTH_CACHE
-        result = None
-        now = time.time()
-        if AUTH_CACHE is not None:
-            old = AUTH_CACHE
-            if old.get('expires_at', 0) > now:
-                result = old
-
-        if result is None:
-            result = self.auth_lambda_request() if self.lambda_name else self.auth_request()
-            expires_at = result.get('expires_at', None)
-            expires_in = result.get('expires_in', None)
-            if expires_at is None and isinstance(expires_in, int):
-                result['expires_at'] = now + expires_in
-
-            expires_at = result.get('expires_at', None)
-            if expires_at:
-                AUTH_CACHE = result
-
+        result = get_broker().get_token(self.cache_key(), self.fetch_token)
         if result is not None and 'access_token' in result:
             return str('Bearer %s' % result['access_token'])
 
@@ -100,18 +99,7 @@ class Bearer(requests.auth.AuthBase):
 
     def auth_lambda_request(self):
         """ Call the auth lambda """
-        payload = {}
-        import boto3
-        session = boto3.session.Session()
-        lambda_cli = session.client('lambda', 'us-east-1')
-        result = lambda_cli.invoke(
-            FunctionName=self.lambda_name,
-            InvocationType='RequestResponse',
-            Payload=bytes(payload),
-        )
-
-        result = json.loads(result['Payload'].read().decode('utf-8'))['body']
-        return result
+        return fetch_lambda_token(self.lambda_name, 'us-east-1')
 
 def decrypt_env(name, fallback=None):
     """ Decrypt environment variable `name` if it exists, or return the given `fallback`. """
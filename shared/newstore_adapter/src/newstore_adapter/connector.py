@@ -57,7 +57,7 @@ class NewStoreConnector(object):
     def get_order(self, order_id):
         url = 'https://%s/v0/c/orders/%s' % (self.host, order_id)
         try:
-            response = self.newstore_adapter.patch_request(url)
+            response = self.newstore_adapter.get_request(url)
         except NewStoreAdapterException as ns_err:
             if self.raise_errors:
                 raise ns_err
@@ -0,0 +1,93 @@
+"""
+Pooled HTTP session shared by the NewStore adapters of a process.
+
+Copyright (C) 2021 NewStore, Inc. All rights reserved.
+"""
+
+import os
+import random
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+POOL_SIZE = int(os.environ.get('newstore_pool_size', '10') or '10')
+MAX_RETRIES = int(os.environ.get('newstore_max_retries', '3') or '3')
+BACKOFF_FACTOR = float(os.environ.get('newstore_backoff_factor', '0.5') or '0.5')
+CONNECT_TIMEOUT = float(os.environ.get('newstore_connect_timeout', '5') or '5')
+READ_TIMEOUT = float(os.environ.get('newstore_read_timeout', '120') or '120')
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+# Server errors are only retried for methods that can safely be sent twice;
+# a 429 means the request was not processed and is retried for every method.
+IDEMPOTENT_METHODS = frozenset(['HEAD', 'GET', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'])
+
+_SESSION = None
+
+
+class JitteredRetry(Retry):
+
+    """
+    Retry with exponential backoff plus a random jitter of up to one backoff step,
+    so concurrent lambdas do not retry in lockstep.
+    """
+
+    def get_backoff_time(self):
+        backoff = super(JitteredRetry, self).get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, self.backoff_factor)
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if self.total is not None and self.total <= 0:
+            return False
+        if status_code == 429:
+            return True
+        return super(JitteredRetry, self).is_retry(method, status_code, has_retry_after)
+
+
+def build_retry(max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """ Create the retry policy for 429 and 5xx responses and connection errors. """
+    kwargs = {
+        'total': max_retries,
+        'backoff_factor': backoff_factor,
+        'status_forcelist': RETRY_STATUSES,
+        'raise_on_status': False,
+        'respect_retry_after_header': True
+    }
+    # urllib3 1.26 renamed method_whitelist to allowed_methods
+    if hasattr(Retry, 'DEFAULT_ALLOWED_METHODS'):
+        kwargs['allowed_methods'] = IDEMPOTENT_METHODS
+    else:
+        kwargs['method_whitelist'] = IDEMPOTENT_METHODS
+    return JitteredRetry(**kwargs)
+
+
+def build_session(pool_size=POOL_SIZE, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """
+    Create a requests session keeping up to `pool_size` connections alive per host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=build_retry(max_retries, backoff_factor)
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the session shared by all adapters, kept for warm invocations of a lambda.
+    """
+    global _SESSION
+    if _SESSION is None:
+        _SESSION = build_session()
+    return _SESSION
+
+
+def get_timeout():
+    """ Return the (connect, read) timeout used for every request. """
+    return (CONNECT_TIMEOUT, READ_TIMEOUT)
@@ -0,0 +1,49 @@
+"""
+Compares fetching the orders and their returns one by one with NewStoreAdapter against
+the bulk helpers of AsyncNewStoreConnector, on a local stub server answering every call
+after `delay` seconds to simulate the API latency.
+
+Run with: python -m newstore_adapter.tests.async_connector_benchmark [orders] [delay]
+"""
+
+import asyncio
+import sys
+import time
+
+from newstore_adapter.adapter import NewStoreAdapter
+from newstore_adapter.async_adapter import AsyncNewStoreAdapter, close_async_session
+from newstore_adapter.async_connector import AsyncNewStoreConnector
+from newstore_adapter.tests.stub_server import StubServer
+
+
+def _sync(stub, order_ids):
+    # NewStoreConnector builds https URLs, the adapter is called with the same paths instead
+    adapter = NewStoreAdapter('benchmark', None, host='127.0.0.1')
+    adapter.get_api_auth = lambda auth_required=True: None
+    for order_id in order_ids:
+        adapter.get_request('%s/v0/c/orders/%s' % (stub.url, order_id))
+        adapter.get_request('%s/v0/d/orders/%s/returns' % (stub.url, order_id))
+
+
+async def _async(stub, order_ids):
+    adapter = AsyncNewStoreAdapter('benchmark', None, host='127.0.0.1', rate_limit=0)
+    adapter.get_api_auth = lambda auth_required=True: None
+    connector = AsyncNewStoreConnector('benchmark', None, host='127.0.0.1', newstore_adapter=adapter)
+    connector.base_url = stub.url
+    await connector.get_orders(order_ids)
+    await connector.get_returns_for_orders(order_ids)
+    await close_async_session()
+
+
+def main(orders=200, delay=0.05):
+    order_ids = ['order-%s' % i for i in range(orders)]
+    with StubServer(delay=delay) as stub:
+        for name, run in [('NewStoreAdapter', lambda: _sync(stub, order_ids)),
+                          ('AsyncNewStoreConnector', lambda: asyncio.run(_async(stub, order_ids)))]:
+            started_at = time.perf_counter()
+            run()
+            print('%-24s %d orders with returns in %.2fs' % (name, orders, time.perf_counter() - started_at))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, float(sys.argv[2]) if len(sys.argv) > 2 else 0.05)
@@ -0,0 +1,148 @@
+import asyncio
+import time
+import unittest
+
+from newstore_adapter.async_adapter import AsyncNewStoreAdapter, RateLimiter, close_async_session
+from newstore_adapter.async_connector import AsyncNewStoreConnector
+from newstore_adapter.exceptions import NewStoreAdapterException
+from newstore_adapter.tests.stub_server import StubServer
+
+
+def _connector(stub, raise_errors=False, max_concurrency=10, rate_limit=0):
+    adapter = AsyncNewStoreAdapter('testenant', None, host='127.0.0.1', timeout=(1, 1), backoff_factor=0,
+                                   rate_limit=rate_limit)
+    adapter.get_api_auth = lambda auth_required=True: None
+    connector = AsyncNewStoreConnector('testenant', None, host='127.0.0.1', raise_errors=raise_errors,
+                                       max_concurrency=max_concurrency, newstore_adapter=adapter)
+    connector.base_url = stub.url
+    return connector
+
+
+def _run(coroutine):
+    """ Run the coroutine in a new event loop and close the session bound to it. """
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await close_async_session()
+    return asyncio.run(run())
+
+
+class TestAsyncNewStoreConnector(unittest.TestCase):
+
+    def test_get_order(self):
+        async def run():
+            with StubServer(echo_path=True) as stub:
+                order = await _connector(stub).get_order('order-1')
+                self.assertEqual(order, {'ok': True, 'path': '/v0/c/orders/order-1'})
+                self.assertEqual(stub.methods, ['GET'])
+
+        _run(run())
+
+    def test_errors_return_none(self):
+        async def run():
+            with StubServer() as stub:
+                stub.statuses = [404]
+                self.assertIsNone(await _connector(stub).get_store('store-1'))
+
+        _run(run())
+
+    def test_errors_are_raised_with_raise_errors(self):
+        async def run():
+            with StubServer() as stub:
+                stub.statuses = [404]
+                with self.assertRaises(NewStoreAdapterException):
+                    await _connector(stub, raise_errors=True).get_returns('order-1')
+
+        _run(run())
+
+    def test_get_shipments_ignores_raise_errors(self):
+        async def run():
+            with StubServer() as stub:
+                stub.statuses = [400]
+                self.assertIsNone(await _connector(stub, raise_errors=True).get_shipments('ff-1'))
+
+        _run(run())
+
+    def test_server_errors_are_retried_for_get(self):
+        async def run():
+            with StubServer() as stub:
+                stub.statuses = [503, 429]
+                self.assertEqual(await _connector(stub).get_return('order-1', 'return-1'), {'ok': True})
+                self.assertEqual(stub.requests, 3)
+
+        _run(run())
+
+    def test_server_error_on_post_is_not_retried(self):
+        async def run():
+            with StubServer() as stub:
+                stub.statuses = [500]
+                self.assertIsNone(await _connector(stub).create_return('order-1', {'items': []}))
+                self.assertEqual(stub.requests, 1)
+
+        _run(run())
+
+    def test_get_orders_fans_out_with_concurrency_cap(self):
+        async def run():
+            with StubServer(echo_path=True, delay=0.05) as stub:
+                order_ids = ['order-%s' % i for i in range(20)]
+
+                orders = await _connector(stub, max_concurrency=5).get_orders(order_ids + order_ids[:3])
+
+                self.assertEqual(list(orders), order_ids)
+                self.assertEqual(orders['order-7']['path'], '/v0/c/orders/order-7')
+                self.assertEqual(stub.requests, 20)
+                self.assertEqual(set(stub.methods), {'GET'})
+                self.assertEqual(stub.max_active, 5)
+                self.assertEqual(stub.connections, 5)
+
+        _run(run())
+
+    def test_get_returns_for_orders_keeps_failed_orders(self):
+        async def run():
+            with StubServer() as stub:
+                stub.statuses = [404]
+                returns = await _connector(stub, max_concurrency=1).get_returns_for_orders(['order-1', 'order-2'])
+                self.assertEqual(returns, {'order-1': None, 'order-2': {'ok': True}})
+
+        _run(run())
+
+    def test_bulk_error_is_raised_with_raise_errors(self):
+        async def run():
+            with StubServer() as stub:
+                stub.statuses = [400]
+                with self.assertRaises(NewStoreAdapterException):
+                    await _connector(stub, raise_errors=True, max_concurrency=1).get_refunds_for_orders(['1', '2', '3'])
+                self.assertLess(stub.requests, 3)
+
+        _run(run())
+
+    def test_rate_limit(self):
+        async def run():
+            with StubServer() as stub:
+                connector = _connector(stub, rate_limit=50)
+                started_at = time.monotonic()
+                await connector.get_stores_by_id(['store-%s' % i for i in range(60)])
+                # A burst of 50 requests, the next 10 at 50 per second
+                self.assertGreaterEqual(time.monotonic() - started_at, 0.18)
+                self.assertEqual(stub.requests, 60)
+
+        _run(run())
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_disabled(self):
+        limiter = RateLimiter(0)
+
+        async def acquire_many():
+            for _ in range(1000):
+                await limiter.acquire()
+
+        started_at = time.monotonic()
+        asyncio.run(acquire_many())
+        self.assertLess(time.monotonic() - started_at, 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Micro-benchmark of the per-call latency of NewStoreAdapter.get_request against a local
+stub server, with a new connection per call (module level requests.get) and with the
+pooled session.
+
+Run with: python -m newstore_adapter.tests.session_benchmark [calls]
+"""
+
+import sys
+import time
+
+import requests
+
+from newstore_adapter.adapter import NewStoreAdapter
+from newstore_adapter.session import build_session
+from newstore_adapter.tests.stub_server import StubServer
+
+
+class _UnpooledSession(object):
+
+    """ Sends every call with the module level requests functions, like the adapter used to. """
+
+    def get(self, *args, **kwargs):
+        return requests.get(*args, **kwargs)
+
+
+def _measure(adapter, url, calls):
+    started_at = time.perf_counter()
+    for _ in range(calls):
+        adapter.get_request(url, auth_required=False)
+    return (time.perf_counter() - started_at) / calls * 1000
+
+
+def main(calls=500):
+    with StubServer() as stub:
+        url = stub.url + '/v0/ping'
+        for name, session in [('requests.get', _UnpooledSession()), ('pooled session', build_session())]:
+            adapter = NewStoreAdapter('benchmark', None, host='127.0.0.1', session=session)
+            connections = stub.connections
+            latency = _measure(adapter, url, calls)
+            print('%-16s %8.3f ms/call %6d connections' % (name, latency, stub.connections - connections))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,51 @@
+import unittest
+
+from newstore_adapter.adapter import NewStoreAdapter
+from newstore_adapter.exceptions import NewStoreAdapterException
+from newstore_adapter.session import build_session
+from newstore_adapter.tests.stub_server import StubServer
+
+
+def _adapter(session):
+    return NewStoreAdapter('testenant', None, host='127.0.0.1', session=session, timeout=(1, 1))
+
+
+class TestAdapterSession(unittest.TestCase):
+
+    def test_connections_are_reused(self):
+        with StubServer() as stub:
+            adapter = _adapter(build_session())
+            for _ in range(5):
+                adapter.get_request(stub.url + '/ping', auth_required=False)
+            self.assertEqual(stub.requests, 5)
+            self.assertEqual(stub.connections, 1)
+
+    def test_server_errors_are_retried_for_get(self):
+        with StubServer() as stub:
+            stub.statuses = [503, 502]
+            adapter = _adapter(build_session(backoff_factor=0))
+            response = adapter.get_request(stub.url + '/ping', auth_required=False)
+            self.assertEqual(response.json(), {'ok': True})
+            self.assertEqual(stub.requests, 3)
+
+    def test_throttled_post_is_retried(self):
+        with StubServer() as stub:
+            stub.statuses = [429]
+            adapter = _adapter(build_session(backoff_factor=0))
+            adapter.get_api_auth = lambda auth_required=True: None
+            response = adapter.post_request(stub.url + '/orders', {'id': 1})
+            self.assertEqual(response.json(), {'ok': True})
+            self.assertEqual(stub.requests, 2)
+
+    def test_server_error_on_post_is_not_retried(self):
+        with StubServer() as stub:
+            stub.statuses = [500]
+            adapter = _adapter(build_session(backoff_factor=0))
+            adapter.get_api_auth = lambda auth_required=True: None
+            with self.assertRaises(NewStoreAdapterException):
+                adapter.post_request(stub.url + '/orders', {'id': 1})
+            self.assertEqual(stub.requests, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Local HTTP/1.1 server answering NewStore API calls, used by the session tests and benchmark.
+"""
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubServer(object):
+
+    """
+    Answers every request with `{"ok": true}`, after replying with the queued
+    error statuses first. Counts the requests and the TCP connections accepted,
+    `methods` lists the HTTP method of every request.
+    With `echo_path` set the request path is added to the body, with `delay`
+    every reply waits that many seconds; `max_active` is the highest number of
+    requests handled at the same time.
+    """
+
+    def __init__(self, echo_path=False, delay=0):
+        self.statuses = []
+        self.requests = 0
+        self.methods = []
+        self.connections = 0
+        self.echo_path = echo_path
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                stub.connections += 1
+                BaseHTTPRequestHandler.setup(self)
+                # Headers and body are written separately, do not wait for delayed ACKs
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                with stub.lock:
+                    stub.requests += 1
+                    stub.methods.append(self.command)
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    status = stub.statuses.pop(0) if stub.statuses else 200
+                if stub.delay:
+                    time.sleep(stub.delay)
+                with stub.lock:
+                    stub.active -= 1
+                result = {'ok': status == 200}
+                if stub.echo_path:
+                    result['path'] = self.path
+                body = json.dumps(result).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                if status == 429:
+                    self.send_header('Retry-After', '0')
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_PATCH = _reply
+
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%s' % self.server.server_address[1]
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,120 @@
+import base64
+import json
+import threading
+import time
+import unittest
+
+from newstore_adapter.auth import Bearer
+from newstore_adapter.token_broker import TokenBroker, get_jwt_expiry
+
+KEY = ('testenant', 'testenant.x.newstore.net', 'user')
+
+
+def _jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': exp}).encode('utf-8')).decode('utf-8').rstrip('=')
+    return 'header.%s.signature' % payload
+
+
+class _Fetch(object):
+
+    def __init__(self, expires_in=3600, delay=0):
+        self.calls = 0
+        self.expires_in = expires_in
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return {'access_token': 'token-%s' % self.calls, 'expires_in': self.expires_in}
+
+
+class TestTokenBroker(unittest.TestCase):
+
+    def test_token_is_cached_by_key(self):
+        broker = TokenBroker()
+        fetch = _Fetch()
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-1')
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-1')
+        self.assertEqual(broker.get_token(('other', 'host', 'user'), fetch)['access_token'], 'token-2')
+        self.assertEqual(fetch.calls, 2)
+
+    def test_expiry_is_read_from_the_jwt(self):
+        exp = int(time.time()) + 30
+        self.assertEqual(get_jwt_expiry(_jwt(exp)), exp)
+        self.assertIsNone(get_jwt_expiry('not a jwt'))
+
+        broker = TokenBroker(refresh_ahead=0, min_ttl=60)
+        fetch = lambda: {'access_token': _jwt(exp), 'expires_in': 86400}
+        self.assertEqual(broker.get_token(KEY, fetch)['expires_at'], exp)
+        # Expires within min_ttl, so it is not handed out from the cache
+        self.assertIsNone(broker.get_cached_token(KEY))
+
+    def test_token_without_expiry_is_not_cached(self):
+        broker = TokenBroker()
+        broker.get_token(KEY, lambda: {'access_token': 'token'})
+        self.assertIsNone(broker.get_cached_token(KEY))
+
+    def test_concurrent_callers_share_one_fetch(self):
+        broker = TokenBroker()
+        fetch = _Fetch(delay=0.1)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(broker.get_token(KEY, fetch)['access_token']))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['token-1'] * 10)
+        self.assertEqual(fetch.calls, 1)
+
+    def test_refresh_ahead_of_expiry(self):
+        broker = TokenBroker(refresh_ahead=600)
+        fetch = _Fetch(expires_in=3600, delay=0.1)
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-1')
+        self.assertAlmostEqual(broker.refresh_at[KEY], time.time() + 3000, delta=5)
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-1')
+        self.assertEqual(fetch.calls, 1)
+
+        # Within refresh_ahead: the current token is returned while a single refresh runs
+        broker.refresh_at[KEY] = time.time()
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-1')
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-1')
+        with broker.get_lock(KEY):
+            pass
+        self.assertEqual(fetch.calls, 2)
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-2')
+
+    def test_short_lived_token_is_refreshed_at_half_its_lifetime(self):
+        broker = TokenBroker(refresh_ahead=600)
+        broker.get_token(KEY, _Fetch(expires_in=60))
+        self.assertAlmostEqual(broker.refresh_at[KEY], time.time() + 30, delta=5)
+
+    def test_failed_refresh_keeps_the_token(self):
+        broker = TokenBroker()
+        broker.get_token(KEY, _Fetch())
+        broker.refresh_at[KEY] = time.time()
+
+        def fail():
+            raise ValueError('unavailable')
+
+        self.assertEqual(broker.get_token(KEY, fail)['access_token'], 'token-1')
+        with broker.get_lock(KEY):
+            pass
+        self.assertEqual(broker.get_cached_token(KEY)['access_token'], 'token-1')
+
+    def test_invalidate(self):
+        broker = TokenBroker()
+        fetch = _Fetch()
+        broker.get_token(KEY, fetch)
+        broker.invalidate(KEY)
+        self.assertEqual(broker.get_token(KEY, fetch)['access_token'], 'token-2')
+
+    def test_bearer_cache_key(self):
+        bearer = Bearer().with_user('user', 'secret')
+        bearer.tenant, bearer.hostname = 'testenant', 'testenant.x.newstore.net'
+        self.assertEqual(bearer.cache_key(), KEY)
+        self.assertEqual(Bearer().with_lambda('auth').cache_key(), (None, None, 'lambda:auth'))
+
+
+if __name__ == '__main__':
+    unittest.main()
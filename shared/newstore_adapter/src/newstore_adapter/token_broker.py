@@ -0,0 +1,173 @@
+"""
+Process wide cache of NewStore access tokens, shared by the adapters, pom_common and lambda_utils.
+
+Tokens are cached by (tenant, host, user) until shortly before they expire. The expiry is taken
+from `expires_at`, the `exp` claim of the JWT or `expires_in`, in that order. Once less than
+REFRESH_AHEAD seconds or half of its lifetime remain, the token is refreshed in a background
+thread while callers keep using the current one. Only one fetch per key runs at a time.
+
+Copyright (C) 2021 NewStore, Inc. All rights reserved.
+"""
+
+import base64
+import json
+import logging
+import os
+import threading
+import time
+
+from .session import get_session, get_timeout
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Seconds before the expiry at which the token is refreshed in the background
+REFRESH_AHEAD = int(os.environ.get('newstore_token_refresh_ahead', '600') or '600')
+# Tokens expiring within this many seconds are not handed out anymore
+MIN_TTL = int(os.environ.get('newstore_token_min_ttl', '0') or '0')
+
+_BROKER = None
+
+
+def get_jwt_expiry(access_token):
+    """ Return the `exp` claim of a JWT without verifying it, None when it cannot be read. """
+    try:
+        payload = access_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+    except (AttributeError, IndexError, TypeError, ValueError):
+        return None
+
+
+def get_expires_at(token, fetched_at):
+    """ Return the expiry of a token response as a timestamp, None when it has none. """
+    expires_at = token.get('expires_at')
+    if expires_at is None:
+        expires_at = get_jwt_expiry(token.get('access_token'))
+    if expires_at is None and isinstance(token.get('expires_in'), (int, float)):
+        expires_at = fetched_at + token['expires_in']
+    return expires_at
+
+
+class TokenBroker(object):
+
+    """
+    Caches token responses by key and refreshes them ahead of their expiry.
+    `fetch` callables return the token response as a dict with at least `access_token`.
+    """
+
+    def __init__(self, refresh_ahead=REFRESH_AHEAD, min_ttl=MIN_TTL):
+        self.refresh_ahead = refresh_ahead
+        self.min_ttl = min_ttl
+        self.tokens = {}
+        self.refresh_at = {}
+        self.locks = {}
+        self.lock = threading.Lock()
+
+    def get_token(self, key, fetch, min_ttl=None):
+        """
+        Return the cached token for `key`, fetching it when there is none or when it expires
+        within `min_ttl` seconds. Concurrent callers of a key wait for a single fetch.
+        """
+        min_ttl = self.min_ttl if min_ttl is None else min_ttl
+        token = self.get_cached_token(key, min_ttl)
+        if token is not None:
+            if time.time() >= self.refresh_at.get(key, 0):
+                self.refresh_in_background(key, fetch)
+            return token
+
+        with self.get_lock(key):
+            # Another caller may have fetched the token while this one waited
+            token = self.get_cached_token(key, min_ttl)
+            if token is None:
+                token = self.fetch(key, fetch)
+        return token
+
+    def get_cached_token(self, key, min_ttl=None):
+        """ Return the cached token for `key` if it is valid for `min_ttl` more seconds, else None. """
+        min_ttl = self.min_ttl if min_ttl is None else min_ttl
+        token = self.tokens.get(key)
+        if token is not None and token['expires_at'] - time.time() > min_ttl:
+            return token
+        return None
+
+    def invalidate(self, key):
+        """ Drop the cached token, e.g. after the API rejected it. """
+        self.tokens.pop(key, None)
+
+    def get_lock(self, key):
+        with self.lock:
+            lock = self.locks.get(key)
+            if lock is None:
+                lock = self.locks[key] = threading.Lock()
+        return lock
+
+    def fetch(self, key, fetch):
+        fetched_at = time.time()
+        token = fetch()
+        if token is None:
+            return None
+        expires_at = get_expires_at(token, fetched_at)
+        if expires_at is None:
+            logger.warning('Token without expiry, it is not cached')
+            return token
+        token['expires_at'] = expires_at
+        self.tokens[key] = token
+        self.refresh_at[key] = expires_at - min(self.refresh_ahead, (expires_at - fetched_at) / 2)
+        return token
+
+    def refresh_in_background(self, key, fetch):
+        """ Fetch a new token for `key` in a daemon thread, unless a fetch is already running. """
+        lock = self.get_lock(key)
+        if not lock.acquire(False):
+            return
+
+        def refresh():
+            try:
+                self.fetch(key, fetch)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Refreshing the token ahead of its expiry failed, keeping the current one')
+            finally:
+                lock.release()
+
+        thread = threading.Thread(target=refresh)
+        thread.daemon = True
+        thread.start()
+
+
+def get_broker():
+    """ Return the token broker shared by the whole process, kept for warm invocations of a lambda. """
+    global _BROKER
+    if _BROKER is None:
+        _BROKER = TokenBroker()
+    return _BROKER
+
+
+def fetch_password_token(host, username, password):
+    """ Request a token for the API user from the NewStore token endpoint, over the shared session. """
+    response = get_session().post('https://%s/v0/token' % host, headers={'Host': host}, data={
+        'grant_type': 'password',
+        'username': username,
+        'password': password
+    }, timeout=get_timeout())
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_lambda_token(function_name, region_name=None):
+    """
+    Invoke the auth lambda and return the token from its body. The body is either the token
+    response itself or holds the access token under `token`.
+    """
+    import boto3
+    lambda_cli = boto3.session.Session().client('lambda', region_name)
+    result = lambda_cli.invoke(
+        FunctionName=function_name,
+        InvocationType='RequestResponse',
+        Payload=b'',
+    )
+    body = json.loads(result['Payload'].read().decode('utf-8'))['body']
+    if isinstance(body, dict) and 'token' in body:
+        token = body['token']
+        return token if isinstance(token, dict) else {'access_token': token}
+    return body
@@ -1,31 +1,32 @@
-import json
 import logging
 import os
-import boto3
+from newstore_adapter.token_broker import get_broker, fetch_lambda_token
 
 LOGGER = logging.getLogger(__name__)
 
 
 class Token():
-    token = None
 
     def get_token(self):
-        if self.token:
-            return self.token
-
+        """
+        Return the access token, invoking the auth token lambda only when the process wide
+        token cache holds no valid token for this tenant.
+        """
         function_name = os.environ["AUTH_TOKEN_LAMBDA_NAME"]
-        payload = {}
-        session = boto3.session.Session()
-        lambda_cli = session.client("lambda")
-        result = lambda_cli.invoke(
-            FunctionName=function_name,
-            InvocationType='RequestResponse',
-            Payload=bytes(payload),
-        )
 
-        LOGGER.info('invoke_auth_token_lambda - auth token - response')
-        output = json.loads(result['Payload'].read().decode('utf-8'))['body']['token']
+        def invoke_auth_token_lambda():
+            LOGGER.info('invoke_auth_token_lambda - auth token - request')
+            return fetch_lambda_token(function_name)
+
+        token = get_broker().get_token(self.cache_key(), invoke_auth_token_lambda)
+        return token["access_token"]
 
-        self.token = output
+    def invalidate(self):
+        """ Drop the cached token, e.g. after NewStore rejected it. """
+        get_broker().invalidate(self.cache_key())
 
-        return output
+    @staticmethod
+    def cache_key():
+        tenant = os.environ.get("TENANT")
+        host = f"{tenant}.{os.environ.get('STAGE')}.newstore.net"
+        return (tenant, host, f"lambda:{os.environ['AUTH_TOKEN_LAMBDA_NAME']}")
@@ -1,6 +1,7 @@
 """
 Module secrets_manager.py
 """
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 import base64
 import boto3
@@ -9,19 +10,51 @@ import logging
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.INFO)
 
+# BatchGetSecretValue accepts up to 20 secret ids per call
+BATCH_SIZE = 20
+MAX_WORKERS = 10
+
+_CLIENTS = {}
+
+
+def get_client(region):
+    """
+    return the Secrets Manager client of the region, shared by all calls of the process
+    """
+    client = _CLIENTS.get(region)
+    if client is None:
+        session = boto3.session.Session()
+        client = _CLIENTS[region] = session.client(
+            service_name="secretsmanager",
+            region_name=region
+        )
+    return client
+
+
+def _secret_from_response(response):
+    """
+    return the secret string, or the decoded secret binary, of a secret value response
+    """
+    # Decrypts secret using the associated KMS CMK.
+    # Depending on whether the secret is a string or binary,
+    # one of these fields will be populated.
+    if "SecretString" in response:
+        return response["SecretString"]
+    return base64.b64decode(response["SecretBinary"])
+
 
 def get_secret_value(secret_name, region):
     """
     return credentials from secret manager
     """
-    region_name = region
-
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(
-        service_name="secretsmanager",
-        region_name=region_name
-    )
+    return get_secret(secret_name, region)["value"]
+
+
+def get_secret(secret_name, region):
+    """
+    return the value and version id of a secret as {"value", "version_id"}
+    """
+    client = get_client(region)
     # See https://docs.aws.amazon.com/secretsmanager/latest/apireference/API_GetSecretValue.html
     # We rethrow the exception by default.
 
@@ -53,13 +86,49 @@ def get_secret_value(secret_name, region):
             # Deal with the exception here, and/or rethrow at your discretion.
             raise e
     else:
-        # Decrypts secret using the associated KMS CMK.
-        # Depending on whether the secret is a string or binary,
-        # one of these fields will be populated.
-        secret = ""
-        if "SecretString" in get_secret_value_response:
-            secret = get_secret_value_response["SecretString"]
-        else:
-            secret = base64.b64decode(
-                get_secret_value_response["SecretBinary"])
-        return secret
+        return {
+            "value": _secret_from_response(get_secret_value_response),
+            "version_id": get_secret_value_response.get("VersionId")
+        }
+    return {"value": None, "version_id": None}
+
+
+def get_secrets(secret_names, region, max_workers=MAX_WORKERS):
+    """
+    return the value and version id of several secrets by name, see get_secret.
+    The secrets are read with BatchGetSecretValue, up to 20 per call; if the API is not
+    available, e.g. for older boto3 versions or missing permissions, they are read
+    concurrently with GetSecretValue. Secrets the batch call failed for are read
+    one by one; if that fails too, their value is None and the error is returned
+    under "error", so one broken secret does not fail the others.
+    """
+    secret_names = list(dict.fromkeys(secret_names))
+    secrets = {}
+    client = get_client(region)
+    try:
+        for start in range(0, len(secret_names), BATCH_SIZE):
+            batch = secret_names[start:start + BATCH_SIZE]
+            response = client.batch_get_secret_value(SecretIdList=batch)
+            for secret_value in response["SecretValues"]:
+                name = secret_value["Name"] if secret_value["Name"] in batch else secret_value["ARN"]
+                secrets[name] = {
+                    "value": _secret_from_response(secret_value),
+                    "version_id": secret_value.get("VersionId")
+                }
+    except (AttributeError, ClientError) as error:
+        LOGGER.warning(f"BatchGetSecretValue not available, reading the secrets one by one: {error}")
+
+    missing = [secret_name for secret_name in secret_names if secret_name not in secrets]
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+            for secret_name, secret in zip(missing, executor.map(lambda name: _read_secret(name, region), missing)):
+                secrets[secret_name] = secret
+    return secrets
+
+
+def _read_secret(secret_name, region):
+    try:
+        return get_secret(secret_name, region)
+    except ClientError as error:
+        LOGGER.error(f"Could not read secret {secret_name}: {error}")
+        return {"value": None, "version_id": None, "error": error}
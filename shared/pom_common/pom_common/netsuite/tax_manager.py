@@ -1,15 +1,24 @@
 import os
 import json
 import logging
+import threading
+import time
 
 from param_store.client import ParamStore
-from netsuite.service import RecordRef
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.INFO)
 
 TENANT = os.environ.get('TENANT')
 STAGE = os.environ.get('STAGE')
+# Seconds the netsuite config is used before its SSM parameter version is checked again
+TAX_CONFIG_TTL = int(os.environ.get('TAX_CONFIG_TTL', '300') or '0')
+
+# Suffix of the tax code preferences in the netsuite config by currency
+CURRENCY_SUFFIXES = {
+    'usd': 'us',
+    'cad': 'ca'
+}
 
 #
 # This class is introduced to handle the tax code mapping for Frank & Oak for:
@@ -26,6 +35,11 @@ STAGE = os.environ.get('STAGE')
 class TaxManager():
     param_store = None
     netsuite_config = {}
+    netsuite_config_version = None
+    netsuite_config_expires_at = 0
+    tax_code_ids = {}
+    not_taxable_ids = {}
+    lock = threading.Lock()
 
     @staticmethod
     def _get_param_store():
@@ -34,35 +48,81 @@ class TaxManager():
                                                 stage=STAGE)
         return TaxManager.param_store
 
+    #
+    # Returns the netsuite config. It is kept for TAX_CONFIG_TTL seconds, then the version of
+    # the SSM parameter is checked and the value is only read again if it changed.
+    #
     @staticmethod
     def _get_netsuite_config():
-        # TODO - enable the next line again once the configuration is stable pylint: disable=fixme
-        # if not TaxManager.netsuite_config:
-        TaxManager.netsuite_config = json.loads(TaxManager._get_param_store().get_param('netsuite'))
+        if time.time() < TaxManager.netsuite_config_expires_at:
+            return TaxManager.netsuite_config
+
+        with TaxManager.lock:
+            if time.time() < TaxManager.netsuite_config_expires_at:
+                return TaxManager.netsuite_config
+
+            param_store = TaxManager._get_param_store()
+            name = param_store.get_path_root() + 'netsuite'
+            version = None
+            if TaxManager.netsuite_config_version is not None:
+                try:
+                    version = TaxManager._get_param_version(param_store.get_client(), name)
+                except Exception: # pylint: disable=broad-except
+                    LOGGER.exception(f'Error when trying to get the version of {name}, keeping the current config')
+                    version = TaxManager.netsuite_config_version
+
+            if version is None or version != TaxManager.netsuite_config_version:
+                response = param_store.get_client().get_parameter(Name=name, WithDecryption=False)
+                TaxManager._set_netsuite_config(json.loads(response['Parameter']['Value']))
+                TaxManager.netsuite_config_version = response['Parameter']['Version']
+                LOGGER.info(f'Loaded version {TaxManager.netsuite_config_version} of {name}')
+
+            TaxManager.netsuite_config_expires_at = time.time() + TAX_CONFIG_TTL
         return TaxManager.netsuite_config
 
+    @staticmethod
+    def _get_param_version(ssm_client, name):
+        response = ssm_client.describe_parameters(
+            ParameterFilters=[{'Key': 'Name', 'Option': 'Equals', 'Values': [name]}])
+        return response['Parameters'][0]['Version'] if response['Parameters'] else None
+
+    #
+    # Stores the netsuite config together with the tax code ids by lower case currency.
+    #
+    @staticmethod
+    def _set_netsuite_config(netsuite_config):
+        TaxManager.tax_code_ids = {
+            currency: netsuite_config['tax_override_' + suffix]
+            for currency, suffix in CURRENCY_SUFFIXES.items() if 'tax_override_' + suffix in netsuite_config
+        }
+        TaxManager.not_taxable_ids = {
+            currency: netsuite_config['not_taxable_' + suffix]
+            for currency, suffix in CURRENCY_SUFFIXES.items() if 'not_taxable_' + suffix in netsuite_config
+        }
+        TaxManager.netsuite_config = netsuite_config
+
     #
     # Standard function to get the tax code id from a preference. This is used
     # mainly if Avalara/Avatax is enabled in Netsuite.
     #
     @staticmethod
     def _get_tax_code_id(currency):
-        if currency.lower() == 'usd':
-            return TaxManager._get_netsuite_config()['tax_override_us']
-        if currency.lower() == 'cad':
-            return TaxManager._get_netsuite_config()['tax_override_ca']
-        raise ValueError(f"Provided currency, {currency}, not mapped")
+        TaxManager._get_netsuite_config()
+        tax_code_id = TaxManager.tax_code_ids.get(currency.lower())
+        if tax_code_id is None:
+            raise ValueError(f"Provided currency, {currency}, not mapped")
+        return tax_code_id
 
     #
     # Returns the Non-Taxable tax code id from a preference.
     #
     @staticmethod
     def _get_not_taxable_id(currency):
-        if currency.lower() == 'usd':
-            return TaxManager._get_netsuite_config()['not_taxable_us']
-        if currency.lower() == 'cad':
-            return TaxManager._get_netsuite_config()['not_taxable_ca']
-        raise ValueError(f'Provided currency, {currency}, not mapped')
+        TaxManager._get_netsuite_config()
+        not_taxable_id = TaxManager.not_taxable_ids.get(currency.lower())
+        if not_taxable_id is None:
+            raise ValueError(f'Provided currency, {currency}, not mapped')
+        return not_taxable_id
 
 
     #
@@ -155,6 +215,8 @@ class TaxManager():
     #
     @staticmethod
     def get_tax_offset_line_item(currency):
+        # Imported here, loading netsuite.service builds the SOAP client from the WSDL
+        from netsuite.service import RecordRef # pylint: disable=import-outside-toplevel
         return {
             'item': RecordRef(internalId=TaxManager._get_netsuite_config()['tax_offset_item_internal_id']),
             'amount': 10000,
@@ -1 +1 @@
-from pom_common.shopify.shop_manager import ShopManager
+from pom_common.shopify.shop_manager import ShopManager, ShopRegistry, get_shop_registry
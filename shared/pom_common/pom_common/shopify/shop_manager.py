@@ -1,14 +1,25 @@
 """
 Module shop_manager.py
 """
-from pom_common.aws.secrets_manager import get_secret_value
-import boto3
+from pom_common.aws.secrets_manager import get_secrets
+from param_store.client import ParamStore
 import json
 import logging
+import os
+import threading
+import time
 
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel(logging.INFO)
 
+# Seconds the shop configs are kept before their secrets are read again
+SHOP_CONFIG_TTL = int(os.environ.get('SHOP_CONFIG_TTL', '900') or '0')
+# Seconds after which the secrets are read again while a shop config could not be loaded
+SHOP_CONFIG_RETRY = 60
+
+_REGISTRIES = {}
+_REGISTRIES_LOCK = threading.Lock()
+
 
 class InvalidShopId(Exception):
     pass
@@ -17,22 +28,145 @@ class InvalidShopId(Exception):
 def get_shopify_param(tenant, stage):
     path = f'/{tenant}/{stage}/shopify'
     try:
-        ssm_client = boto3.client('ssm')
-        response = ssm_client.get_parameter(
-            Name=path, WithDecryption=False)
-        return json.loads(response['Parameter']['Value'])
+        return ParamStore(tenant, stage).get_json_param('shopify')
     except Exception:
         LOGGER.exception(f'Error when trying to get parameter {path}')
         return None
 
-class ShopManager:
-    shop_ids = []
-    configs = {}
 
+class ShopRegistry:
+    """
+    Shop ids, configs and connectors of a tenant, kept for warm invocations of a lambda.
+    The configs of all shops are read from their secrets concurrently. After `ttl` seconds
+    the secrets are read again; connectors are only rebuilt for shops whose secret
+    version changed, e.g. after a rotation. A shop whose config cannot be loaded is
+    logged and left out, only get_shop_config of that shop raises the error.
+    """
+
+    def __init__(self, tenant, stage, region, ttl=SHOP_CONFIG_TTL):
+        self.tenant = tenant
+        self.stage = stage
+        self.region = region
+        self.ttl = ttl
+        self.shop_ids = []
+        self.configs = {}
+        self.versions = {}
+        self.connectors = {}
+        self.errors = {}
+        self.expires_at = 0
+        self.lock = threading.RLock()
+
+    def get_shop_ids(self):
+        self.load()
+        return self.shop_ids
+
+    def get_shop_configs(self):
+        """
+        return the configs of all shops by shop id, without the shops whose config could not be loaded
+        """
+        self.load()
+        return {shop_id: self.configs[shop_id] for shop_id in self.shop_ids if shop_id in self.configs}
+
+    def get_shop_config(self, shop_id):
+        self.load()
+        if shop_id in self.errors:
+            raise self.errors[shop_id]
+        if shop_id in self.shop_ids:
+            return self.configs[shop_id]
+
+        raise InvalidShopId
+
+    def get_connectors(self, connector_factory):
+        """
+        return a connector for every shop by shop id, created with connector_factory(config)
+        and reused until the secret of the shop changes
+        """
+        with self.lock:
+            configs = self.get_shop_configs()
+            for shop_id, config in configs.items():
+                if shop_id not in self.connectors:
+                    self.connectors[shop_id] = connector_factory(config)
+            return {shop_id: self.connectors[shop_id] for shop_id in configs}
+
+    def invalidate(self, shop_id=None):
+        """
+        read the secrets again on the next call, e.g. after a shop rejected its credentials
+        """
+        with self.lock:
+            self.expires_at = 0
+            if shop_id is None:
+                self.versions.clear()
+            else:
+                self.versions.pop(shop_id, None)
+
+    def load(self):
+        with self.lock:
+            if time.time() < self.expires_at:
+                return
+
+            shopify_param = get_shopify_param(self.tenant, self.stage)
+            shop_ids = list(shopify_param['shop_ids'])
+            secrets = get_secrets(shop_ids, self.region)
+
+            for shop_id in set(self.configs) - set(shop_ids):
+                self._drop(shop_id)
+            self.errors = {}
+            for shop_id in shop_ids:
+                self._load_shop(shop_id, secrets[shop_id])
+
+            self.shop_ids = shop_ids
+            self.expires_at = time.time() + (min(self.ttl, SHOP_CONFIG_RETRY) if self.errors else self.ttl)
+
+    def _load_shop(self, shop_id, secret):
+        if shop_id in self.versions and self.versions[shop_id] == secret['version_id']:
+            return
+        try:
+            if secret.get('error') is not None:
+                raise secret['error']
+            if secret['value'] is None:
+                raise ValueError(f'Secret of shop {shop_id} has no value')
+            config = json.loads(secret['value'])
+        except Exception as error: # pylint: disable=broad-except
+            if shop_id in self.configs:
+                LOGGER.exception(f'Could not load the config of shop {shop_id}, keeping the current one')
+            else:
+                LOGGER.exception(f'Could not load the config of shop {shop_id}, skipping the shop')
+                self.errors[shop_id] = error
+            return
+
+        if shop_id in self.versions:
+            LOGGER.info(f'Secret of shop {shop_id} changed, reloading its config')
+        self.configs[shop_id] = config
+        self.versions[shop_id] = secret['version_id']
+        self.connectors.pop(shop_id, None)
+
+    def _drop(self, shop_id):
+        self.configs.pop(shop_id, None)
+        self.versions.pop(shop_id, None)
+        self.connectors.pop(shop_id, None)
+
+
+def get_shop_registry(tenant, stage, region):
+    """
+    return the shop registry of the tenant, shared by the whole process
+    """
+    key = (tenant, stage, region)
+    with _REGISTRIES_LOCK:
+        registry = _REGISTRIES.get(key)
+        if registry is None:
+            registry = _REGISTRIES[key] = ShopRegistry(tenant, stage, region)
+    return registry
+
+
+class ShopManager:
+    """
+    Access to the shop configs of a tenant, backed by the shared ShopRegistry
+    """
 
     def __init__(self, tenant, stage, region):
         self.region = region
-        self.shop_ids = get_shopify_param(tenant, stage)['shop_ids']
+        self.registry = get_shop_registry(tenant, stage, region)
+        self.shop_ids = self.registry.get_shop_ids()
 
 
     def get_shop_ids(self):
@@ -41,8 +175,6 @@ class ShopManager:
 
     def get_shop_config(self, shop_id):
         if shop_id in self.shop_ids:
-            if not shop_id in self.configs:
-                self.configs[shop_id] = json.loads(get_secret_value(shop_id, self.region))
-            return self.configs[shop_id]
+            return self.registry.get_shop_config(shop_id)
 
         raise InvalidShopId
@@ -9,4 +9,7 @@ setup(
     data_files=[],
     include_package_data=True,
     python_requires='>=3.6',
+    install_requires=[
+        'newstore_adapter'
+    ],
 )
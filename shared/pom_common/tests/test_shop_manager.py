@@ -0,0 +1,128 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+import boto3
+from botocore.exceptions import ClientError
+from moto import mock_secretsmanager, mock_ssm
+
+from param_store import client
+from pom_common.aws import secrets_manager
+from pom_common.aws.secrets_manager import get_secrets
+from pom_common.shopify import shop_manager
+from pom_common.shopify.shop_manager import InvalidShopId, ShopManager, get_shop_registry
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+REGION = 'us-east-1'
+SHOP_IDS = ['shop-%s' % i for i in range(25)]
+
+
+def _config(shop_id, currency='USD'):
+    return json.dumps({'shop': shop_id, 'username': 'user', 'password': 'secret', 'currency': currency})
+
+
+class _Batch:
+    """ BatchGetSecretValue answered from GetSecretValue, which moto 2 does not implement """
+
+    def __init__(self, secrets_client):
+        self.secrets_client = secrets_client
+        self.calls = []
+
+    def __call__(self, SecretIdList):
+        self.calls.append(SecretIdList)
+        values = []
+        for secret_id in SecretIdList:
+            response = self.secrets_client.get_secret_value(SecretId=secret_id)
+            values.append({key: response[key] for key in ('ARN', 'Name', 'VersionId', 'SecretString')})
+        return {'SecretValues': values, 'Errors': []}
+
+
+class TestShopRegistry(unittest.TestCase):
+
+    def setUp(self):
+        for aws_mock in (mock_secretsmanager(), mock_ssm()):
+            aws_mock.start()
+            self.addCleanup(aws_mock.stop)
+        secrets_manager._CLIENTS.clear()
+        shop_manager._REGISTRIES.clear()
+        client._CLIENT = None
+        client._CACHE = None
+
+        self.secrets = boto3.client('secretsmanager', region_name=REGION)
+        for shop_id in SHOP_IDS:
+            self.secrets.create_secret(Name=shop_id, SecretString=_config(shop_id))
+        self.put_shop_ids(SHOP_IDS[:3])
+
+    def put_shop_ids(self, shop_ids):
+        boto3.client('ssm').put_parameter(
+            Name='/tenant/x/shopify', Value=json.dumps({'shop_ids': shop_ids}), Type='String', Overwrite=True)
+
+    def patch_batch(self):
+        batch = _Batch(self.secrets)
+        patcher = mock.patch.object(secrets_manager.get_client(REGION), 'batch_get_secret_value', batch, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return batch
+
+    def test_secrets_are_read_in_batches(self):
+        batch = self.patch_batch()
+
+        with mock.patch.object(secrets_manager, 'get_secret') as get_secret:
+            secrets = get_secrets(SHOP_IDS + SHOP_IDS[:2], REGION)
+
+        self.assertEqual(list(secrets), SHOP_IDS)
+        self.assertEqual(secrets['shop-7']['value'], _config('shop-7'))
+        self.assertIsNotNone(secrets['shop-7']['version_id'])
+        self.assertEqual([len(secret_ids) for secret_ids in batch.calls], [20, 5])
+        get_secret.assert_not_called()
+
+    def test_secrets_are_read_one_by_one_without_batch_access(self):
+        error = ClientError({'Error': {'Code': 'AccessDeniedException'}}, 'BatchGetSecretValue')
+        with mock.patch.object(secrets_manager.get_client(REGION), 'batch_get_secret_value',
+                               side_effect=error, create=True):
+            secrets = get_secrets(SHOP_IDS + ['missing'], REGION)
+
+        self.assertEqual(secrets['shop-24']['value'], _config('shop-24'))
+        self.assertIsNone(secrets['missing']['value'])
+        self.assertEqual(secrets['missing']['error'].response['Error']['Code'], 'ResourceNotFoundException')
+
+    def test_connectors_are_only_rebuilt_for_changed_secrets(self):
+        self.patch_batch()
+        registry = get_shop_registry('tenant', 'x', REGION)
+        created = []
+
+        def create_connector(config):
+            created.append(config['shop'])
+            return object()
+
+        connectors = registry.get_connectors(create_connector)
+        self.assertEqual(created, SHOP_IDS[:3])
+        self.assertEqual(registry.get_connectors(create_connector), connectors)
+
+        self.secrets.put_secret_value(SecretId='shop-1', SecretString=_config('shop-1', 'CAD'))
+        registry.expires_at = 0
+        rotated = registry.get_connectors(create_connector)
+
+        self.assertEqual(created, SHOP_IDS[:3] + ['shop-1'])
+        self.assertIs(rotated['shop-0'], connectors['shop-0'])
+        self.assertIsNot(rotated['shop-1'], connectors['shop-1'])
+        self.assertEqual(registry.get_shop_config('shop-1')['currency'], 'CAD')
+
+    def test_a_failing_shop_does_not_fail_the_others(self):
+        self.put_shop_ids(['shop-0', 'missing', 'shop-1'])
+
+        manager = ShopManager('tenant', 'x', REGION)
+
+        self.assertEqual(manager.get_shop_ids(), ['shop-0', 'missing', 'shop-1'])
+        self.assertEqual(manager.get_shop_config('shop-1')['shop'], 'shop-1')
+        self.assertEqual(list(manager.registry.get_shop_configs()), ['shop-0', 'shop-1'])
+        with self.assertRaises(ClientError):
+            manager.get_shop_config('missing')
+        with self.assertRaises(InvalidShopId):
+            manager.get_shop_config('shop-9')
+
+
+if __name__ == '__main__':
+    unittest.main()
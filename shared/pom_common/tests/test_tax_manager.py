@@ -0,0 +1,100 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+import boto3
+from botocore.exceptions import ClientError
+from moto import mock_ssm
+
+from param_store import client
+from param_store.client import ParamStore
+from pom_common.netsuite import tax_manager
+from pom_common.netsuite.tax_manager import TaxManager
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+NETSUITE_CONFIG = {
+    'tax_override_us': '1',
+    'tax_override_ca': '2',
+    'not_taxable_us': '3',
+    'not_taxable_ca': '4',
+    'customer_tax_item_usd': '5'
+}
+
+
+class TestTaxManager(unittest.TestCase):
+
+    def setUp(self):
+        ssm_mock = mock_ssm()
+        ssm_mock.start()
+        self.addCleanup(ssm_mock.stop)
+        self.ssm = boto3.client('ssm')
+        self.put_config(NETSUITE_CONFIG)
+
+        client._CLIENT = None
+        client._CACHE = None
+        TaxManager.param_store = ParamStore('tenant', 'x')
+        TaxManager.netsuite_config = {}
+        TaxManager.netsuite_config_version = None
+        TaxManager.netsuite_config_expires_at = 0
+
+        self.calls = []
+        TaxManager.param_store.get_client().meta.events.register(
+            'before-call.ssm.*', lambda model, **kwargs: self.calls.append(model.name))
+
+    def put_config(self, config):
+        self.ssm.put_parameter(Name='/tenant/x/netsuite', Value=json.dumps(config), Type='String', Overwrite=True)
+
+    def expire(self):
+        TaxManager.netsuite_config_expires_at = 0
+
+    def test_lookups_within_the_ttl_make_no_calls(self):
+        for _ in range(50):
+            self.assertEqual(TaxManager.get_order_item_tax_code_id('USD'), '1')
+            self.assertEqual(TaxManager.get_discount_item_tax_code_id('cad'), '2')
+            self.assertEqual(TaxManager._get_not_taxable_id('CAD'), '4')
+            self.assertEqual(TaxManager.get_customer_tax_item_id('USD'), '5')
+
+        self.assertEqual(self.calls, ['GetParameter'])
+        with self.assertRaises(ValueError):
+            TaxManager.get_shipping_tax_code_id('EUR')
+
+    def test_unchanged_version_is_not_read_again(self):
+        TaxManager.get_order_item_tax_code_id('USD')
+        self.expire()
+
+        self.assertEqual(TaxManager.get_order_item_tax_code_id('USD'), '1')
+        self.assertEqual(self.calls, ['GetParameter', 'DescribeParameters'])
+
+    def test_changed_version_is_reloaded(self):
+        TaxManager.get_order_item_tax_code_id('USD')
+        self.put_config(dict(NETSUITE_CONFIG, tax_override_us='10'))
+        self.expire()
+
+        self.assertEqual(TaxManager.get_order_item_tax_code_id('USD'), '10')
+        self.assertEqual(TaxManager.netsuite_config_version, 2)
+        self.assertEqual(self.calls, ['GetParameter', 'DescribeParameters', 'GetParameter'])
+
+    def test_failing_version_check_keeps_the_config(self):
+        TaxManager.get_order_item_tax_code_id('USD')
+        self.put_config(dict(NETSUITE_CONFIG, tax_override_us='10'))
+        self.expire()
+
+        error = ClientError({'Error': {'Code': 'ThrottlingException'}}, 'DescribeParameters')
+        with mock.patch.object(TaxManager.param_store.get_client(), 'describe_parameters', side_effect=error):
+            self.assertEqual(TaxManager.get_order_item_tax_code_id('USD'), '1')
+
+        self.assertEqual(self.calls, ['GetParameter'])
+        self.assertGreater(TaxManager.netsuite_config_expires_at, 0)
+
+    def test_ttl_is_applied(self):
+        with mock.patch.object(tax_manager, 'TAX_CONFIG_TTL', 0):
+            TaxManager.get_order_item_tax_code_id('USD')
+            TaxManager.get_order_item_tax_code_id('USD')
+
+        self.assertEqual(self.calls, ['GetParameter', 'DescribeParameters'])
+
+
+if __name__ == '__main__':
+    unittest.main()
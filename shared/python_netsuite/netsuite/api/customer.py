@@ -14,6 +14,7 @@ from netsuite.service import (
     RecordRef,
     SearchBooleanField
 )
+from netsuite.cache import get_cache
 import uuid
 from collections.abc import Mapping
 import logging
@@ -126,6 +127,15 @@ def lookup_customer_id_by_name_and_email(customer_data, return_customer_id=True)
 
 
 def lookup_customer_id_by_email(customer_data, return_customer_id=True):
+    if not return_customer_id:
+        return _search_customer_by_email(customer_data, return_customer_id)
+    # Customer ids are cached per email and subsidiary; a customer not found is searched again
+    cache_key = f"{customer_data['email']}|{customer_data['subsidiary']['internalId']}"
+    return get_cache('customer_ids_by_email', persistent=True).get_or_load(
+        cache_key, lambda: _search_customer_by_email(customer_data, return_customer_id))
+
+
+def _search_customer_by_email(customer_data, return_customer_id):
     search_fields = {
         "email": SearchStringField(
             searchValue=customer_data['email'],
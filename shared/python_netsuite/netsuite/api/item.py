@@ -12,6 +12,13 @@ from netsuite.utils import (
     get_record_by_type,
     search_records_using
 )
+from netsuite.cache import get_cache
+from netsuite.batch import (
+    get_list,
+    run_concurrently,
+    SearchError,
+    search_all
+)
 
 
 def get_product(internal_id):
@@ -25,13 +32,53 @@ def list_products(internal_ids):
             searchValue=id_references,
             operator='anyOf'
         ))
-    result = search_records_using(item_search)
-    r = result.body.searchResult
-    if r.status.isSuccess:
-        return r.recordList.record
+    try:
+        # All pages, not only the first 20 records
+        return search_all(item_search)
+    except SearchError:
+        return None
+
+
+def get_products(internal_ids):
+    """
+    Read many inventory items with chunked and concurrent getList calls.
+
+    Returns:
+        dict -- {internal_id: item}, None for the ones that don't exist
+    """
+    return get_list('inventoryItem', internal_ids)
+
+
+def get_products_by_sku(skus):
+    """
+    Look up many products by SKU, running a bounded number of lookups concurrently.
+    Every SKU is looked up like get_product_by_sku does, the upcCode, itemId and
+    external id fields can't be searched for several values at once.
+
+    Returns:
+        dict -- {sku: item}, None for the ones that don't exist
+    """
+    skus = list(dict.fromkeys(skus))
+    return dict(zip(skus, run_concurrently(get_product_by_sku, skus)))
 
 
 def get_product_by_sku(sku):
+    return _search_product_by_sku(sku)
+
+
+def get_product_id_by_sku(sku):
+    """
+    Return the internal id of the product, cached in the persistent cache if one is configured.
+    Only the id is cached, the other fields of an item can change in NetSuite.
+    """
+    def load():
+        product = _search_product_by_sku(sku)
+        return product.internalId if product else None
+
+    return get_cache('item_ids_by_sku', persistent=True).get_or_load(sku, load)
+
+
+def _search_product_by_sku(sku):
     item_search = ItemSearchBasic(
         upcCode=SearchStringField(
             searchValue=sku,
@@ -3,31 +3,36 @@ import os
 import logging
 
 from param_store.client import ParamStore
+from netsuite.cache import get_cache
 LOGGER = logging.getLogger(__name__)
 LOGGER.setLevel('INFO')
 
+CURRENCY_CODES = {
+    'currency_usd_internal_id': 'USD',
+    'currency_cad_internal_id': 'CAD',
+    'currency_gbp_internal_id': 'GBP',
+    'currency_eur_internal_id': 'EUR'
+}
+
 
 class NetSuiteMapping():
     PARAM_STORE = None
-    NETSUITE_CONFIG = None
 
     def _get_param_store(self):
-        if not self.PARAM_STORE:
+        if not NetSuiteMapping.PARAM_STORE:
             tenant = os.environ.get('TENANT')
             stage = os.environ.get('STAGE')
-            PARAM_STORE = ParamStore(tenant=tenant, stage=stage)
-        return PARAM_STORE
+            NetSuiteMapping.PARAM_STORE = ParamStore(tenant=tenant, stage=stage)
+        return NetSuiteMapping.PARAM_STORE
 
     def _get_netsuite_config(self):
-        NETSUITE_CONFIG = json.loads(
-            self._get_param_store().get_param('netsuite'))
-        return NETSUITE_CONFIG
+        return get_cache('config').get_or_load(
+            'netsuite', lambda: json.loads(self._get_param_store().get_param('netsuite')))
+
+    def _get_currency_map(self):
+        netsuite_config = self._get_netsuite_config()
+        return {str(netsuite_config[key]): code for key, code in CURRENCY_CODES.items()}
 
     def get_currency_code(self, currency_id):
-        currency_map = {
-            str(self._get_netsuite_config()['currency_usd_internal_id']): 'USD',
-            str(self._get_netsuite_config()['currency_cad_internal_id']): 'CAD',
-            str(self._get_netsuite_config()['currency_gbp_internal_id']): 'GBP',
-            str(self._get_netsuite_config()['currency_eur_internal_id']): 'EUR'
-        }
+        currency_map = get_cache('config').get_or_load('currency_map', self._get_currency_map)
         return currency_map.get(str(currency_id))
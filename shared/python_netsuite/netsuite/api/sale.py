@@ -25,6 +25,12 @@ from netsuite.utils import (
     search_records_using,
     format_error_message
 )
+from netsuite.batch import (
+    SearchError,
+    search_all,
+    search_by_keys,
+    write_list
+)
 from collections.abc import Mapping
 import logging
 import os
@@ -274,17 +280,45 @@ def get_transaction_list(external_id_list, transactionType, page_size=80):
             operator='anyOf'
         )
     )
-    result = search_records_using(transaction_search, page_size)
-    r = result.body.searchResult
+    try:
+        # All pages, not only the first `page_size` records
+        records = search_all(transaction_search, page_size)
+    except SearchError as ex:
+        logger.warning(f"Couldn't retrieve transaction list: {ex}")
+        return None
 
-    logger.debug(f"get_transaction_list response: {r}")
+    logger.debug(f"get_transaction_list records: {records}")
+
+    # The search can return nothing, meaning the transaction doesn't exist
+    return records or None
+
+
+def get_transactions_by_external_id(external_ids, transactionType):
+    """
+    Look up many transactions of one type by external id, with chunked and
+    concurrent searches.
+
+    Returns:
+        dict -- {external_id: transaction}, None for the ones that don't exist
+    """
+    def build_search(chunk):
+        return TransactionSearchBasic(
+            externalId=SearchMultiSelectField(
+                searchValue=[RecordRef(externalId=ext_id) for ext_id in chunk],
+                operator='anyOf'
+            ),
+            type=SearchEnumMultiSelectField(
+                searchValue=[transactionType],
+                operator='anyOf'
+            )
+        )
+
+    records = search_by_keys(build_search, external_ids, lambda record: record.externalId)
+    return {external_id: found[0] if found else None for external_id, found in records.items()}
 
-    if r.status.isSuccess:
-        # The search can return nothing, meaning the transaction doesn't exist
-        if r.recordList:
-            return r.recordList.record
-    logger.warning(f"Couldn't retrieve transaction list, response: {r}")
-    return None
+
+def get_sales_orders(external_ids):
+    return get_transactions_by_external_id(external_ids, '_salesOrder')
 
 
 def create_invoice(data):
@@ -416,36 +450,30 @@ def update_sales_order(sales_order_data):
 
 
 def upsert_list(records):
-    if os.environ.get('netsuite_tba_active', '0') == "1":
-        response = client.service.upsertList(
-                records,
-                _soapheaders={
-                    'tokenPassport': make_passport(),
-                    'preferences': Preferences(
-                        warningAsError=False,
-                        ignoreReadOnlyFields=True
-                    )
-                }
-            )
-    else:
-        response = client.service.upsertList(
-                records,
-                _soapheaders={
-                    'passport': passport,
-                    'applicationInfo': app_info,
-                    'preferences': Preferences(
-                        warningAsError=False,
-                        ignoreReadOnlyFields=True
-                    )
-                }
-            )
+    results = upsert_records(records)
+    failed = [result for result in results if not result.success]
+    if not failed:
+        return True
+    for result in failed:
+        logger.warning(f"Not able to upsert record {result.external_id or result.internal_id}: {result.error}")
+    return None
 
-    logger.info(f'Response - upsert_list: {response}')
 
-    r = response.body.writeResponseList.writeResponse[0]
-    if r.status.isSuccess:
-        return True
-    else:
-        logger.warning("Not able to upsertList.")
-        logger.info(response)
-        return None
+def upsert_records(records):
+    """
+    Upsert many records with chunked and concurrent upsertList calls.
+
+    Returns:
+        list -- One netsuite.batch.WriteResult per record
+    """
+    return write_list('upsertList', records)
+
+
+def add_records(records):
+    """
+    Add many records, e.g. invoices or item fulfillments, with chunked and concurrent addList calls.
+
+    Returns:
+        list -- One netsuite.batch.WriteResult per record
+    """
+    return write_list('addList', records)
@@ -0,0 +1,285 @@
+"""
+Batch operations: chunked getList, search and list write calls, all search result
+pages, and a bounded number of requests running concurrently.
+"""
+import logging
+import os
+import random
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.exceptions import ConnectionError as RequestsConnectionError, ConnectTimeout
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from netsuite.client import client
+from netsuite.service import (
+    Preferences,
+    RecordRef,
+    SearchPreferences
+)
+from netsuite.utils import (
+    format_error_message,
+    get_soapheaders
+)
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+# Requests of a user based login session are serialized by NetSuite, only token based
+# authentication allows concurrent requests, up to the concurrency limit of the account
+TBA_MAX_CONCURRENCY = int(os.environ.get('netsuite_max_concurrency', '4') or '4')
+GET_LIST_CHUNK_SIZE = 100
+SEARCH_CHUNK_SIZE = 200
+SEARCH_PAGE_SIZE = 1000
+# NetSuite accepts up to 200 records per list write, 100 during peak hours
+WRITE_CHUNK_SIZE = int(os.environ.get('netsuite_write_chunk_size', '100') or '100')
+WRITE_MAX_ATTEMPTS = int(os.environ.get('netsuite_write_max_attempts', '4') or '4')
+RETRY_BASE_DELAY = 2
+# Record errors caused by load or concurrency rather than by the record itself
+RETRYABLE_CODES = frozenset([
+    'UNEXPECTED_ERROR',
+    'WS_CONCUR_SESSION_DISALLWD',
+    'WS_EXCEEDED_CONCUR_USERS_ALLOWD',
+    'WS_REQUEST_BLOCKED',
+    'EXCEEDED_REQUEST_LIMIT',
+    'EXCEEDED_CONCURRENCY_LIMIT'
+])
+# List writes that can be sent again after their whole call failed, e.g. timed out after
+# NetSuite committed the records. Sending an addList again would create duplicates.
+IDEMPOTENT_OPERATIONS = frozenset(['updateList', 'upsertList'])
+
+class SearchError(Exception):
+    """ A search or searchMoreWithId call answered with an unsuccessful status """
+
+
+WriteResult = namedtuple('WriteResult', ['success', 'internal_id', 'external_id', 'error', 'attempts'])
+
+
+def get_max_concurrency():
+    if os.environ.get('netsuite_tba_active', '0') == '1':
+        return max(1, TBA_MAX_CONCURRENCY)
+    return 1
+
+
+def chunks(values, size):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def run_concurrently(func, items, max_concurrency=None):
+    """
+    Call func for every item with at most `max_concurrency` calls in flight.
+
+    Returns:
+        list -- The results, in the order of `items`
+    """
+    items = list(items)
+    max_concurrency = max_concurrency or get_max_concurrency()
+    if max_concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    # Build the client and log in once, before the threads race for it
+    client.resolve()
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def _search_preferences(page_size):
+    return SearchPreferences(
+        bodyFieldsOnly=False,
+        returnSearchColumns=True,
+        pageSize=page_size
+    )
+
+
+def _records(search_result, description):
+    if not search_result.status.isSuccess:
+        raise SearchError(f'{description} failed: {search_result.status.statusDetail}')
+    if search_result.recordList:
+        return list(search_result.recordList.record)
+    return []
+
+
+def search_all(searchtype, page_size=SEARCH_PAGE_SIZE, max_concurrency=None):
+    """
+    Run a search and return the records of all its pages. The pages after the
+    first one are requested with searchMoreWithId.
+    """
+    preferences = _search_preferences(page_size)
+    response = client.service.search(
+        searchRecord=searchtype,
+        _soapheaders=get_soapheaders(searchPreferences=preferences)
+    )
+    result = response.body.searchResult
+    records = _records(result, 'search')
+    total_pages = result.totalPages or 1
+    if total_pages <= 1:
+        return records
+
+    logger.info(f'Search returned {result.totalRecords} records in {total_pages} pages')
+
+    def search_page(page_index):
+        page_response = client.service.searchMoreWithId(
+            searchId=result.searchId,
+            pageIndex=page_index,
+            _soapheaders=get_soapheaders(searchPreferences=preferences)
+        )
+        return _records(page_response.body.searchResult, f'searchMoreWithId page {page_index}')
+
+    for page_records in run_concurrently(search_page, range(2, total_pages + 1), max_concurrency):
+        records.extend(page_records)
+    return records
+
+
+def get_list(record_type, internal_ids, chunk_size=GET_LIST_CHUNK_SIZE, max_concurrency=None):
+    """
+    Read records by internal id with getList calls of `chunk_size` records.
+
+    Returns:
+        dict -- {internal_id: record}, None for the records that could not be read
+    """
+    internal_ids = [str(internal_id) for internal_id in dict.fromkeys(internal_ids)]
+
+    def get_chunk(chunk):
+        response = client.service.getList(
+            baseRef=[RecordRef(internalId=internal_id, type=record_type) for internal_id in chunk],
+            _soapheaders=get_soapheaders()
+        )
+        found = {}
+        for read_response in response.body.readResponseList.readResponse:
+            if read_response.status.isSuccess and read_response.record is not None:
+                found[str(read_response.record.internalId)] = read_response.record
+            else:
+                logger.info(f'getList of {record_type} failed for a record: {read_response.status.statusDetail}')
+        return found
+
+    records = dict.fromkeys(internal_ids)
+    for found in run_concurrently(get_chunk, list(chunks(internal_ids, chunk_size)), max_concurrency):
+        records.update(found)
+    return records
+
+
+def search_by_keys(build_search, keys, key_of_record, chunk_size=SEARCH_CHUNK_SIZE, max_concurrency=None):
+    """
+    Search the records matching many keys, `chunk_size` keys per search.
+
+    Arguments:
+        build_search {function} -- Returns the search record for a list of keys
+        keys {iterable} -- Keys to look up, e.g. external ids
+        key_of_record {function} -- Returns the key a found record belongs to
+
+    Returns:
+        dict -- {key: [records]}, an empty list for keys without a record
+    """
+    keys = [str(key) for key in dict.fromkeys(keys)]
+    max_concurrency = max_concurrency or get_max_concurrency()
+
+    def search_chunk(chunk):
+        # The chunks already run concurrently, their pages are read one after the other
+        return search_all(build_search(chunk), max_concurrency=1)
+
+    records = {key: [] for key in keys}
+    for chunk_records in run_concurrently(search_chunk, list(chunks(keys, chunk_size)), max_concurrency):
+        for record in chunk_records:
+            key = key_of_record(record)
+            if key is not None and str(key) in records:
+                records[str(key)].append(record)
+    return records
+
+
+def _is_retryable(status_detail):
+    return any(detail.code in RETRYABLE_CODES for detail in status_detail or [])
+
+
+def _was_not_sent(ex):
+    """
+    Whether the request failed before it reached NetSuite, so no record can have been written
+    """
+    if isinstance(ex, ConnectTimeout):
+        return True
+    if isinstance(ex, RequestsConnectionError):
+        reason = ex.args[0] if ex.args else None
+        if isinstance(reason, MaxRetryError):
+            reason = reason.reason
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+def _retry_delay(attempt):
+    return RETRY_BASE_DELAY * 2 ** (attempt - 1) * random.uniform(1, 1.5)
+
+
+def write_list(operation, records, chunk_size=WRITE_CHUNK_SIZE, max_attempts=WRITE_MAX_ATTEMPTS,
+               max_concurrency=None, preferences=None):
+    """
+    Write many records with list operations of `chunk_size` records. Only the records
+    that failed because of load or concurrency errors are sent again, with exponential
+    backoff. When the whole call fails, its records are only sent again for updateList and
+    upsertList or when the request never reached NetSuite; otherwise they are reported as
+    failed, as NetSuite may have written them anyway.
+
+    Arguments:
+        operation {str} -- addList, updateList or upsertList
+        records {list} -- Records to write
+        preferences {Preferences} -- Defaults to warnings not being errors and ignoring read-only fields
+
+    Returns:
+        list -- One WriteResult per record, in the order of `records`
+    """
+    records = list(records)
+    if preferences is None:
+        preferences = Preferences(warningAsError=False, ignoreReadOnlyFields=True)
+    results = [None] * len(records)
+
+    def write_chunk(indexes):
+        attempt = 0
+        while indexes:
+            attempt += 1
+            retry = []
+            resend = False
+            try:
+                response = getattr(client.service, operation)(
+                    [records[index] for index in indexes],
+                    _soapheaders=get_soapheaders(preferences=preferences)
+                )
+                write_responses = response.body.writeResponseList.writeResponse
+            except Exception as ex:
+                logger.warning(f'{operation} of {len(indexes)} records failed - Attempt {attempt}: {ex}')
+                write_responses = None
+                error = str(ex)
+                resend = operation in IDEMPOTENT_OPERATIONS or _was_not_sent(ex)
+
+            for position, index in enumerate(indexes):
+                if write_responses is None:
+                    if resend:
+                        retry.append(index)
+                    results[index] = WriteResult(False, None, None, error, attempt)
+                    continue
+                write_response = write_responses[position]
+                base_ref = write_response.baseRef
+                if write_response.status.isSuccess:
+                    results[index] = WriteResult(True, base_ref.internalId, base_ref.externalId, None, attempt)
+                    continue
+                status_detail = write_response.status.statusDetail
+                results[index] = WriteResult(
+                    False,
+                    base_ref.internalId if base_ref else None,
+                    base_ref.externalId if base_ref else None,
+                    format_error_message(status_detail),
+                    attempt
+                )
+                if _is_retryable(status_detail):
+                    retry.append(index)
+
+            if retry and attempt < max_attempts:
+                time.sleep(_retry_delay(attempt))
+                indexes = retry
+            else:
+                indexes = []
+
+    chunk_indexes = list(chunks(list(range(len(records))), chunk_size))
+    run_concurrently(write_chunk, chunk_indexes, max_concurrency)
+
+    failed = sum(1 for result in results if not result.success)
+    logger.info(f'{operation} wrote {len(records) - failed} records, {failed} failed')
+    return results
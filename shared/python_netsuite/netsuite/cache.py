@@ -0,0 +1,191 @@
+"""
+Reference data cache: memoizes lookups of values that rarely change, like config maps,
+item internal ids by SKU and customer internal ids by email.
+
+Caches are module level, so they survive warm invocations of a lambda. A cache can be
+backed by a persistent store (DynamoDB or S3) so cold starts find the values too:
+ - netsuite_cache_table: DynamoDB table with the string hash key `cache_key`
+ - netsuite_cache_bucket: S3 bucket, entries are written under netsuite_cache_prefix
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__file__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_TTL = int(os.environ.get('netsuite_cache_ttl', '3600') or '3600')
+DEFAULT_MAX_SIZE = int(os.environ.get('netsuite_cache_max_size', '10000') or '10000')
+
+_MISSING = object()
+_CACHES = {}
+_STORE = _MISSING
+
+
+class DynamoDBStore(object):
+    """Keeps entries as items `{cache_key, value, expires_at}`, `expires_at` can be the table's TTL attribute."""
+
+    def __init__(self, table_name):
+        import boto3
+        self.table = boto3.resource('dynamodb').Table(table_name)
+
+    def get(self, key):
+        item = self.table.get_item(Key={'cache_key': key}).get('Item')
+        if item and int(item['expires_at']) > time.time():
+            return json.loads(item['value'])
+        return _MISSING
+
+    def put(self, key, value, expires_at):
+        self.table.put_item(Item={'cache_key': key, 'value': json.dumps(value), 'expires_at': int(expires_at)})
+
+
+class S3Store(object):
+    """Keeps entries as JSON objects `{value, expires_at}` named after their key."""
+
+    def __init__(self, bucket_name, prefix='netsuite-cache'):
+        import boto3
+        self.s3 = boto3.client('s3')
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            body = self.s3.get_object(Bucket=self.bucket_name, Key=f'{self.prefix}/{key}')['Body'].read()
+        except self.s3.exceptions.NoSuchKey:
+            return _MISSING
+        entry = json.loads(body)
+        if entry['expires_at'] > time.time():
+            return entry['value']
+        return _MISSING
+
+    def put(self, key, value, expires_at):
+        body = json.dumps({'value': value, 'expires_at': int(expires_at)})
+        self.s3.put_object(Bucket=self.bucket_name, Key=f'{self.prefix}/{key}', Body=body.encode('utf-8'))
+
+
+def get_default_store():
+    """Return the store configured in the environment, None if there is none."""
+    global _STORE
+    if _STORE is _MISSING:
+        if os.environ.get('netsuite_cache_table'):
+            _STORE = DynamoDBStore(os.environ['netsuite_cache_table'])
+        elif os.environ.get('netsuite_cache_bucket'):
+            _STORE = S3Store(os.environ['netsuite_cache_bucket'],
+                             os.environ.get('netsuite_cache_prefix', 'netsuite-cache') or 'netsuite-cache')
+        else:
+            _STORE = None
+    return _STORE
+
+
+class ReferenceCache(object):
+    """
+    In-memory cache with a time to live and least recently used eviction.
+
+    Values are looked up in memory, then in the persistent `store` if there is one,
+    and only then loaded. `None` is never cached, so values that do not exist yet
+    are looked up again. Values written to a store must be JSON serializable.
+    """
+
+    def __init__(self, name, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, store=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.store = store
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+        return default
+
+    def set(self, key, value, persist=True):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        if persist and self.store is not None:
+            try:
+                self.store.put(self._store_key(key), value, expires_at)
+            except Exception as ex:
+                logger.warning(f'Could not persist {self.name} cache entry {key}: {ex}')
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value of `key`, calling `loader()` on a miss.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        if self.store is not None:
+            try:
+                value = self.store.get(self._store_key(key))
+            except Exception as ex:
+                logger.warning(f'Could not read {self.name} cache entry {key}: {ex}')
+                value = _MISSING
+            if value is not _MISSING:
+                self.store_hits += 1
+                self.set(key, value, persist=False)
+                return value
+
+        self.misses += 1
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        lookups = self.hits + self.store_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'store_hits': self.store_hits,
+            'misses': self.misses,
+            'hit_rate': round((self.hits + self.store_hits) / lookups, 3) if lookups else 0.0
+        }
+
+    def _store_key(self, key):
+        return f'{self.name}#{key}'
+
+
+def get_cache(name, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, persistent=False):
+    """
+    Return the module level cache `name`, created on first use. Persistent caches
+    use the store configured in the environment.
+    """
+    cache = _CACHES.get(name)
+    if cache is None:
+        store = get_default_store() if persistent else None
+        cache = _CACHES[name] = ReferenceCache(name, ttl=ttl, max_size=max_size, store=store)
+    return cache
+
+
+def cache_stats():
+    """Return the hit and miss counters of every cache, by cache name."""
+    return {name: cache.stats() for name, cache in _CACHES.items()}
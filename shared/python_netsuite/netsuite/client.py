@@ -1,6 +1,7 @@
 from netsuite import ns_config
 from netsuite.service import (
-    client,
+    LazyValue,
+    get_client,
     RecordRef,
     ApplicationInfo,
     Passport,
@@ -92,6 +93,7 @@ def make_passport():
 
 
 def login():
+    client = get_client()
     app_info = ApplicationInfo(applicationId=ns_config.NS_APPID)
 
     if os.environ.get('netsuite_tba_active', '0') == '1':
@@ -111,6 +113,12 @@ def login():
     return client, app_info
 
 
-passport = make_passport2()
-tokenpassword = make_passport()
-client, app_info = login()
+def _logged_in_client():
+    return login()[0]
+
+
+# Built on first use, so importing the package neither loads the WSDL nor logs in
+passport = LazyValue(make_passport2)
+tokenpassword = LazyValue(make_passport)
+client = LazyValue(_logged_in_client)
+app_info = LazyValue(lambda: ApplicationInfo(applicationId=ns_config.NS_APPID))
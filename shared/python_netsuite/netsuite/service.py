@@ -1,17 +1,138 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
 from zeep import Client
-# Unfortunately AWS python 3.6 doesn't support sqlite3
-# from zeep.cache import SqliteCache
+# Unfortunately AWS python 3.6 doesn't support sqlite3, the WSDL and XSD are cached in files instead
+from zeep.cache import Base
 from zeep.transports import Transport
 
 from netsuite import ns_config
 
+logger = logging.getLogger(__name__)
+
+# Writable cache of a container, survives warm invocations
+CACHE_DIR = os.environ.get('netsuite_wsdl_cache_dir', '/tmp/netsuite-wsdl-cache') or '/tmp/netsuite-wsdl-cache'
+# Optional read-only cache shipped with the deployment package, see README
+BUNDLED_CACHE_DIR = os.environ.get('netsuite_wsdl_bundled_cache_dir')
 # cache WSDL and XSD for a year
-# cache = SqliteCache(timeout=60*60*24*365)
-# transport = Transport(cache=cache)
-transport = Transport()
-client = Client(ns_config.WSDL_URL, transport=transport)
+CACHE_TIMEOUT = 60 * 60 * 24 * 365
+POOL_SIZE = int(os.environ.get('netsuite_pool_size', '10') or '10')
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class FileCache(Base):
+    """
+    zeep cache keeping every downloaded WSDL and XSD document in a file named
+    after the hash of its url. Documents are looked up in `path` first and then
+    in the read-only `bundled_path`; new documents are only written to `path`.
+    """
+
+    def __init__(self, path=CACHE_DIR, bundled_path=BUNDLED_CACHE_DIR, timeout=CACHE_TIMEOUT):
+        self.path = path
+        self.bundled_path = bundled_path
+        self.timeout = timeout
+
+    @staticmethod
+    def key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def add(self, url, content):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            filename = os.path.join(self.path, self.key(url))
+            # Write and rename so concurrent readers never see a partial document
+            with open(filename + '.tmp', 'wb') as cache_file:
+                cache_file.write(content)
+            os.replace(filename + '.tmp', filename)
+        except OSError as ex:
+            logger.warning('Could not cache %s: %s' % (url, ex))
+
+    def get(self, url):
+        for path in (self.path, self.bundled_path):
+            if not path:
+                continue
+            filename = os.path.join(path, self.key(url))
+            try:
+                if path == self.path and time.time() - os.path.getmtime(filename) > self.timeout:
+                    continue
+                with open(filename, 'rb') as cache_file:
+                    return cache_file.read()
+            except OSError:
+                continue
+        return None
+
+
+def build_session(pool_size=POOL_SIZE):
+    """ Session keeping the connections to NetSuite alive between calls. """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_client():
+    """
+    Return the zeep client, building it on first use. The WSDL url is read from
+    the environment at that moment, so the environment loader may run after import.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            started_at = time.time()
+            transport = Transport(cache=FileCache(), session=build_session())
+            _client = Client(os.environ.get('netsuite_wsdl_url', ns_config.WSDL_URL), transport=transport)
+            logger.info('NetSuite client loaded in %.2f seconds' % (time.time() - started_at))
+    return _client
+
+
+class LazyValue(object):
+    """
+    Stands in for a value that is only built when it is first used: calls and
+    attribute lookups are forwarded to the value returned by `factory`.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._resolved = False
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        if not self._resolved:
+            with self._lock:
+                if not self._resolved:
+                    self._value = self._factory()
+                    self._resolved = True
+        return self._value
+
+    def __getattr__(self, name):
+        if name in ('_factory', '_value', '_resolved', '_lock'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        if self._resolved:
+            return repr(self._value)
+        return '<LazyValue %r>' % self._factory
+
+
+def model(name):
+    """ Return the named WSDL type, looked up when it is first used. """
+    return LazyValue(lambda: get_client().get_type(name))
+
 
-model = client.get_type
+client = LazyValue(get_client)
 
 TokenPassport = model('ns0:TokenPassport')
 TokenPassportSignature = model('ns0:TokenPassportSignature')
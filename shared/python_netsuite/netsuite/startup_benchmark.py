@@ -0,0 +1,50 @@
+"""
+Benchmark the cold start of the NetSuite client.
+
+Every measurement runs in a fresh interpreter, like a new lambda container:
+ - import: importing netsuite.client and netsuite.service
+ - first use, cold cache: loading the client with an empty WSDL/XSD cache
+ - first use, warm cache: loading the client again from the files cached by the previous run
+With --call, the first use is a getServerTime request instead, which needs credentials.
+
+Usage: netsuite_wsdl_url=... python -m netsuite.startup_benchmark [--call]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+SCRIPT = '''
+import json, sys, time
+started_at = time.time()
+from netsuite import client as ns_client
+from netsuite.service import get_client
+imported_at = time.time()
+if %(call)r:
+    ns_client.client.service.getServerTime(
+        _soapheaders={'passport': ns_client.passport, 'applicationInfo': ns_client.app_info})
+else:
+    get_client()
+used_at = time.time()
+print(json.dumps({'import': imported_at - started_at, 'first_use': used_at - imported_at}))
+'''
+
+
+def _run(cache_dir, call):
+    env = dict(os.environ, netsuite_wsdl_cache_dir=cache_dir)
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT % {'call': call}], env=env)
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def benchmark(call=False):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = _run(cache_dir, call)
+        warm = _run(cache_dir, call)
+    print('import:                   %.3fs' % cold['import'])
+    print('first use, cold cache:    %.3fs' % cold['first_use'])
+    print('first use, warm cache:    %.3fs' % warm['first_use'])
+
+
+if __name__ == '__main__':
+    benchmark(call='--call' in sys.argv)
@@ -29,6 +29,16 @@ class obj(object):
                    if isinstance(b, dict) else b)
 
 
+def get_soapheaders(**headers):
+    """Return the authentication SOAP headers, added to the given `headers`."""
+    if os.environ.get('netsuite_tba_active', '0') == "1":
+        headers['tokenPassport'] = make_passport()
+    else:
+        headers['applicationInfo'] = app_info
+        headers['passport'] = passport
+    return headers
+
+
 def get_record_by_type(type, internal_id):
     record = RecordRef(internalId=internal_id, type=type)
 